@@ -0,0 +1,6 @@
+"""
+FoodCoach execution layer: diary storage, nutrition lookups, vision analysis and agents.
+
+Submodules are imported on demand; the `foodcoach` command (execution/cli.py) is
+the entry point.
+"""
@@ -0,0 +1,267 @@
+import time
+import threading
+from array import array
+
+from execution.diary_db import get_store, init_db
+from execution.venue_store import DEFAULT_ADOPTION
+from execution.metrics import timed
+
+# (accepted, rejected) evidence per feedback status; an ignored suggestion is a weak no
+OUTCOMES = {'accepted': (1.0, 0.0), 'rejected': (0.0, 1.0), 'ignored': (0.0, 0.5)}
+ALL_USERS = 0
+WHOLE_PLACE = ''
+
+HALF_LIFE = 30 * 24 * 3600          # seconds for old feedback to count half
+PRIOR_STRENGTH = 2.0                # pseudo-observations each level borrows from the one above
+FLUSH_EVERY = 256                   # feedback events between adoption_stats writes
+FLUSH_INTERVAL = 60.0               # ...or seconds, whichever comes first
+
+SELECT_RECOMMENDATION_SQL = '''
+SELECT user_id, suggested_item, place_name, status FROM recommendations WHERE id = ?
+'''
+# Guarded, so a recommendation's outcome is learned once however many events race for it
+UPDATE_FEEDBACK_SQL = f'''
+UPDATE recommendations SET status = ?, rejection_reason = ?, adoption_rate_impact = ?
+WHERE id = ? AND (status IS NULL OR status NOT IN ({", ".join(repr(s) for s in OUTCOMES)}))
+'''
+SELECT_FEEDBACK_HISTORY_SQL = f'''
+SELECT user_id, suggested_item, place_name, status, timestamp FROM recommendations
+WHERE status IN ({", ".join(repr(s) for s in OUTCOMES)})
+ORDER BY timestamp, id
+'''
+SELECT_STATS_SQL = "SELECT user_id, place, item, accepted, rejected, updated_at FROM adoption_stats"
+UPSERT_STATS_SQL = '''
+INSERT INTO adoption_stats (user_id, place, item, accepted, rejected, updated_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, place, item) DO UPDATE SET
+    accepted = excluded.accepted, rejected = excluded.rejected, updated_at = excluded.updated_at
+'''
+
+
+class AdoptionModel:
+    """
+    Online acceptance rates for recommended menu items.
+
+    Every feedback event updates exponentially decayed accept/reject counts at four
+    levels: place, item (all users), the user at that place, and the user and item.
+    The counts live in flat float arrays indexed through a slot dict, so scoring a
+    candidate is four lookups. Each level is a Beta posterior whose prior is the
+    level above, so a new item at a liked place starts high and one rejection
+    does not sink an item everyone else accepts.
+
+    record_feedback() commits the counts it moves together with the status change;
+    events fed through observe() reach adoption_stats every FLUSH_EVERY events or
+    FLUSH_INTERVAL seconds. rebuild() recomputes them from the recommendations table.
+    """
+
+    def __init__(self, store=None, half_life=HALF_LIFE, prior_strength=PRIOR_STRENGTH, clock=time.time):
+        self.store = store or get_store()
+        self.half_life = half_life
+        self.prior_strength = prior_strength
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._slots = {}                 # (user_id, place, item) -> row in the arrays
+        self._keys = []
+        self._accepted = array('d')
+        self._rejected = array('d')
+        self._stamp = array('d')
+        self._dirty = set()
+        self._events_since_flush = 0
+        self._last_flush = self.clock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _slot(self, key, now):
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = len(self._keys)
+            self._accepted.append(0.0)
+            self._rejected.append(0.0)
+            self._stamp.append(now)
+            self._slots[key] = slot
+            self._keys.append(key)
+        return slot
+
+    # --- Scoring ---
+
+    def _counts(self, key, pending=None):
+        """
+        (accepted, rejected, stamp) of a key, from pending when it has one; None when unseen
+        """
+        if pending and key in pending:
+            return pending[key]
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        return self._accepted[slot], self._rejected[slot], self._stamp[slot]
+
+    def _posterior(self, key, prior, now, pending=None):
+        counts = self._counts(key, pending)
+        if counts is None:
+            return prior
+        accepted, rejected, stamp = counts
+        decay = 0.5 ** (max(now - stamp, 0.0) / self.half_life)
+        accepted *= decay
+        rejected *= decay
+        return (accepted + self.prior_strength * prior) / (accepted + rejected + self.prior_strength)
+
+    def score(self, user_id, item, place, now=None, pending=None):
+        """
+        Estimated probability that the user accepts `item` at `place`, in [0, 1];
+        pending maps keys to counts not applied yet (see _fold)
+        """
+        now = self.clock() if now is None else now
+        place_rate = self._posterior((ALL_USERS, place, WHOLE_PLACE), DEFAULT_ADOPTION, now, pending)
+        item_rate = self._posterior((ALL_USERS, place, item), place_rate, now, pending)
+        if user_id is None:
+            return item_rate
+        user_place_rate = self._posterior((user_id, place, WHOLE_PLACE), place_rate, now, pending)
+        return self._posterior((user_id, place, item), (item_rate + user_place_rate) / 2.0, now, pending)
+
+    def scorer(self, user_id):
+        """
+        adoption(item_name, place_name) callback for VenueStore.find_nearby
+        """
+        now = self.clock()
+        return lambda item, place: self.score(user_id, item, place, now)
+
+    # --- Learning ---
+
+    def observe(self, user_id, item, place, status, at=None):
+        """
+        Fold one feedback event into the counts; statuses outside OUTCOMES are ignored
+        """
+        if status not in OUTCOMES:
+            return
+        self._learn(user_id, item, place, status, self.clock() if at is None else at)
+        if self._events_since_flush >= FLUSH_EVERY or self.clock() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def _fold(self, user_id, item, place, status, at):
+        """
+        {key: (accepted, rejected, stamp)} for every level one feedback event touches,
+        with the event counted; memory is not changed until _remember() is given them
+        """
+        accepted, rejected = OUTCOMES[status]
+        keys = [(ALL_USERS, place, WHOLE_PLACE), (ALL_USERS, place, item)]
+        if user_id is not None:
+            keys += [(user_id, place, WHOLE_PLACE), (user_id, place, item)]
+        folded = {}
+        for key in keys:
+            old_accepted, old_rejected, stamp = self._counts(key) or (0.0, 0.0, at)
+            age = at - stamp
+            if age >= 0:
+                decay = 0.5 ** (age / self.half_life)
+                folded[key] = (old_accepted * decay + accepted, old_rejected * decay + rejected, at)
+            else:
+                # Older than what is already counted (out-of-order replay)
+                weight = 0.5 ** (-age / self.half_life)
+                folded[key] = (old_accepted + accepted * weight, old_rejected + rejected * weight, stamp)
+        return folded
+
+    def _remember(self, folded, persisted):
+        for key, (accepted, rejected, stamp) in folded.items():
+            slot = self._slot(key, stamp)
+            self._accepted[slot] = accepted
+            self._rejected[slot] = rejected
+            self._stamp[slot] = stamp
+            if persisted:
+                self._dirty.discard(slot)
+            else:
+                self._dirty.add(slot)
+
+    def _learn(self, user_id, item, place, status, at):
+        with self._lock:
+            self._remember(self._fold(user_id, item, place, status, at), persisted=False)
+            self._events_since_flush += 1
+
+    def record_feedback(self, rec_id, status, rejection_reason=None):
+        """
+        Set a recommendation's status, learn from it and store the change it made to
+        the user's score for that item as adoption_rate_impact. Returns the impact.
+
+        The status change and the counts it moves are committed together; memory
+        follows only after the commit. The lock spans the commit so the next event
+        folds into these counts.
+        """
+        now = self.clock()
+        folded = {}
+        with self._lock:
+            with self.store.transaction() as conn:
+                row = conn.execute(SELECT_RECOMMENDATION_SQL, (rec_id,)).fetchone()
+                if row is None:
+                    raise KeyError(f"No recommendation {rec_id}")
+                user_id, item, place, previous = row
+                if previous in OUTCOMES:                 # each recommendation's outcome counts once
+                    self.store.set_recommendation_status(rec_id, status, rejection_reason)
+                    return 0.0
+                if status in OUTCOMES:
+                    folded = self._fold(user_id, item, place, status, now)
+                impact = (self.score(user_id, item, place, now, pending=folded)
+                          - self.score(user_id, item, place, now))
+                updated = conn.execute(UPDATE_FEEDBACK_SQL, (status, rejection_reason, round(impact, 6), rec_id))
+                if updated.rowcount == 0:
+                    return 0.0
+                conn.executemany(UPSERT_STATS_SQL, [key + counts for key, counts in folded.items()])
+            self._remember(folded, persisted=True)
+        return impact
+
+    # --- Persistence ---
+
+    @timed("db_seconds")
+    def flush(self):
+        """
+        Write counts changed since the last flush; returns how many rows were written
+        """
+        with self._lock:
+            rows = [self._keys[slot] + (self._accepted[slot], self._rejected[slot], self._stamp[slot])
+                    for slot in self._dirty]
+            self._dirty = set()
+            self._events_since_flush = 0
+            self._last_flush = self.clock()
+        if rows:
+            with self.store.transaction() as conn:
+                conn.executemany(UPSERT_STATS_SQL, rows)
+        return len(rows)
+
+    @timed("db_seconds")
+    def load(self, rebuild_empty=True):
+        """
+        Read adoption_stats into memory, rebuilding from feedback history when it is empty
+        (rebuild_empty=False just loads nothing, for read-only callers)
+        """
+        rows = self.store.connection().execute(SELECT_STATS_SQL).fetchall()
+        if not rows and rebuild_empty:
+            return self.rebuild()
+        with self._lock:
+            self._reset()
+            for user_id, place, item, accepted, rejected, updated_at in rows:
+                slot = self._slot((user_id, place, item), updated_at)
+                self._accepted[slot] = accepted
+                self._rejected[slot] = rejected
+        return len(self)
+
+    @timed("db_seconds")
+    def rebuild(self):
+        """
+        Recompute every count from the recommendations table and rewrite adoption_stats
+        """
+        now = self.clock()
+        with self._lock:
+            self._reset()
+        for user_id, item, place, status, timestamp in self.store.connection().execute(
+                SELECT_FEEDBACK_HISTORY_SQL).fetchall():
+            self._learn(user_id, item, place, status, now if timestamp is None else timestamp)
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM adoption_stats")
+            self.flush()
+        return len(self)
+
+
+if __name__ == "__main__":
+    model = AdoptionModel(init_db())
+    print(f"Rebuilt {model.rebuild()} adoption statistics")
@@ -0,0 +1,267 @@
+import io
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from execution.diary_db import get_store, init_db
+from execution.metrics import timed
+
+try:
+    from PIL import Image
+except ImportError:       # perceptual mode needs Pillow; exact-hash caching does not
+    Image = None
+
+DEFAULT_MEMORY_ENTRIES = 512
+DEFAULT_TTL = 30 * 24 * 3600          # seconds
+DEFAULT_MAX_ROWS = 50000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # summed size of the stored result JSON
+DEFAULT_MAX_DISTANCE = 6              # bits out of 64 for "same plate"
+PHASH_BANDS = 4                       # 16-bit bands; distance <= 3 always shares one
+EVICT_EVERY = 256                     # puts between persistent-tier sweeps
+
+SELECT_ENTRY_SQL = "SELECT result, created_at FROM analysis_cache WHERE key = ?"
+TOUCH_ENTRY_SQL = "UPDATE analysis_cache SET last_hit = ? WHERE key = ?"
+UPSERT_ENTRY_SQL = '''
+INSERT INTO analysis_cache (key, params_hash, phash, result, size, created_at, last_hit)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    result = excluded.result, size = excluded.size, phash = excluded.phash,
+    created_at = excluded.created_at, last_hit = excluded.last_hit
+'''
+INSERT_BAND_SQL = "INSERT OR IGNORE INTO analysis_cache_bands (band, value, key) VALUES (?, ?, ?)"
+SELECT_NEAR_SQL = '''
+SELECT DISTINCT c.key, c.phash, c.result, c.created_at
+FROM analysis_cache_bands b JOIN analysis_cache c ON c.key = b.key
+WHERE b.band = ? AND b.value = ? AND c.params_hash = ?
+'''
+DELETE_EXPIRED_SQL = "DELETE FROM analysis_cache WHERE created_at < ?"
+# Keep the most recently hit entries while they fit both budgets; drop the rest
+DELETE_OVER_BUDGET_SQL = '''
+DELETE FROM analysis_cache WHERE key IN (
+    SELECT key FROM (
+        SELECT key,
+               ROW_NUMBER() OVER recent AS kept_rows,
+               SUM(size) OVER recent AS kept_bytes
+        FROM analysis_cache
+        WINDOW recent AS (ORDER BY last_hit DESC, key ROWS UNBOUNDED PRECEDING)
+    )
+    WHERE kept_rows > ? OR kept_bytes > ?
+)
+'''
+SELECT_TOTALS_SQL = "SELECT COUNT(*), IFNULL(SUM(size), 0) FROM analysis_cache"
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def params_hash(params):
+    """
+    Stable hash of the prompt, model and profile fields that shape the answer
+    """
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def dhash(data, size=8):
+    """
+    64-bit difference hash of an encoded image: brightness gradients on a 9x8 grayscale
+    thumbnail, stable across re-encoding, resizing and small exposure changes
+    """
+    if Image is None:
+        raise ImportError("Perceptual caching requires Pillow (pip install Pillow)")
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("L", (size * 4, size * 4))
+        pixels = img.convert("L").resize((size + 1, size)).tobytes()
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            value = (value << 1) | (left > pixels[row * (size + 1) + col + 1])
+    return value
+
+
+def _signed64(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _bands(phash):
+    return [(band, (phash >> (16 * band)) & 0xFFFF) for band in range(PHASH_BANDS)]
+
+
+class CacheStats:
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def hits(self):
+        return self.memory_hits + self.disk_hits + self.perceptual_hits
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "perceptual_hits": self.perceptual_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class AnalysisCache:
+    """
+    Content-addressed cache of vision results.
+
+    Entries are keyed by sha256(image bytes) + a hash of the prompt parameters.
+    An in-memory LRU sits in front of the analysis_cache table; both tiers honour
+    the TTL and the table is trimmed by least-recent hit to max_rows entries and
+    max_bytes of stored result JSON. With
+    perceptual=True a miss falls back to any entry whose dHash is within
+    max_distance bits, so a second shot of the same plate reuses the result.
+    """
+
+    def __init__(self, store=None, memory_entries=DEFAULT_MEMORY_ENTRIES, ttl=DEFAULT_TTL,
+                 max_rows=DEFAULT_MAX_ROWS, max_bytes=DEFAULT_MAX_BYTES, perceptual=False,
+                 max_distance=DEFAULT_MAX_DISTANCE, clock=time.time):
+        if perceptual and Image is None:
+            raise ImportError("Perceptual caching requires Pillow (pip install Pillow)")
+        self.store = store or get_store()
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self.clock = clock
+        self.stats = CacheStats()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+
+    def make_key(self, data, params, digest=None):
+        p_hash = params_hash(params)
+        return (digest or content_hash(data)) + ":" + p_hash[:32], p_hash
+
+    # --- Memory tier ---
+
+    def _remember(self, key, result, created_at):
+        with self._lock:
+            self._memory[key] = (result, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _recall(self, key, now):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if now - entry[1] > self.ttl:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return entry[0]
+
+    # --- Lookups ---
+
+    @timed("db_seconds")
+    def get(self, data, params, digest=None):
+        """
+        Cached result for these image bytes and prompt parameters, or None.
+        digest is the sha256 of the source file when it was hashed while streaming;
+        data may then be None, which skips the perceptual fallback.
+        """
+        key, p_hash = self.make_key(data, params, digest)
+        now = self.clock()
+
+        result = self._recall(key, now)
+        if result is not None:
+            self.stats.memory_hits += 1
+            return result
+
+        conn = self.store.connection()
+        row = conn.execute(SELECT_ENTRY_SQL, (key,)).fetchone()
+        if row is not None and now - row[1] <= self.ttl:
+            conn.execute(TOUCH_ENTRY_SQL, (int(now), key))
+            result = json.loads(row[0])
+            self._remember(key, result, row[1])
+            self.stats.disk_hits += 1
+            return result
+
+        if self.perceptual and data is not None:
+            result = self._nearest(dhash(data), p_hash, now)
+            if result is not None:
+                self.stats.perceptual_hits += 1
+                return result
+
+        self.stats.misses += 1
+        return None
+
+    def _nearest(self, phash, p_hash, now):
+        conn = self.store.connection()
+        best = None
+        for band, value in _bands(phash):
+            for key, other, result, created_at in conn.execute(SELECT_NEAR_SQL, (band, value, p_hash)):
+                if now - created_at > self.ttl:
+                    continue
+                distance = bin((phash ^ other) & 0xFFFFFFFFFFFFFFFF).count("1")
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, key, result)
+        if best is None:
+            return None
+        conn.execute(TOUCH_ENTRY_SQL, (int(now), best[1]))
+        return json.loads(best[2])
+
+    @timed("db_seconds")
+    def put(self, data, params, result, digest=None):
+        key, p_hash = self.make_key(data, params, digest)
+        now = int(self.clock())
+        phash = dhash(data) if self.perceptual else None
+        payload = json.dumps(result, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        with self.store.transaction() as conn:
+            conn.execute(UPSERT_ENTRY_SQL, (key, p_hash, None if phash is None else _signed64(phash),
+                                            payload, size, now, now))
+            if phash is not None:
+                conn.executemany(INSERT_BAND_SQL, [(band, value, key) for band, value in _bands(phash)])
+        self._remember(key, result, now)
+        self.stats.stores += 1
+
+        self._puts_since_evict += 1
+        if self._puts_since_evict >= EVICT_EVERY:
+            self.evict()
+
+    @timed("db_seconds")
+    def evict(self):
+        """
+        Drop expired entries, then the least recently hit ones beyond max_rows or max_bytes
+        """
+        self._puts_since_evict = 0
+        now = self.clock()
+        with self.store.transaction() as conn:
+            removed = conn.execute(DELETE_EXPIRED_SQL, (int(now - self.ttl),)).rowcount
+            rows, size = conn.execute(SELECT_TOTALS_SQL).fetchone()
+            if rows > self.max_rows or size > self.max_bytes:
+                removed += conn.execute(DELETE_OVER_BUDGET_SQL, (self.max_rows, self.max_bytes)).rowcount
+        self.stats.evictions += removed
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM analysis_cache")
+
+
+if __name__ == "__main__":
+    cache = AnalysisCache(init_db())
+    print(f"Evicted {cache.evict()} cached analyses")
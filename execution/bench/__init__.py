@@ -0,0 +1,6 @@
+"""
+Synthetic load generation and benchmarks for the FoodCoach execution layer.
+
+    python -m execution.bench.runner --users 10000 --days 7 --seed 42 --out run.json
+    python -m execution.bench.mass_simulation --users 5000 --workers 8 --out scaling.json
+"""
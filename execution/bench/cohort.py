@@ -0,0 +1,101 @@
+import numpy as np
+
+from execution.food_catalog import FOOD_DATABASE
+
+GENDERS = ('male', 'female')
+GOALS = ('lose', 'maintain', 'gain')
+GOAL_WEIGHTS = (0.45, 0.35, 0.20)
+
+ZIPF_EXPONENT = 1.1
+
+# Diurnal meal model: (name, probability the meal happens, mean hour, std-dev hours)
+MEAL_SLOTS = (
+    ('breakfast', 0.70, 8.0, 0.75),
+    ('lunch', 0.95, 12.5, 0.6),
+    ('snack', 0.40, 15.5, 1.5),
+    ('dinner', 0.90, 19.0, 1.0),
+    ('late_snack', 0.15, 22.5, 0.75),
+)
+
+DAY_SECONDS = 86400
+
+
+class Cohort:
+    """
+    Column arrays describing a synthetic user population
+    """
+
+    def __init__(self, age, height, weight, gender, goal, utc_offset_h):
+        self.age = age
+        self.height = height
+        self.weight = weight
+        self.gender = gender
+        self.goal = goal
+        self.utc_offset_h = utc_offset_h
+
+    def __len__(self):
+        return len(self.age)
+
+    def profiles(self):
+        """
+        (age, height, weight, gender, goal) rows for DiaryStore.add_profile / executemany
+        """
+        for i in range(len(self)):
+            yield (int(self.age[i]), round(float(self.height[i]), 1), round(float(self.weight[i]), 1),
+                   GENDERS[self.gender[i]], GOALS[self.goal[i]])
+
+
+def generate_cohort(users, seed=42):
+    rng = np.random.default_rng([seed, 0])
+    gender = rng.integers(0, 2, users)
+    age = np.clip(rng.normal(38, 12, users), 18, 80).round()
+    # Korean adult height by sex; weight from a BMI draw so the two stay plausible together
+    height = np.where(gender == 0, rng.normal(173, 6, users), rng.normal(160, 5.5, users))
+    bmi = np.clip(rng.normal(23.5, 3.2, users), 16, 40)
+    weight = bmi * (height / 100.0) ** 2
+    goal = rng.choice(len(GOALS), users, p=GOAL_WEIGHTS)
+    utc_offset_h = np.full(users, 9)          # KST
+    return Cohort(age, height, weight, gender, goal, utc_offset_h)
+
+
+def food_popularity(seed=42, exponent=ZIPF_EXPONENT):
+    """
+    FOOD_DATABASE names in a seeded popularity order with Zipf probabilities
+    """
+    names = np.array(sorted(FOOD_DATABASE))
+    names = names[np.random.default_rng([seed, 1]).permutation(len(names))]
+    weights = 1.0 / np.arange(1, len(names) + 1) ** exponent
+    return names, weights / weights.sum()
+
+
+def iter_meal_chunks(cohort, days, start_epoch, first_user_id=1, seed=42, users_per_chunk=20000):
+    """
+    Yield lists of (user_id, timestamp, food_name, calories, protein, fat, carbs)
+    covering `days` days from start_epoch (UTC midnight), users_per_chunk users at a time.
+    Identical arguments always produce identical meals.
+    """
+    names, probs = food_popularity(seed)
+    macros = np.array([[FOOD_DATABASE[n][k] for k in ('calories', 'protein', 'fat', 'carbs')] for n in names])
+    name_list = names.tolist()
+
+    for chunk_start in range(0, len(cohort), users_per_chunk):
+        rng = np.random.default_rng([seed, 2, chunk_start])
+        chunk_users = np.arange(chunk_start, min(chunk_start + users_per_chunk, len(cohort)))
+        # Larger bodies eat a bit more of each portion
+        portion = np.clip(cohort.weight[chunk_users] / 70.0, 0.7, 1.4)
+        rows = []
+        for day in range(days):
+            day_start = start_epoch + day * DAY_SECONDS
+            for _, probability, mean_h, std_h in MEAL_SLOTS:
+                eats = chunk_users[rng.random(len(chunk_users)) < probability]
+                if not len(eats):
+                    continue
+                local_hour = np.clip(rng.normal(mean_h, std_h, len(eats)), 0, 23.99)
+                timestamps = (day_start + (local_hour - cohort.utc_offset_h[eats]) * 3600).astype(np.int64)
+                foods = rng.choice(len(names), len(eats), p=probs)
+                scale = (portion[eats - chunk_start] * rng.uniform(0.8, 1.2, len(eats)))[:, None]
+                values = (macros[foods] * scale).round(1)
+                for user, ts, food, (cal, pro, fat, carb) in zip(eats.tolist(), timestamps.tolist(),
+                                                                 foods.tolist(), values.tolist()):
+                    rows.append((first_user_id + user, ts, name_list[food], cal, pro, fat, carb))
+        yield rows
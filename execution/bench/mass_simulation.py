@@ -0,0 +1,372 @@
+import sys
+import os
+import json
+import time
+import queue
+import random
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime, timezone
+
+import numpy as np
+
+from execution.diary_db import DiaryStore
+from execution.gap_engine import GapEngine
+from execution.venue_store import VenueStore
+from execution.adoption_model import AdoptionModel
+from execution.food_catalog import FOOD_DATABASE
+from execution.bench.cohort import generate_cohort, food_popularity
+from execution.bench.runner import summarize, DEFAULT_END_DAY
+from execution.bench_venue_store import synthetic_venues, CITY_BOUNDS
+
+# One virtual user walks the same path as simulation_test.run_simulation
+STAGES = ('log', 'gaps', 'recommend', 'feedback')
+BATCH_SIZE = 25              # users a worker carries through each stage together
+GROUP_MAX = 64               # writer messages folded into one commit
+POLL_SECONDS = 1.0           # how often a blocked reader checks that its peer is still running
+VENUES = 20000
+LUNCH_UTC = 3.5 * 3600       # 12:30 KST
+DAY_FRACTION, GAP_THRESHOLD = 0.35, 0.5
+
+
+def plan_users(users, seed=42, end_day=DEFAULT_END_DAY):
+    """
+    Everything random about each virtual user, drawn up front so a run does the
+    same work whatever the worker count: (profile row, meal row, lat, lon, accept draw)
+    """
+    cohort = generate_cohort(users, seed)
+    names, probs = food_popularity(seed)
+    rng = np.random.default_rng([seed, 4])
+    foods = rng.choice(len(names), users, p=probs)
+    day = int(datetime.fromisoformat(end_day).replace(tzinfo=timezone.utc).timestamp())
+    stamps = day + LUNCH_UTC + rng.integers(-1800, 1800, users)
+    min_lat, max_lat, min_lon, max_lon = CITY_BOUNDS
+    lats, lons = rng.uniform(min_lat, max_lat, users), rng.uniform(min_lon, max_lon, users)
+    draws = rng.random(users)
+    plans = []
+    for i, profile in enumerate(cohort.profiles()):
+        food = str(names[foods[i]])
+        data = FOOD_DATABASE[food]
+        meal = (food, data['calories'], data['protein'], data['fat'], data['carbs'], int(stamps[i]))
+        plans.append((profile, meal, float(lats[i]), float(lons[i]), float(draws[i])))
+    return plans
+
+
+# --- Writer ---
+
+def _apply(store, adoption, kind, payload):
+    if kind == 'log':
+        user_ids = []
+        for profile, (food, calories, protein, fat, carbs, timestamp) in payload:
+            user_id = store.add_profile(*profile)
+            store.add_meal(food, calories, protein, fat, carbs, timestamp=timestamp, user_id=user_id)
+            user_ids.append(user_id)
+        return user_ids
+    if kind == 'feedback':
+        impacts = []
+        for user_id, item, place, status, reason in payload:
+            rec_id = store.add_recommendation(item, place, user_id=user_id)
+            impacts.append(adoption.record_feedback(rec_id, status, reason))
+        return impacts
+    raise ValueError(f"Unknown write {kind}")
+
+
+def _apply_group(store, adoption, writes):
+    """
+    Apply (kind, payload) writes and the adoption counts they teach in one
+    transaction; returns one result per write
+    """
+    try:
+        with store.transaction():
+            results = [_apply(store, adoption, kind, payload) for kind, payload in writes]
+            adoption.flush()
+    except Exception:
+        # The counts learned from this group never reached adoption_stats;
+        # every earlier group flushed before committing, so reloading restores them
+        adoption.load()
+        raise
+    return results
+
+
+def writer_main(db_path, requests, replies, results, stopped):
+    """
+    The only process that writes. Messages waiting in the queue are applied in one
+    transaction (group commit), so workers never contend for SQLite's write lock.
+    `stopped` is set however the writer exits, so workers stop waiting for replies.
+    """
+    try:
+        _serve_writes(db_path, requests, replies, results)
+    finally:
+        stopped.set()
+
+
+def _serve_writes(db_path, requests, replies, results):
+    store = DiaryStore(db_path)
+    adoption = AdoptionModel(store)
+    adoption.load()
+    waits, groups, applied = [], [], []
+    busy = 0.0
+    running = True
+    while running:
+        batch = [requests.get()]
+        while len(batch) < GROUP_MAX:
+            try:
+                batch.append(requests.get_nowait())
+            except queue.Empty:
+                break
+        if batch[-1] is None:
+            running = False
+        batch = [message for message in batch if message is not None]
+        if not batch:
+            continue
+        start = time.perf_counter()
+        picked = time.time()
+        waits.extend(picked - sent_at for *_, sent_at in batch)
+        try:
+            outcome = _apply_group(store, adoption, [(kind, payload) for _, _, kind, payload, _ in batch])
+        except Exception as e:
+            outcome = [e] * len(batch)
+        seconds = time.perf_counter() - start
+        busy += seconds
+        groups.append(len(batch))
+        applied.append(seconds)
+        for (worker_id, batch_id, *_), result in zip(batch, outcome):
+            replies[worker_id].put((batch_id, result))
+    store.close()
+    results.put({
+        "commits": len(groups),
+        "messages_per_commit": round(float(np.mean(groups)), 2) if groups else 0.0,
+        "queue_wait": summarize(waits),
+        "commit": summarize(applied),
+        "busy_seconds": round(busy, 3),
+    })
+
+
+# --- Workers ---
+
+def _get(q, alive, what):
+    """
+    q.get() that gives up with RuntimeError once alive() turns false
+    """
+    while True:
+        try:
+            return q.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            if not alive():
+                raise RuntimeError(f"{what} stopped without replying")
+
+
+def _write(requests, reply, writer_stopped, worker_id, batch_id, kind, payload):
+    requests.put((worker_id, batch_id, kind, payload, time.time()))
+    got_id, result = _get(reply, lambda: not writer_stopped.is_set(), "Writer")
+    if got_id != batch_id:
+        raise RuntimeError(f"Writer replied to batch {got_id}, expected {batch_id}")
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def worker_main(worker_id, db_path, plans, batch_size, requests, reply, writer_stopped, ready, go, results):
+    """
+    Carry a shard of virtual users through every stage on this process's own
+    connection; reads run here, writes go to the writer queue
+    """
+    try:
+        _simulate_shard(worker_id, db_path, plans, batch_size, requests, reply, writer_stopped, ready, go, results)
+    except BaseException as e:
+        # Unblock the driver instead of leaving it waiting on a dead worker
+        ready.put(worker_id)
+        results.put((worker_id, e, 0))
+        raise
+
+
+def _simulate_shard(worker_id, db_path, plans, batch_size, requests, reply, writer_stopped, ready, go, results):
+    store = DiaryStore(db_path)
+    gaps_engine = GapEngine(store)
+    venues = VenueStore(store)
+    adoption = AdoptionModel(store)
+    adoption.load()                 # scores only, unless this worker writes directly
+    now = plans[0][1][5] if plans else None
+
+    def write(batch_id, kind, payload):
+        if requests is None:
+            return _apply_group(store, adoption, [(kind, payload)])[0]
+        return _write(requests, reply, writer_stopped, worker_id, batch_id, kind, payload)
+
+    latencies = {stage: [] for stage in STAGES + ('end_to_end',)}
+    recommended = 0
+    ready.put(worker_id)
+    go.wait()
+
+    for batch_id, first in enumerate(range(0, len(plans), batch_size)):
+        batch = plans[first:first + batch_size]
+        if batch_id:
+            # Pick up the feedback other workers committed since the last batch
+            adoption.load(rebuild_empty=False)
+        start = time.perf_counter()
+        user_ids = write(batch_id * 2, 'log', [(p[0], p[1]) for p in batch])
+        t = time.perf_counter()
+        latencies['log'].extend([t - start] * len(batch))
+
+        feedback = []
+        for user_id, (_, _, lat, lon, draw) in zip(user_ids, batch):
+            t0 = time.perf_counter()
+            missing = gaps_engine.missing_nutrients(user_id, day_fraction=DAY_FRACTION,
+                                                    threshold=GAP_THRESHOLD, now=now)
+            t1 = time.perf_counter()
+            scorer = adoption.scorer(user_id)
+            picks = venues.find_nearby(lat, lon, missing, adoption=scorer)
+            t2 = time.perf_counter()
+            latencies['gaps'].append(t1 - t0)
+            latencies['recommend'].append(t2 - t1)
+            if picks:
+                recommended += 1
+                top = picks[0]
+                accepted = draw < scorer(top['name'], top['place'])
+                feedback.append((user_id, top['name'], top['place'], 'accepted' if accepted else 'rejected',
+                                 None if accepted else 'too expensive'))
+
+        t3 = time.perf_counter()
+        if feedback:
+            write(batch_id * 2 + 1, 'feedback', feedback)
+        end = time.perf_counter()
+        latencies['feedback'].extend([end - t3] * len(batch))
+        latencies['end_to_end'].extend([end - start] * len(batch))
+    store.close()
+    results.put((worker_id, latencies, recommended))
+
+
+# --- Driver ---
+
+def prepare_db(db_path, venues=VENUES, seed=42):
+    store = DiaryStore(db_path)
+    store.migrate()
+    VenueStore(store).bulk_load(synthetic_venues(venues, 6, random.Random(seed)))
+    store.close()
+
+
+def run(plans, workers, db_path, batch_size=BATCH_SIZE, direct_writes=False):
+    """
+    One run with `workers` simulation processes and one writer; returns its report.
+    direct_writes is the baseline: no writer, each worker commits its own writes.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results, ready, go = ctx.Queue(), ctx.Queue(), ctx.Event()
+    requests = writer = writer_stopped = None
+    replies = [None] * workers
+    if not direct_writes:
+        requests, writer_results, writer_stopped = ctx.Queue(), ctx.Queue(), ctx.Event()
+        replies = [ctx.Queue() for _ in range(workers)]
+        writer = ctx.Process(target=writer_main, args=(db_path, requests, replies, writer_results, writer_stopped))
+        writer.start()
+    procs = [ctx.Process(target=worker_main, args=(w, db_path, plans[w::workers], batch_size, requests,
+                                                   replies[w], writer_stopped, ready, go, results))
+             for w in range(workers)]
+    for p in procs:
+        p.start()
+
+    def workers_alive():
+        # A writer killed before its finally block cannot set writer_stopped itself
+        if writer is not None and not writer.is_alive():
+            writer_stopped.set()
+        return any(p.is_alive() for p in procs)
+
+    finished = False
+    try:
+        # Process start-up and imports stay out of the measurement
+        for _ in procs:
+            _get(ready, workers_alive, "Simulation workers")
+        start = time.perf_counter()
+        go.set()
+        gathered = [_get(results, workers_alive, "Simulation workers") for _ in procs]
+        seconds = time.perf_counter() - start
+        failed = [latencies for _, latencies, _ in gathered if isinstance(latencies, BaseException)]
+        if failed:
+            raise RuntimeError(f"{len(failed)} simulation workers failed") from failed[0]
+        writer_report = None
+        if writer is not None:
+            requests.put(None)
+            writer_report = _get(writer_results, writer.is_alive, "Writer")
+            writer_report["busy_fraction"] = round(writer_report["busy_seconds"] / seconds, 3)
+        finished = True
+    finally:
+        for p in procs + ([writer] if writer else []):
+            if not finished:
+                p.terminate()
+            p.join()
+
+    stages = {}
+    for stage in STAGES + ('end_to_end',):
+        stages[stage] = summarize([x for _, latencies, _ in gathered for x in latencies[stage]])
+    return {
+        "workers": workers,
+        "writes": "direct" if direct_writes else "writer",
+        "users": len(plans),
+        "seconds": round(seconds, 3),
+        "users_per_sec": round(len(plans) / seconds, 1),
+        "recommended": sum(n for _, _, n in gathered),
+        "stages": stages,
+        "writer": writer_report,
+    }
+
+
+def worker_counts(max_workers):
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def scale(users=2000, max_workers=None, batch_size=BATCH_SIZE, seed=42, venues=VENUES, direct_writes=False):
+    """
+    Run the same population with 1, 2, 4 ... max_workers readers, each on a fresh database
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    plans = plan_users(users, seed)
+    report = {
+        "meta": {"users": users, "batch_size": batch_size, "seed": seed, "venues": venues,
+                 "cpus": os.cpu_count(), "group_max": GROUP_MAX, "direct_writes": direct_writes},
+        "runs": [],
+    }
+    for workers in worker_counts(max_workers):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'mass.db')
+            prepare_db(db_path, venues, seed)
+            result = run(plans, workers, db_path, batch_size, direct_writes)
+        base = report["runs"][0]["users_per_sec"] if report["runs"] else result["users_per_sec"]
+        result["speedup"] = round(result["users_per_sec"] / base, 2)
+        result["efficiency"] = round(result["speedup"] / workers, 2)
+        report["runs"].append(result)
+        print(format_run(result), file=sys.stderr)
+    return report
+
+
+def format_run(result):
+    p50 = "  ".join(f"{stage} {result['stages'][stage].get('p50_ms', 0):7.2f}" for stage in STAGES)
+    writer = f"writer busy {result['writer']['busy_fraction']:.0%}" if result['writer'] else "direct writes"
+    return (f"  {result['workers']:3d} workers  {result['users_per_sec']:8.1f} users/s  "
+            f"x{result['speedup']:.2f} ({result['efficiency']:.0%})  p50 ms: {p50}  {writer}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-process virtual user simulation (JSON report)")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--workers", type=int, help="largest worker count to try (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--venues", type=int, default=VENUES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--direct-writes", action="store_true",
+                        help="baseline without the writer: every worker commits its own writes")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = scale(args.users, args.workers, args.batch_size, args.seed, args.venues, args.direct_writes)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.out}")
+    else:
+        print(text)
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+from itertools import chain
+
+import numpy as np
+
+from execution.diary_db import DiaryStore, INSERT_PROFILE_SQL
+from execution.gap_engine import GapEngine, NUTRIENTS
+from execution.venue_store import VenueStore
+from execution.bench.cohort import generate_cohort, iter_meal_chunks, food_popularity, DAY_SECONDS
+from execution.bench_venue_store import synthetic_venues, CITY_BOUNDS
+from execution.food_catalog import FOOD_DATABASE
+from execution import metrics
+
+STAGES = ('load', 'diary', 'gaps', 'recommend')
+# Generated diaries end on a fixed day so a seed reproduces the same data on any date
+DEFAULT_END_DAY = "2024-06-30"
+DIARY_MIX = (('add_meal', 0.5), ('range_totals', 0.3), ('meals_between', 0.2))
+
+
+def summarize(latencies, seconds=None):
+    """
+    Latency percentiles in milliseconds (plus throughput when the wall time is known)
+    """
+    samples = np.asarray(latencies) * 1000.0
+    if not len(samples):
+        return {"count": 0}
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+    summary = {
+        "count": int(len(samples)),
+        "mean_ms": round(float(samples.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p90_ms": round(float(p90), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(samples.max()), 3),
+    }
+    if seconds:
+        summary["ops_per_sec"] = round(len(samples) / seconds, 1)
+    return summary
+
+
+class Pacer:
+    """
+    Open-loop schedule at `rate` ops/s (None = as fast as possible)
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.start = time.perf_counter()
+        self.count = 0
+
+    def wait(self):
+        if self.interval:
+            delay = self.start + self.count * self.interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self.count += 1
+
+
+class BenchRun:
+    def __init__(self, store, users, days, seed, rate, ops, end_day=DEFAULT_END_DAY):
+        self.store = store
+        self.users = users
+        self.days = days
+        self.seed = seed
+        self.rate = rate
+        self.ops = ops
+        self.rng = np.random.default_rng([seed, 3])
+        self.py_rng = random.Random(seed)
+        last_day = datetime.fromisoformat(end_day).replace(tzinfo=timezone.utc)
+        today = int(last_day.timestamp())
+        self.start_epoch = today - (days - 1) * DAY_SECONDS
+        self.end_epoch = today + DAY_SECONDS
+        self.cohort = generate_cohort(users, seed)
+        self.first_user_id = None
+        self.gap_result = None
+
+    def stage_load(self):
+        conn = self.store.connection()
+        start = time.perf_counter()
+        with self.store.transaction():
+            base = conn.execute("SELECT IFNULL(MAX(id), 0) FROM user_profile").fetchone()[0]
+            conn.executemany(INSERT_PROFILE_SQL, self.cohort.profiles())
+        profile_s = time.perf_counter() - start
+        self.first_user_id = base + 1
+
+        chunks = iter_meal_chunks(self.cohort, self.days, self.start_epoch, self.first_user_id, self.seed)
+        stats = self.store.bulk_insert_meals(chain.from_iterable(chunks))
+        return {
+            "profiles": self.users,
+            "profiles_per_sec": round(self.users / profile_s, 1),
+            "meals": stats["rows"],
+            "meals_per_sec": round(stats["rows_per_sec"], 1),
+            "seconds": round(profile_s + stats["seconds"], 3),
+        }
+
+    def _random_user(self):
+        return self.first_user_id + int(self.rng.integers(0, self.users))
+
+    def stage_diary(self):
+        names, probs = food_popularity(self.seed)
+        names = names.tolist()
+        ops = [name for name, _ in DIARY_MIX]
+        choices = self.rng.choice(len(ops), self.ops, p=[w for _, w in DIARY_MIX])
+        latencies = {name: [] for name in ops}
+        start_day = datetime.fromtimestamp(self.end_epoch - 7 * DAY_SECONDS, timezone.utc).date()
+        end_day = datetime.fromtimestamp(self.end_epoch - 1, timezone.utc).date()
+
+        pacer = Pacer(self.rate)
+        start = time.perf_counter()
+        for choice in choices:
+            op = ops[choice]
+            user_id = self._random_user()
+            pacer.wait()
+            t0 = time.perf_counter()
+            if op == 'add_meal':
+                food = names[int(self.rng.choice(len(names), p=probs))]
+                data = FOOD_DATABASE[food]
+                # A draw that repeats a logged (user, second, food) is stored a second later
+                self.store.add_meal(food, data['calories'], data['protein'], data['fat'], data['carbs'],
+                                    timestamp=int(self.end_epoch - self.rng.integers(1, DAY_SECONDS)),
+                                    user_id=user_id)
+            elif op == 'range_totals':
+                self.store.get_range_totals(user_id, start_day, end_day)
+            else:
+                self.store.meals_between(user_id, self.end_epoch - DAY_SECONDS, self.end_epoch)
+            latencies[op].append(time.perf_counter() - t0)
+        seconds = time.perf_counter() - start
+        result = {op: summarize(samples) for op, samples in latencies.items()}
+        result["all"] = summarize(list(chain.from_iterable(latencies.values())), seconds)
+        return result
+
+    def stage_gaps(self):
+        engine = GapEngine(self.store)
+        now = self.end_epoch - 1
+        cohort_times = []
+        for _ in range(3):
+            t0 = time.perf_counter()
+            result = engine.cohort_gaps(day_fraction=0.6, now=now)
+            cohort_times.append(time.perf_counter() - t0)
+        self.gap_result = result
+
+        per_user = []
+        pacer = Pacer(self.rate)
+        start = time.perf_counter()
+        for _ in range(self.ops):
+            user_id = self._random_user()
+            pacer.wait()
+            t0 = time.perf_counter()
+            engine.missing_nutrients(user_id, day_fraction=0.6, now=now)
+            per_user.append(time.perf_counter() - t0)
+        return {
+            "cohort": dict(summarize(cohort_times), users_per_sec=round(self.users / min(cohort_times), 1)),
+            "per_user": summarize(per_user, time.perf_counter() - start),
+        }
+
+    def stage_recommend(self, venue_count=20000):
+        venues = VenueStore(self.store)
+        if venues.is_empty():
+            venues.bulk_load(synthetic_venues(venue_count, 6, self.py_rng))
+        missing = self.gap_result.missing_nutrients(0.2) if self.gap_result is not None else None
+        min_lat, max_lat, min_lon, max_lon = CITY_BOUNDS
+
+        latencies = []
+        pacer = Pacer(self.rate)
+        start = time.perf_counter()
+        for _ in range(self.ops):
+            i = int(self.rng.integers(0, self.users))
+            gaps = [NUTRIENTS[k] for k in np.flatnonzero(missing[i])] if missing is not None else ['protein']
+            lat = float(self.rng.uniform(min_lat, max_lat))
+            lon = float(self.rng.uniform(min_lon, max_lon))
+            pacer.wait()
+            t0 = time.perf_counter()
+            venues.find_nearby(lat, lon, gaps or ['protein'])
+            latencies.append(time.perf_counter() - t0)
+        return summarize(latencies, time.perf_counter() - start)
+
+
+def run(users=10000, days=7, seed=42, rate=None, ops=2000, stages=STAGES, db_path=None,
+        end_day=DEFAULT_END_DAY, with_metrics=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DiaryStore(db_path or os.path.join(tmp, 'bench.db'))
+        store.migrate()
+        bench = BenchRun(store, users, days, seed, rate, ops, end_day)
+        report = {
+            "meta": {
+                "users": users, "days": days, "end_day": end_day, "seed": seed, "rate": rate, "ops": ops,
+                "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                "numpy": np.__version__, "platform": platform.platform(),
+                "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            },
+            "stages": {},
+        }
+        # Later stages read the cohort the load stage wrote
+        for stage in ('load',) + tuple(s for s in stages if s != 'load'):
+            report["stages"][stage] = getattr(bench, f"stage_{stage}")()
+        store.close()
+    if with_metrics:
+        report["metrics"] = metrics.snapshot()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FoodCoach synthetic load benchmark (JSON report)")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--end-day", default=DEFAULT_END_DAY, help="last generated day (UTC, YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rate", type=float, default=None, help="target ops/s per stage (default: unpaced)")
+    parser.add_argument("--ops", type=int, default=2000, help="operations per paced stage")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--db", help="keep the generated database at this path")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--metrics", action="store_true", help="add per-operation latency histograms to the report")
+    args = parser.parse_args()
+
+    if args.metrics:
+        metrics.enable()
+    report = run(args.users, args.days, args.seed, args.rate, args.ops,
+                 tuple(s for s in args.stages.split(",") if s), args.db, args.end_day, args.metrics)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.out}")
+    else:
+        print(text)
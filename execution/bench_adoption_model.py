@@ -0,0 +1,78 @@
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from execution.diary_db import DiaryStore
+from execution.adoption_model import AdoptionModel, OUTCOMES
+
+STATUSES = tuple(OUTCOMES)
+
+# Reference: what ranking costs when it re-aggregates feedback history per candidate
+AGGREGATE_SQL = '''
+SELECT SUM(status = 'accepted'), COUNT(*) FROM recommendations
+WHERE user_id = ? AND suggested_item = ? AND place_name = ? AND status IN ('accepted', 'rejected', 'ignored')
+'''
+
+
+def synthetic_feedback(events, users, places, items_per_place, seed=11):
+    rng = np.random.default_rng(seed)
+    user_ids = rng.integers(1, users + 1, events)
+    place_ids = rng.zipf(1.3, events) % places
+    item_ids = rng.integers(0, items_per_place, events)
+    statuses = rng.choice(len(STATUSES), events, p=(0.3, 0.3, 0.4))
+    start = 1717400000
+    for k, (u, p, i, s) in enumerate(zip(user_ids.tolist(), place_ids.tolist(), item_ids.tolist(),
+                                         statuses.tolist())):
+        yield u, f"item {p}-{i}", f"place {p}", STATUSES[s], start + k * 5
+
+
+def run_benchmark(events=500000, users=20000, places=2000, items_per_place=8, lookups=100000):
+    print(f"--- Adoption model benchmark: {events} feedback events ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DiaryStore(os.path.join(tmp, 'adoption.db'))
+        store.migrate()
+        feedback = list(synthetic_feedback(events, users, places, items_per_place))
+        with store.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO recommendations (user_id, suggested_item, place_name, status, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)", feedback)
+
+        model = AdoptionModel(store, clock=lambda: feedback[-1][4])
+        start = time.perf_counter()
+        for user_id, item, place, status, at in feedback:
+            model.observe(user_id, item, place, status, at)
+        learn_s = time.perf_counter() - start
+        model.flush()
+        print(f"  observe: {events / learn_s:,.0f} events/s ({len(model)} statistics, flushed every 256)")
+
+        rng = np.random.default_rng(5)
+        probes = [feedback[int(i)][:3] for i in rng.integers(0, events, lookups)]
+        start = time.perf_counter()
+        for user_id, item, place in probes:
+            model.score(user_id, item, place)
+        score_s = time.perf_counter() - start
+        print(f"  score: {lookups / score_s:,.0f} lookups/s ({score_s / lookups * 1e6:.1f} us each)")
+
+        conn = store.connection()
+        sample = probes[:2000]
+        start = time.perf_counter()
+        for user_id, item, place in sample:
+            conn.execute(AGGREGATE_SQL, (user_id, item, place)).fetchone()
+        agg_s = time.perf_counter() - start
+        print(f"  SQL aggregate per candidate (no index): {len(sample) / agg_s:,.0f} lookups/s")
+
+        start = time.perf_counter()
+        model.rebuild()
+        print(f"  rebuild from history: {time.perf_counter() - start:.2f}s")
+        store.close()
+        return {"observe_per_sec": events / learn_s, "score_per_sec": lookups / score_s}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark online adoption statistics")
+    parser.add_argument("--events", type=int, default=500000)
+    args = parser.parse_args()
+    run_benchmark(args.events)
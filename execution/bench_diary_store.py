@@ -0,0 +1,115 @@
+import os
+import time
+import sqlite3
+import tempfile
+import threading
+import argparse
+
+from execution.diary_db import DiaryStore, BASELINE_SCHEMA
+
+MEAL = ('Grilled Salmon', 450, 34, 28, 0)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LegacyDiary:
+    """
+    Today's pattern: open, execute, commit and close on every call
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def add_meal(self, food_name, calories, protein, fat, carbs):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO meal_diary (food_name, calories, protein, fat, carbs) VALUES (?, ?, ?, ?, ?)",
+            (food_name, calories, protein, fat, carbs),
+        )
+        conn.commit()
+        conn.close()
+
+    def recent_meals(self, limit=20):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        rows = conn.execute("SELECT * FROM meal_diary ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        conn.close()
+        return rows
+
+
+def create_schema(db_path):
+    conn = sqlite3.connect(db_path)
+    for statement in BASELINE_SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+
+
+def run_workload(diary, writers, inserts_per_writer):
+    read_latencies = []
+    done = threading.Event()
+
+    def writer():
+        for _ in range(inserts_per_writer):
+            diary.add_meal(*MEAL)
+
+    def reader():
+        while not done.is_set():
+            start = time.perf_counter()
+            diary.recent_meals(20)
+            read_latencies.append(time.perf_counter() - start)
+
+    reader_thread = threading.Thread(target=reader)
+    reader_thread.start()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    done.set()
+    reader_thread.join()
+
+    total = writers * inserts_per_writer
+    return {
+        "inserts_per_sec": total / elapsed,
+        "read_p50_ms": percentile(read_latencies, 50) * 1000,
+        "read_p99_ms": percentile(read_latencies, 99) * 1000,
+        "reads": len(read_latencies),
+    }
+
+
+def run_benchmark(writers=4, inserts_per_writer=500):
+    print(f"--- Diary store benchmark: {writers} writer threads x {inserts_per_writer} inserts ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        create_schema(legacy_path)
+        legacy = run_workload(LegacyDiary(legacy_path), writers, inserts_per_writer)
+
+        store = DiaryStore(os.path.join(tmp, 'store.db'))
+        store.init_schema()
+        pooled = run_workload(store, writers, inserts_per_writer)
+        store.close()
+
+    for label, result in (("connect-per-call", legacy), ("DiaryStore (WAL, pooled)", pooled)):
+        print(f"{label:>26}: {result['inserts_per_sec']:8.0f} inserts/s | "
+              f"read p50 {result['read_p50_ms']:.2f}ms p99 {result['read_p99_ms']:.2f}ms "
+              f"({result['reads']} reads)")
+    return {"legacy": legacy, "store": pooled}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare DiaryStore against connect-per-call")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--inserts", type=int, default=500)
+    args = parser.parse_args()
+    run_benchmark(args.writers, args.inserts)
@@ -0,0 +1,113 @@
+import sys
+import os
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+from execution.diary_db import DiaryStore
+from execution.export_diary import export_table, FORMATS, EXPORT_TABLES
+from execution.food_catalog import FOOD_DATABASE
+
+# Synthetic diary straight from SQL: every meal_diary trigger is dropped first, as the
+# export only reads the table and the outbox/rollup copies would triple the load time
+GENERATE_SQL = '''
+WITH RECURSIVE n(i) AS (SELECT ? UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+INSERT INTO meal_diary (user_id, timestamp, food_name, calories, protein, fat, carbs)
+SELECT 1 + i % 50000, 1700000000 + i * 13, f.name,
+       round(f.calories * (0.8 + (i % 41) / 100.0), 1), f.protein, f.fat, f.carbs
+FROM n JOIN bench_foods f ON f.k = (i * 7919) % (SELECT COUNT(*) FROM bench_foods)
+'''
+
+
+def peak_rss_mb():
+    # VmHWM is this process's own peak; on Linux ru_maxrss also carries over the
+    # parent's peak across fork + exec (the parent grew while generating the diary)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0     # KB on Linux
+
+
+def build_diary(path, rows, batch=1000000):
+    store = DiaryStore(path)
+    store.migrate()
+    conn = store.connection()
+    start = time.perf_counter()
+    with store.transaction():
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                    "AND tbl_name = 'meal_diary'").fetchall():
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.execute("CREATE TEMP TABLE bench_foods (k INTEGER PRIMARY KEY, name TEXT, calories FLOAT, "
+                     "protein FLOAT, fat FLOAT, carbs FLOAT)")
+        conn.executemany("INSERT INTO bench_foods VALUES (?, ?, ?, ?, ?, ?)",
+                         [(k, name, d['calories'], d['protein'], d['fat'], d['carbs'])
+                          for k, (name, d) in enumerate(sorted(FOOD_DATABASE.items()))])
+    have = store.max_id('meal_diary')
+    for first in range(have, rows, batch):
+        with store.transaction():
+            conn.execute(GENERATE_SQL, (first, min(first + batch, rows) - 1))
+    seconds = time.perf_counter() - start
+    store.close()
+    return seconds
+
+
+def child(mode, db_path, out_path):
+    """
+    Runs in a fresh interpreter so the peak RSS is the export's own
+    """
+    store = DiaryStore(db_path)
+    baseline = peak_rss_mb()
+    if mode == 'select_all':
+        start = time.perf_counter()
+        columns = ", ".join(name for name, _ in EXPORT_TABLES['meal_diary'])
+        rows = store.connection().execute(f"SELECT {columns} FROM meal_diary").fetchall()
+        stats = {"rows": len(rows), "seconds": time.perf_counter() - start, "bytes": 0}
+    else:
+        stats = export_table('meal_diary', out_path, mode, store=store)
+    stats.update(peak_rss_mb=peak_rss_mb(), interpreter_rss_mb=baseline)
+    print(json.dumps(stats))
+
+
+def run_child(mode, db_path, out_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-m", "execution.bench_export", "--child", mode, db_path, out_path],
+                            cwd=root, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(sizes=(1000000, 10000000), baseline_rows=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'export.db')
+        built = 0
+        for rows in sorted(sizes):
+            seconds = build_diary(db_path, rows)
+            built = rows
+            print(f"--- Export benchmark: {built:,} meal_diary rows "
+                  f"(generated in {seconds:.1f}s, {os.path.getsize(db_path) / 1e6:,.0f} MB database) ---")
+            for fmt in FORMATS:
+                out = os.path.join(tmp, f"meals.{fmt}")
+                stats = run_child(fmt, db_path, out)
+                print(f"  {fmt:8s} {stats['rows_per_sec']:>10,.0f} rows/s  {stats['bytes'] / 1e6:8,.1f} MB  "
+                      f"peak RSS {stats['peak_rss_mb']:6,.0f} MB (after imports {stats['interpreter_rss_mb']:,.0f})")
+                os.remove(out)
+            if rows <= baseline_rows:
+                stats = run_child('select_all', db_path, '')
+                print(f"  SELECT * fetchall: {stats['rows'] / stats['seconds']:,.0f} rows/s, "
+                      f"peak RSS {stats['peak_rss_mb']:,.0f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:5])
+        sys.exit(0)
+    parser = argparse.ArgumentParser(description="Benchmark streaming diary export (throughput and peak RSS)")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000000, 10000000])
+    args = parser.parse_args()
+    run_benchmark(args.rows)
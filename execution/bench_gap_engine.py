@@ -0,0 +1,99 @@
+import os
+import time
+import argparse
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+
+from execution.diary_db import DiaryStore, INSERT_PROFILE_SQL
+from execution.gap_engine import GapEngine, ACTIVITY_FACTOR, MIN_CALORIES, FAT_CALORIE_SHARE
+from execution.bench.cohort import generate_cohort, iter_meal_chunks
+
+GENDER_OFFSETS = {'male': 5.0, 'female': -161.0}
+GOALS = {'lose': (-500.0, 1.6), 'maintain': (0.0, 1.2), 'gain': (300.0, 2.0)}
+GOAL_NAMES = ('lose', 'maintain', 'gain')
+
+# Meals land on 2024-06-03 in Seoul; the gaps are read at 21:00 there
+DAY = int(datetime(2024, 6, 3, tzinfo=timezone.utc).timestamp())
+NOW = DAY + 12 * 3600
+
+
+def per_user_gaps(profiles, intake, day_fraction=1.0):
+    """
+    Reference: the straightforward one-user-at-a-time Python loop
+    """
+    gaps = {}
+    for (user_id, age, height, weight, gender, goal), eaten in zip(profiles, intake):
+        bmr = 10.0 * weight + 6.25 * height - 5.0 * age + GENDER_OFFSETS.get(gender, -78.0)
+        delta, protein_per_kg = GOALS[goal]
+        calories = max(bmr * ACTIVITY_FACTOR + delta, MIN_CALORIES)
+        protein = weight * protein_per_kg
+        fat = calories * FAT_CALORIE_SHARE / 9.0
+        carbs = max(calories - protein * 4.0 - fat * 9.0, 0.0) / 4.0
+        targets = (calories, protein, fat, carbs)
+        gaps[user_id] = [max(t * day_fraction - e, 0.0) for t, e in zip(targets, eaten)]
+    return gaps
+
+
+def populated_store(path, users, seed=7):
+    """
+    A diary with `users` generated profiles and one day of their meals (DAY in Seoul)
+    """
+    store = DiaryStore(path)
+    store.migrate()
+    cohort = generate_cohort(users, seed)
+    with store.transaction() as conn:
+        conn.executemany(INSERT_PROFILE_SQL, cohort.profiles())
+    for rows in iter_meal_chunks(cohort, 1, DAY, seed=seed):
+        store.bulk_insert_meals(rows)
+    return store
+
+
+def run_benchmark(users=100000, repeats=3):
+    print(f"--- Gap analysis benchmark: {users} users ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = populated_store(os.path.join(tmp, 'gaps.db'), users)
+        engine = GapEngine(store)
+
+        load_times, compute_times = [], []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            cohort = engine.load_cohort(now=NOW)
+            load_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            result = engine.compute_gaps(cohort)
+            compute_times.append(time.perf_counter() - start)
+        store.close()
+
+    # Same inputs as plain Python rows for the loop baseline
+    genders = {5.0: 'male', -161.0: 'female'}
+    profiles = [
+        (int(u), float(a), float(h), float(w), genders[g], GOAL_NAMES[c])
+        for u, a, h, w, g, c in zip(cohort.user_ids, cohort.age, cohort.height, cohort.weight,
+                                    cohort.gender_offset, cohort.goal_code)
+    ]
+    intake = cohort.intake.tolist()
+    start = time.perf_counter()
+    reference = per_user_gaps(profiles, intake)
+    loop_time = time.perf_counter() - start
+
+    assert cohort.intake[:, 0].any(), "no meals fell on the benchmark day"
+    sample = int(cohort.user_ids[users // 2])
+    assert np.allclose(list(result.for_user(sample).values()), reference[sample])
+
+    load, compute = min(load_times), min(compute_times)
+    total = min(l + c for l, c in zip(load_times, compute_times))
+    print(f"  load_cohort (SQLite):  {load * 1000:8.1f} ms")
+    print(f"  compute_gaps (NumPy):  {compute * 1000:8.1f} ms")
+    print(f"  end to end:            {total * 1000:8.1f} ms ({users / total:,.0f} users/s)")
+    print(f"  per-user Python loop:  {loop_time * 1000:8.1f} ms compute only ({users / loop_time:,.0f} users/s)")
+    print(f"  compute speedup: {loop_time / compute:.1f}x")
+    return {"load_s": load, "vectorized_s": compute, "end_to_end_s": total, "loop_s": loop_time}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gap analysis on a populated diary: load + vectorized compute")
+    parser.add_argument("--users", type=int, default=100000)
+    args = parser.parse_args()
+    run_benchmark(args.users)
@@ -0,0 +1,84 @@
+import sys
+import os
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BUDGET_MS = 100.0
+# Must not be imported just to parse the command line
+# What each subcommand imports once dispatched
+COMMAND_MODULES = (
+    ('init-db', 'execution.diary_db'), ('ingest', 'execution.ingest_diary'), ('export', 'execution.export_diary'),
+    ('simulate', 'execution.simulation_test'), ('stress', 'execution.stress_test_gemini'),
+)
+HEAVY_MODULES = ('numpy', 'aiohttp', 'requests', 'pyarrow', 'dotenv', 'PIL', 'sqlite3', 'http.server')
+
+
+def _run(args):
+    return subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def _wall_ms(args, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _run(args)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def import_profile(module="execution.cli"):
+    """
+    (self_us, cumulative_us, name) for every module `import <module>` loads,
+    parsed from `python -X importtime`; interpreter startup (site) is left out
+    """
+    rows = []
+    for line in _run(['-X', 'importtime', '-c', f'import {module}']).stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Children print before their parent; a top-level name closes a block
+        top_level = len(name) - len(name.lstrip()) <= 1
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+        if top_level and name.strip() != module:
+            rows = []
+    return rows
+
+
+def run_benchmark(runs=15, budget_ms=BUDGET_MS, top=10):
+    print(f"--- CLI cold start: median of {runs} runs ---")
+    profile = import_profile()
+    loaded = {name for _, _, name in profile}
+    heavy = [m for m in HEAVY_MODULES if m in loaded]
+    total_ms = profile[-1][1] / 1000
+    print(f"  import execution.cli: {total_ms:.1f} ms cumulative")
+    for self_us, cumulative_us, name in sorted(profile, key=lambda r: -r[0])[:top]:
+        print(f"    {self_us / 1000:6.2f} ms self {cumulative_us / 1000:7.2f} ms total  {name}")
+
+    for command, module in COMMAND_MODULES:
+        print(f"  {command:9s} {module:28s} {import_profile(module)[-1][1] / 1000:6.1f} ms")
+
+    interpreter = _wall_ms(['-c', 'pass'], runs)
+    help_ms = _wall_ms(['-m', 'execution.cli', '--help'], runs)
+    print(f"  python -c pass:               {interpreter:6.1f} ms")
+    print(f"  python -m execution.cli --help: {help_ms:6.1f} ms (budget {budget_ms:.0f} ms)")
+
+    failures = []
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+    if help_ms > budget_ms:
+        failures.append(f"--help took {help_ms:.1f} ms, over the {budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"  FAIL: {failure}")
+    return {"import_ms": total_ms, "interpreter_ms": interpreter, "help_ms": help_ms, "heavy": heavy,
+            "ok": not failures}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time regression check for the foodcoach CLI")
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = parser.parse_args()
+    sys.exit(0 if run_benchmark(args.runs, args.budget_ms)["ok"] else 1)
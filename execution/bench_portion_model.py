@@ -0,0 +1,62 @@
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from execution.diary_db import DiaryStore
+from execution.portion_model import PortionModel
+from execution.food_catalog import FOOD_DATABASE
+
+FOODS = sorted(FOOD_DATABASE)
+
+
+def run_benchmark(users=5000, corrections=50000, lookups=500000, seed=3):
+    print(f"--- Portion model benchmark: {users} users, {corrections} corrections ---")
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DiaryStore(os.path.join(tmp, 'portions.db'))
+        store.migrate()
+        # Each user has a true portion habit the corrections reveal
+        habit = rng.lognormal(0.0, 0.25, users + 1)
+        user_ids = rng.integers(1, users + 1, corrections).tolist()
+        food_ids = rng.integers(0, len(FOODS), corrections).tolist()
+        meals = [(u, 1700000000 + k * 60, FOODS[f], FOOD_DATABASE[FOODS[f]]['calories'], 10, 10, 10, None, None)
+                 for k, (u, f) in enumerate(zip(user_ids, food_ids))]
+        store.bulk_insert_meals(meals, upsert=False)
+
+        model = PortionModel(store)
+        noise = rng.lognormal(0.0, 0.1, corrections).tolist()
+        start = time.perf_counter()
+        for meal_id, (u, _, food, calories, *_) in enumerate(meals, 1):
+            model.record_correction(meal_id, calories=round(calories * habit[u] * noise[meal_id - 1], 1))
+        learn_s = time.perf_counter() - start
+        print(f"  record_correction: {corrections / learn_s:,.0f} corrections/s "
+              f"(meal update + delta rows + calibration, one transaction each)")
+
+        probe_users = rng.integers(1, users + 1, lookups).tolist()
+        probe_foods = [FOODS[i] for i in rng.integers(0, len(FOODS), lookups).tolist()]
+        start = time.perf_counter()
+        for u, food in zip(probe_users, probe_foods):
+            model.factor(u, food)
+        lookup_s = time.perf_counter() - start
+        print(f"  factor lookup: {lookups / lookup_s:,.0f} lookups/s ({lookup_s / lookups * 1e6:.2f} us each)")
+
+        learned = np.array([model.factor(u, None) for u in range(1, users + 1)])
+        error = np.abs(np.log(learned) - np.log(habit[1:]))
+        print(f"  user factor vs true habit: median |log error| {np.median(error):.3f}")
+
+        start = time.perf_counter()
+        model.rebuild()
+        print(f"  rebuild from meal_corrections: {time.perf_counter() - start:.2f}s")
+        store.close()
+        return {"corrections_per_sec": corrections / learn_s, "lookups_per_sec": lookups / lookup_s}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark portion calibration learning and lookups")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--corrections", type=int, default=50000)
+    args = parser.parse_args()
+    run_benchmark(args.users, args.corrections)
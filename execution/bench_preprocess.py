@@ -0,0 +1,116 @@
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+from PIL import Image, ImageFilter
+
+from execution.gemini_client import GeminiClient
+from execution.gemini_stub_server import GeminiStub, percentile
+from execution.vision_analyzer import (
+    FoodVisionAnalyzer, preprocess_image, preprocess_batch, MAX_DIMENSION, JPEG_QUALITY,
+)
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.heic')
+
+
+def synthetic_photos(directory, count=24, size=(4032, 3024)):
+    """
+    Phone-camera-sized JPEGs with EXIF, for when no sample directory is given
+    """
+    paths = []
+    for i in range(count):
+        img = Image.effect_noise((size[0] // 8, size[1] // 8), 60 + i).filter(ImageFilter.GaussianBlur(3))
+        img = Image.merge("RGB", (img, img.rotate(90, expand=False), img.transpose(Image.FLIP_LEFT_RIGHT)))
+        img = img.resize(size)
+        exif = Image.Exif()
+        exif[0x0112] = 6                 # orientation: rotate 90
+        exif[0x010F] = "FoodCoach Bench Camera"
+        path = os.path.join(directory, f"meal_{i:03d}.jpg")
+        img.save(path, "JPEG", quality=95, exif=exif)
+        paths.append(path)
+    return paths
+
+
+def photo_paths(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(PHOTO_EXTENSIONS)
+    )
+
+
+async def upload_latencies(paths, max_dimension, uplink_mbps):
+    """
+    End-to-end analyze_image latency against the local stub. The stub adds a fixed
+    model latency plus the time the payload would take on an uplink of uplink_mbps.
+    """
+    stub = GeminiStub(latency_ms=(150, 150))
+    base_url = await stub.start()
+    client = GeminiClient("stub-key", base_url=base_url, rpm=None, tpm=None)
+    analyzer = FoodVisionAnalyzer(client=client, max_dimension=max_dimension)
+    latencies, sent = [], 0
+    for path in paths:
+        start = time.perf_counter()
+        prepared = await asyncio.get_running_loop().run_in_executor(None, analyzer._prepare, path)
+        payload_bytes = len(prepared.data) * 4 // 3          # base64 expansion
+        await asyncio.sleep(payload_bytes * 8 / (uplink_mbps * 1e6))
+        await analyzer.analyze_image_async(path, prepared=prepared)
+        latencies.append(time.perf_counter() - start)
+        sent += payload_bytes
+    await client.close()
+    await stub.stop()
+    return latencies, sent
+
+
+def run_benchmark(directory=None, max_dimension=MAX_DIMENSION, quality=JPEG_QUALITY, workers=None,
+                  uplink_mbps=10.0):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = photo_paths(directory) if directory else synthetic_photos(tmp)
+        if not paths:
+            print(f"No photos found in {directory}")
+            return None
+        print(f"--- Preprocessing benchmark: {len(paths)} photos, max {max_dimension}px, q{quality} ---")
+
+        start = time.perf_counter()
+        serial = [preprocess_image(p, max_dimension, quality) for p in paths]
+        serial_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pooled = preprocess_batch(paths, max_dimension, quality, workers)
+        pool_s = time.perf_counter() - start
+
+        original = sum(p.original_bytes for p in serial)
+        prepared = sum(len(p.data) for p in pooled)
+        print(f"  bytes: {original / 1e6:.1f} MB -> {prepared / 1e6:.2f} MB "
+              f"({100.0 * (1 - prepared / original):.1f}% saved)")
+        print(f"  serial:       {len(paths) / serial_s:6.1f} images/s")
+        print(f"  process pool: {len(paths) / pool_s:6.1f} images/s ({workers or os.cpu_count()} workers)")
+
+        raw, raw_sent = asyncio.run(upload_latencies(paths, None, uplink_mbps))
+        small, small_sent = asyncio.run(upload_latencies(paths, max_dimension, uplink_mbps))
+        print(f"  end-to-end @ {uplink_mbps:g} Mbps uplink (p50 / p95):")
+        print(f"    original:     {percentile(raw, 50) * 1000:7.0f} / {percentile(raw, 95) * 1000:7.0f} ms, "
+              f"{raw_sent / 1e6:.1f} MB sent")
+        print(f"    preprocessed: {percentile(small, 50) * 1000:7.0f} / {percentile(small, 95) * 1000:7.0f} ms, "
+              f"{small_sent / 1e6:.2f} MB sent")
+        return {
+            "images": len(paths),
+            "original_bytes": original,
+            "prepared_bytes": prepared,
+            "serial_images_per_sec": len(paths) / serial_s,
+            "pool_images_per_sec": len(paths) / pool_s,
+            "p50_original_s": percentile(raw, 50),
+            "p50_preprocessed_s": percentile(small, 50),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark photo preprocessing before vision upload")
+    parser.add_argument("--dir", help="directory of sample photos (default: synthetic 12MP JPEGs)")
+    parser.add_argument("--max-dimension", type=int, default=MAX_DIMENSION)
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--uplink-mbps", type=float, default=10.0)
+    args = parser.parse_args()
+    run_benchmark(args.dir, args.max_dimension, args.quality, args.workers, args.uplink_mbps)
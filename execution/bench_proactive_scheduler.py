@@ -0,0 +1,72 @@
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from execution.diary_db import DiaryStore, INSERT_PROFILE_SQL
+from execution.gap_engine import GapEngine
+from execution.proactive_scheduler import ProactiveScheduler, SimClock
+from execution.bench.cohort import generate_cohort, iter_meal_chunks, DAY_SECONDS
+
+# 2024-06-03 12:00 KST, everyone's lunch prompt
+SEOUL = ZoneInfo('Asia/Seoul')
+LUNCH = int(datetime(2024, 6, 3, 12, 0, tzinfo=SEOUL).timestamp())
+
+
+def per_user_context(store, user_ids, day):
+    """
+    Reference: one gap query per prompted user
+    """
+    engine = GapEngine(store)
+    start = time.perf_counter()
+    for user_id in user_ids:
+        engine.missing_nutrients(user_id, day, day_fraction=0.35)
+    return time.perf_counter() - start
+
+
+def run_benchmark(users=100000, baseline_users=2000):
+    print(f"--- Proactive scheduler benchmark: 12:00 burst for {users} users ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DiaryStore(os.path.join(tmp, 'proactive.db'))
+        store.migrate()
+        cohort = generate_cohort(users)
+        with store.transaction() as conn:
+            conn.executemany(INSERT_PROFILE_SQL, cohort.profiles())
+        day_start = LUNCH - LUNCH % DAY_SECONDS
+        for rows in iter_meal_chunks(cohort, 1, day_start):
+            store.bulk_insert_meals(rows)
+
+        sent = 0
+
+        async def send(prompt):
+            nonlocal sent
+            sent += 1
+
+        scheduler = ProactiveScheduler(send, store, SimClock(LUNCH - 60))
+        start = time.perf_counter()
+        scheduler.load()
+        load_s = time.perf_counter() - start
+        print(f"  load + schedule: {load_s:.2f}s ({users / load_s:,.0f} users/s)")
+
+        start = time.perf_counter()
+        asyncio.run(scheduler.run(until=LUNCH))
+        burst_s = time.perf_counter() - start
+        print(f"  12:00 burst: {sent} prompts in {burst_s:.2f}s ({sent / burst_s:,.0f} prompts/s, "
+              f"{scheduler.stats['context_queries']} context queries, {scheduler.stats['ticks']} tick)")
+
+        day = datetime.fromtimestamp(LUNCH, SEOUL).date().isoformat()
+        base_s = per_user_context(store, range(1, baseline_users + 1), day)
+        print(f"  per-user context queries: {baseline_users / base_s:,.0f} users/s "
+              f"(~{users * base_s / baseline_users:.1f}s for the burst, before sending)")
+        store.close()
+        return {"load_s": load_s, "burst_s": burst_s, "prompts": sent}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the proactive prompt fan-out")
+    parser.add_argument("--users", type=int, default=100000)
+    args = parser.parse_args()
+    run_benchmark(args.users)
@@ -0,0 +1,78 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+
+import requests
+
+from execution.diary_db import DiaryStore
+from execution.postgrest_stub import PostgrestStub
+from execution.sync_engine import SyncEngine
+
+REMOTE_USER = "37db4252-0c14-4469-a1a5-f26d6feed6ef"
+
+
+def per_row_baseline(url, meals):
+    """
+    The former mass_test_automation path: one POST per meal
+    """
+    start = time.perf_counter()
+    for i, (_, timestamp, food_name, calories, protein, fat, carbs) in enumerate(meals):
+        requests.post(f"{url}/rest/v1/food_logs", json={
+            "user_id": REMOTE_USER, "food_name": food_name, "calories": calories,
+            "protein": protein, "fat": fat, "carbs": carbs, "meal_type": "Lunch",
+        })
+    return time.perf_counter() - start
+
+
+def run_benchmark(meals=50000, baseline_meals=1000, edits=500):
+    print(f"--- Sync benchmark: {meals} meals ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = PostgrestStub()
+        url = stub.start()
+        phone = DiaryStore(os.path.join(tmp, 'phone.db'))
+        laptop = DiaryStore(os.path.join(tmp, 'laptop.db'))
+        for store in (phone, laptop):
+            store.migrate()
+        phone_user = phone.add_profile(30, 175, 70, 'male', 'maintain')
+        laptop_user = laptop.add_profile(30, 175, 70, 'male', 'maintain')
+        rows = [(phone_user, 1600000000 + i * 1800, f"food {i % 300}", 300 + i % 200, 20, 10, 35)
+                for i in range(meals)]
+        phone.bulk_insert_meals(rows)
+
+        a = SyncEngine(phone_user, REMOTE_USER, phone, base_url=url, api_key="bench")
+        b = SyncEngine(laptop_user, REMOTE_USER, laptop, base_url=url, api_key="bench")
+
+        push = a.sync()
+        print(f"  initial push: {push['pushed']} rows in {push['seconds']:.2f}s "
+              f"({push['rows_per_sec']:,.0f} rows/s, {push['round_trips']} round trips)")
+        pull = b.sync()
+        print(f"  fresh device pull: {pull['pulled']} rows in {pull['seconds']:.2f}s "
+              f"({pull['rows_per_sec']:,.0f} rows/s, {pull['round_trips']} round trips)")
+
+        # Edits on both sides, some of the same meals, then an incremental sync each way
+        rng = random.Random(3)
+        ids = [r[0] for r in laptop.connection().execute("SELECT id FROM meal_diary")]
+        for meal_id in rng.sample(ids, edits):
+            laptop.update_meal(meal_id, calories=rng.randint(100, 900))
+        b_inc = b.sync()
+        ids = [r[0] for r in phone.connection().execute("SELECT id FROM meal_diary")]
+        for meal_id in rng.sample(ids, edits):
+            phone.update_meal(meal_id, calories=rng.randint(100, 900))
+        a_inc = a.sync()
+        print(f"  incremental: laptop pushed {b_inc['pushed']} ({b_inc['round_trips']} round trips); "
+              f"phone pulled {a_inc['pulled']}, pushed {a_inc['pushed']}, {a_inc['conflicts']} conflicts "
+              f"({a_inc['round_trips']} round trips)")
+
+        base_s = per_row_baseline(url, rows[:baseline_meals])
+        print(f"  per-row POST baseline: {baseline_meals / base_s:,.0f} rows/s, 1 round trip per row")
+        stub.stop()
+        return {"push": push, "pull": pull, "baseline_rows_per_sec": baseline_meals / base_s}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the diary <-> food_logs sync engine")
+    parser.add_argument("--meals", type=int, default=50000)
+    args = parser.parse_args()
+    run_benchmark(args.meals)
@@ -0,0 +1,76 @@
+import os
+import time
+import random
+import tempfile
+import argparse
+
+from execution.diary_db import DiaryStore
+from execution.venue_store import VenueStore
+
+# Synthetic city roughly the size of Seoul
+CITY_BOUNDS = (37.45, 37.65, 126.85, 127.15)
+MENU_TEMPLATES = (
+    ("Protein Shake", 160, 24, 3, 9), ("Greek Yogurt", 150, 15, 4, 12), ("Chicken Salad", 380, 32, 20, 16),
+    ("Kimbap", 420, 12, 10, 70), ("Bibimbap", 540, 24, 18, 72), ("Americano", 10, 1, 0, 2),
+    ("Tofu Bowl", 420, 22, 14, 48), ("Egg Sandwich", 350, 16, 18, 30), ("Banana", 105, 1, 0, 27),
+    ("Ramen", 500, 10, 20, 70), ("Beef Soup", 450, 30, 20, 20), ("Fruit Cup", 120, 1, 0, 30),
+)
+GAP_CHOICES = (["protein"], ["carbs"], ["protein", "fat"], ["calories"])
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def synthetic_venues(venue_count, items_per_venue, rng):
+    min_lat, max_lat, min_lon, max_lon = CITY_BOUNDS
+    for venue_id in range(1, venue_count + 1):
+        menu = []
+        for name, calories, protein, fat, carbs in rng.sample(MENU_TEMPLATES, items_per_venue):
+            scale = rng.uniform(0.7, 1.3)
+            menu.append((name, calories * scale, protein * scale, fat * scale, carbs * scale,
+                         rng.randrange(1500, 15000, 100)))
+        yield (venue_id, f"Venue {venue_id}", rng.choice(("cafe", "restaurant", "convenience_store")),
+               rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon), menu)
+
+
+def run_benchmark(menu_items=1000000, items_per_venue=10, queries=2000, radius_m=500, seed=42):
+    rng = random.Random(seed)
+    venue_count = menu_items // items_per_venue
+    print(f"--- Venue search benchmark: {venue_count} venues, {venue_count * items_per_venue} menu items, "
+          f"radius {radius_m}m ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DiaryStore(os.path.join(tmp, 'venues.db'))
+        store.migrate()
+        venues = VenueStore(store)
+
+        start = time.perf_counter()
+        venues.bulk_load(synthetic_venues(venue_count, items_per_venue, rng))
+        print(f"  loaded in {time.perf_counter() - start:.1f}s")
+
+        min_lat, max_lat, min_lon, max_lon = CITY_BOUNDS
+        latencies = []
+        returned = 0
+        for _ in range(queries):
+            lat, lon = rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)
+            gaps = rng.choice(GAP_CHOICES)
+            start = time.perf_counter()
+            results = venues.find_nearby(lat, lon, gaps, radius_m=radius_m)
+            latencies.append(time.perf_counter() - start)
+            returned += len(results)
+        store.close()
+
+    p50, p99 = percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000
+    print(f"  {queries} queries: p50 {p50:.2f}ms  p99 {p99:.2f}ms  max {max(latencies) * 1000:.2f}ms "
+          f"(avg {returned / queries:.1f} results)")
+    return {"p50_ms": p50, "p99_ms": p99}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nearby menu search latency on synthetic venues")
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--radius", type=int, default=500)
+    args = parser.parse_args()
+    run_benchmark(args.items, queries=args.queries, radius_m=args.radius)
@@ -0,0 +1,78 @@
+import time
+import asyncio
+import argparse
+import tempfile
+
+from execution.gemini_client import GeminiClient
+from execution.gemini_stub_server import GeminiStub, percentile
+from execution.vision_analyzer import FoodVisionAnalyzer, MAX_IMAGES_PER_REQUEST
+from execution.bench_preprocess import synthetic_photos, photo_paths
+
+
+async def per_photo(analyzer, paths):
+    """
+    Today's camera-roll back-fill: one model call per photo, all launched at once
+    """
+    start = time.perf_counter()
+    latencies = []
+
+    async def one(path):
+        await analyzer.analyze_image_async(path)
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(path) for path in paths))
+    return latencies
+
+
+async def batched(analyzer, paths, max_images):
+    start = time.perf_counter()
+    latencies = []
+    async for _, result in analyzer.analyze_batch_async(paths, max_images=max_images):
+        assert "error" not in result, result
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_mode(mode, paths, rpm, server_rpm, max_images, batch_drop):
+    # Model latency grows with the images in a request, as it does on the real API
+    stub = GeminiStub(latency_ms=(400, 800), per_image_ms=60, server_rpm=server_rpm,
+                      batch_drop=batch_drop, seed=11)
+    base_url = await stub.start()
+    client = GeminiClient("stub-key", base_url=base_url, rpm=rpm, tpm=None, base_delay=0.2, max_delay=5.0)
+    analyzer = FoodVisionAnalyzer(client=client)
+    if mode == "per_photo":
+        latencies = await per_photo(analyzer, paths)
+    else:
+        latencies = await batched(analyzer, paths, max_images)
+    await client.close()
+    await stub.stop()
+    return latencies, client.stats.as_dict()
+
+
+def run_benchmark(directory=None, photos=24, rpm=15, server_rpm=None, max_images=MAX_IMAGES_PER_REQUEST,
+                  batch_drop=0.05):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = photo_paths(directory) if directory else synthetic_photos(tmp, photos, (1600, 1200))
+        print(f"--- Vision back-fill: {len(paths)} photos, {rpm} RPM, up to {max_images} images/request ---")
+        report = {}
+        for mode in ("per_photo", "batched"):
+            latencies, stats = asyncio.run(run_mode(mode, paths, rpm, server_rpm, max_images, batch_drop))
+            report[mode] = {"p50_s": percentile(latencies, 50), "p95_s": percentile(latencies, 95),
+                            "total_s": max(latencies), **stats}
+            print(f"  {mode:9s}: {stats['requests']:3d} requests ({stats['throttled']} throttled), "
+                  f"per-image p50 {percentile(latencies, 50):6.2f}s  p95 {percentile(latencies, 95):6.2f}s  "
+                  f"all done {max(latencies):6.2f}s")
+        return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="One call per photo vs packed multi-image requests")
+    parser.add_argument("--dir", help="directory of sample photos (default: synthetic)")
+    parser.add_argument("--photos", type=int, default=24)
+    parser.add_argument("--rpm", type=int, default=15)
+    parser.add_argument("--server-rpm", type=int, default=None)
+    parser.add_argument("--max-images", type=int, default=MAX_IMAGES_PER_REQUEST)
+    parser.add_argument("--batch-drop", type=float, default=0.05,
+                        help="share of images the stub leaves out of batch answers")
+    args = parser.parse_args()
+    run_benchmark(args.dir, args.photos, args.rpm, args.server_rpm, args.max_images, args.batch_drop)
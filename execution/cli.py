@@ -0,0 +1,109 @@
+import sys
+import argparse
+
+# Only argparse is imported up front. Each command imports the modules it runs
+# (numpy, aiohttp, pyarrow, dotenv come in through them), so `foodcoach --help`
+# and the light commands start without paying for the heavy ones.
+# bench_import_time.py guards this.
+
+EXPORT_FORMATS = ('parquet', 'arrow', 'csv')
+
+
+def _open_store(db_path):
+    from execution.diary_db import init_db
+    return init_db(db_path) if db_path else init_db()
+
+
+def cmd_init_db(args):
+    store = _open_store(args.db)
+    print(f"Schema version {store.schema_version()}")
+
+
+def cmd_simulate(args):
+    if args.users is None:
+        from execution.simulation_test import run_simulation
+        run_simulation()
+        return
+    import json
+    from execution.bench.mass_simulation import scale
+    report = scale(args.users, args.workers, direct_writes=args.direct_writes)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.out}")
+    else:
+        print(text)
+
+
+def _chunk_size(args):
+    # Left unset, the command module's own default applies
+    return {"chunk_size": args.chunk_size} if args.chunk_size else {}
+
+
+def cmd_ingest(args):
+    from execution.ingest_diary import run_ingest
+    run_ingest(args.path, store=_open_store(args.db), **_chunk_size(args))
+
+
+def cmd_stress(args):
+    from execution.stress_test_gemini import run_stress_test
+    run_stress_test(args.requests, args.metrics_json)
+
+
+def cmd_export(args):
+    from execution.export_diary import export_table
+    stats = export_table(args.table, args.path, args.format, args.incremental, args.feed,
+                         store=_open_store(args.db), **_chunk_size(args))
+    print(f"Exported {stats['rows']} {args.table} rows (id {stats['from_id']}..{stats['to_id']}) to {args.path} "
+          f"in {stats['chunks']} chunks ({stats['seconds']:.2f}s, {stats['rows_per_sec']:.0f} rows/s, "
+          f"{stats['bytes'] / 1e6:.1f} MB)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="foodcoach", description="FoodCoach execution layer")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    init_db = subparsers.add_parser("init-db", help="create the diary database or apply pending migrations")
+    init_db.add_argument("--db", help="database file (default: foodcoach.db in the repo root)")
+    init_db.set_defaults(handler=cmd_init_db)
+
+    simulate = subparsers.add_parser("simulate", help="run the virtual user simulation")
+    simulate.add_argument("--users", type=int, help="simulate this many users across a process pool")
+    simulate.add_argument("--workers", type=int, help="with --users: largest worker count (default: CPU count)")
+    simulate.add_argument("--direct-writes", action="store_true",
+                          help="with --users: workers commit their own writes instead of using the writer queue")
+    simulate.add_argument("--out", help="with --users: write the JSON scaling report here instead of stdout")
+    simulate.set_defaults(handler=cmd_simulate)
+
+    ingest = subparsers.add_parser("ingest", help="bulk import a historical meal diary (CSV or JSONL)")
+    ingest.add_argument("path")
+    ingest.add_argument("--db")
+    ingest.add_argument("--chunk-size", type=int, help="rows per transaction (default: DEFAULT_CHUNK_SIZE)")
+    ingest.set_defaults(handler=cmd_ingest)
+
+    stress = subparsers.add_parser("stress", help="probe the Gemini plan's rate limits")
+    stress.add_argument("--requests", type=int, default=20)
+    stress.add_argument("--metrics-json", help="write request/upstream latency histograms to this file")
+    stress.set_defaults(handler=cmd_stress)
+
+    export = subparsers.add_parser("export", help="stream a diary table to Parquet, Arrow IPC or CSV")
+    export.add_argument("table", help="meal_diary or recommendations")
+    export.add_argument("path", help="output file; the format follows its extension")
+    export.add_argument("--db")
+    export.add_argument("--format", choices=EXPORT_FORMATS, help="override the format implied by the extension")
+    export.add_argument("--incremental", action="store_true", help="only rows added since the last incremental run")
+    export.add_argument("--feed", help="watermark name, to keep separate incremental feeds")
+    export.add_argument("--chunk-size", type=int, help="rows per batch (default: EXPORT_CHUNK_SIZE)")
+    export.set_defaults(handler=cmd_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
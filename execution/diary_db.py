@@ -1,14 +1,125 @@
+import re
 import sqlite3
 import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import islice
+from contextlib import contextmanager
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from execution.metrics import timed, timer, count
+from execution.food_catalog import normalize
 
 DB_PATH = os.path.join(os.path.dirname(__file__), '../foodcoach.db')
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+MMAP_SIZE = 268435456
+
+# Connection tuning applied to every pooled connection.
+# WAL lets readers run alongside a single writer instead of serializing on the
+# rollback journal lock; NORMAL sync is durable across app crashes in WAL mode.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",      # ~16MB page cache per connection
+    f"PRAGMA mmap_size={MMAP_SIZE}",    # 256MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+BUSY_TIMEOUT = 5.0
+# Other processes wait this long for a running migration (the v3 rebuild copies in batches)
+MIGRATION_LOCK_TIMEOUT = 600.0
+STATEMENT_CACHE_SIZE = 256
+
+# SQL is kept as module constants so sqlite3's per-connection statement cache
+# reuses the prepared statement on every call.
+INSERT_PROFILE_SQL = '''
+INSERT INTO user_profile (age, height, weight, gender, goal)
+VALUES (?, ?, ?, ?, ?)
+'''
+
+# A taken (user, second, food) slot inserts nothing; add_meal moves on to the next second
+INSERT_MEAL_SQL = '''
+INSERT INTO meal_diary (food_name, calories, protein, fat, carbs, timestamp, image_url, correction_log, user_id)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, timestamp, food_name) DO NOTHING
+'''
+
+MEAL_COLUMNS = ('user_id', 'timestamp', 'food_name', 'calories', 'protein', 'fat', 'carbs',
+                'image_url', 'correction_log')
+
+BULK_INSERT_MEAL_SQL = '''
+INSERT INTO meal_diary (user_id, timestamp, food_name, calories, protein, fat, carbs, image_url, correction_log)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Re-importing the same (user, timestamp, food_name) updates in place, and only
+# touches the row when a value actually changed.
+BULK_UPSERT_MEAL_SQL = BULK_INSERT_MEAL_SQL + '''
+ON CONFLICT (user_id, timestamp, food_name) DO UPDATE SET
+    calories = excluded.calories,
+    protein = excluded.protein,
+    fat = excluded.fat,
+    carbs = excluded.carbs,
+    image_url = excluded.image_url,
+    correction_log = excluded.correction_log
+WHERE calories IS NOT excluded.calories
+   OR protein IS NOT excluded.protein
+   OR fat IS NOT excluded.fat
+   OR carbs IS NOT excluded.carbs
+   OR image_url IS NOT excluded.image_url
+   OR correction_log IS NOT excluded.correction_log
+'''
+
+DEFAULT_CHUNK_SIZE = 5000
+EXPORT_CHUNK_SIZE = 50000
+
+# Keyset page for streaming reads: each page is its own short read that resumes
+# after the last id seen, so no cursor or snapshot stays open between pages.
+KEYSET_PAGE_SQL = '''
+SELECT {columns} FROM {table} WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+'''
+
+INSERT_RECOMMENDATION_SQL = '''
+INSERT INTO recommendations (suggested_item, place_name, status, user_id)
+VALUES (?, ?, ?, ?)
+'''
+
+UPDATE_RECOMMENDATION_SQL = '''
+UPDATE recommendations SET status = ?, rejection_reason = ? WHERE id = ?
+'''
+
+SELECT_PROFILE_SQL = '''
+SELECT id, age, height, weight, gender, goal, timezone, created_at FROM user_profile WHERE id = ?
+'''
+
+SELECT_RECENT_MEALS_SQL = '''
+SELECT id, user_id, timestamp, food_name, calories, protein, fat, carbs, image_url, correction_log
+FROM meal_diary ORDER BY id DESC LIMIT ?
+'''
+
+# Served by idx_meal_diary_user_time_food (user_id = ? AND timestamp range)
+SELECT_MEALS_BETWEEN_SQL = '''
+SELECT id, user_id, timestamp, food_name, calories, protein, fat, carbs, image_url, correction_log
+FROM meal_diary WHERE user_id = ? AND timestamp >= ? AND timestamp < ?
+ORDER BY timestamp
+'''
+
+# Served by idx_recommendations_user_status
+SELECT_RECOMMENDATIONS_BY_STATUS_SQL = '''
+SELECT id, user_id, timestamp, suggested_item, place_name, status, rejection_reason, adoption_rate_impact
+FROM recommendations WHERE user_id = ? AND status = ?
+'''
+
+# --- Schema migrations ---
+# The applied version is tracked in PRAGMA user_version. Each entry runs once,
+# in order; append new versions, never edit shipped ones.
+
+BASELINE_SCHEMA = (
     # User Profile Table
-    cursor.execute('''
+    '''
     CREATE TABLE IF NOT EXISTS user_profile (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         age INTEGER,
@@ -18,10 +129,9 @@ def init_db():
         goal TEXT, -- 'lose', 'gain', 'maintain'
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
-    ''')
-    
+    ''',
     # Meal Diary Table
-    cursor.execute('''
+    '''
     CREATE TABLE IF NOT EXISTS meal_diary (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -33,10 +143,9 @@ def init_db():
         image_url TEXT,
         correction_log TEXT -- 'user changed 200kcal to 250kcal'
     )
-    ''')
-    
+    ''',
     # Recommendation Feedback (Self-Evolution KPI)
-    cursor.execute('''
+    '''
     CREATE TABLE IF NOT EXISTS recommendations (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -46,11 +155,1042 @@ def init_db():
         rejection_reason TEXT,
         adoption_rate_impact FLOAT DEFAULT 0.0
     )
-    ''')
-    
-    conn.commit()
-    conn.close()
-    print(f"Database initialized at {DB_PATH}")
+    ''',
+)
+
+EPOCH_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+# TEXT timestamps ('2024-02-17 12:30:00', ISO with 'T' or offset) become epoch seconds
+EPOCH_FROM_TIMESTAMP = (
+    "CASE WHEN typeof(timestamp) IN ('integer', 'real') THEN CAST(timestamp AS INTEGER) "
+    "ELSE CAST(strftime('%s', timestamp) AS INTEGER) END"
+)
+
+MEAL_DIARY_V3 = f'''
+CREATE TABLE meal_diary_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    timestamp INTEGER DEFAULT ({EPOCH_NOW}), -- epoch seconds (UTC)
+    food_name TEXT,
+    calories FLOAT,
+    protein FLOAT,
+    fat FLOAT,
+    carbs FLOAT,
+    image_url TEXT,
+    correction_log TEXT
+)
+'''
+
+RECOMMENDATIONS_V3 = f'''
+CREATE TABLE recommendations_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    timestamp INTEGER DEFAULT ({EPOCH_NOW}), -- epoch seconds (UTC)
+    suggested_item TEXT,
+    place_name TEXT,
+    status TEXT, -- 'pending', 'accepted', 'rejected', 'ignored'
+    rejection_reason TEXT,
+    adoption_rate_impact FLOAT DEFAULT 0.0
+)
+'''
+
+# The unique (user_id, timestamp, food_name) key doubles as the (user_id, timestamp)
+# range index for "today" / "last 7 days" queries, so no separate index is kept.
+MEAL_DIARY_INDEXES = (
+    '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_meal_diary_user_time_food
+    ON meal_diary (user_id, timestamp, food_name)
+    ''',
+)
+
+RECOMMENDATIONS_INDEXES = (
+    '''
+    CREATE INDEX IF NOT EXISTS idx_recommendations_user_status
+    ON recommendations (user_id, status)
+    ''',
+)
+
+MIGRATION_BATCH_SIZE = 10000
+
+# --- Daily rollup ---
+# daily_totals holds one row per (user, local day) and is kept in step with meal_diary
+# by triggers, so score-card and trend queries read O(days) rows instead of O(meals).
+# The day is the calendar date in the user's user_profile.timezone (DEFAULT_TIMEZONE
+# when unset), computed by the local_day() function every pooled connection registers;
+# a connection opened without DiaryStore cannot write meal_diary. Schema v4 to v11
+# keyed the rollup by UTC day; v12 rebuilt it.
+
+UTC_DAY_OF = "date({ref}.timestamp, 'unixepoch')"
+DAY_OF = "local_day({ref}.timestamp, (SELECT timezone FROM user_profile WHERE id = {ref}.user_id))"
+
+DAILY_TOTALS_TABLE = '''
+CREATE TABLE IF NOT EXISTS daily_totals (
+    user_id INTEGER NOT NULL,
+    day TEXT NOT NULL, -- 'YYYY-MM-DD', local day in the user's user_profile.timezone
+    meal_count INTEGER NOT NULL DEFAULT 0,
+    calories FLOAT NOT NULL DEFAULT 0,
+    protein FLOAT NOT NULL DEFAULT 0,
+    fat FLOAT NOT NULL DEFAULT 0,
+    carbs FLOAT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+) WITHOUT ROWID
+'''
+
+_ROLLUP_ADD = '''
+    INSERT INTO daily_totals (user_id, day, meal_count, calories, protein, fat, carbs)
+    VALUES (NEW.user_id, {day}, 1, IFNULL(NEW.calories, 0), IFNULL(NEW.protein, 0),
+            IFNULL(NEW.fat, 0), IFNULL(NEW.carbs, 0))
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        meal_count = meal_count + 1,
+        calories = calories + excluded.calories,
+        protein = protein + excluded.protein,
+        fat = fat + excluded.fat,
+        carbs = carbs + excluded.carbs;
+'''
+
+_ROLLUP_SUBTRACT = '''
+    UPDATE daily_totals SET
+        meal_count = meal_count - 1,
+        calories = calories - IFNULL(OLD.calories, 0),
+        protein = protein - IFNULL(OLD.protein, 0),
+        fat = fat - IFNULL(OLD.fat, 0),
+        carbs = carbs - IFNULL(OLD.carbs, 0)
+    WHERE user_id = OLD.user_id AND day = {day};
+    DELETE FROM daily_totals WHERE user_id = OLD.user_id AND day = {day} AND meal_count <= 0;
+'''
+
+_ROLLUP_COLUMNS = "user_id, timestamp, calories, protein, fat, carbs"
+_NEW_COUNTED = "NEW.user_id IS NOT NULL AND NEW.timestamp IS NOT NULL"
+_OLD_COUNTED = "OLD.user_id IS NOT NULL AND OLD.timestamp IS NOT NULL"
+
+
+
+def _rollup_triggers(day_of):
+    add = _ROLLUP_ADD.format(day=day_of.format(ref='NEW'))
+    subtract = _ROLLUP_SUBTRACT.format(day=day_of.format(ref='OLD'))
+    return (
+        ("meal_diary_rollup_insert", f'''
+        CREATE TRIGGER IF NOT EXISTS meal_diary_rollup_insert AFTER INSERT ON meal_diary
+        WHEN {_NEW_COUNTED}
+        BEGIN {add} END
+        '''),
+        ("meal_diary_rollup_delete", f'''
+        CREATE TRIGGER IF NOT EXISTS meal_diary_rollup_delete AFTER DELETE ON meal_diary
+        WHEN {_OLD_COUNTED}
+        BEGIN {subtract} END
+        '''),
+        # A correction moves the old values out of their day and the new values in
+        ("meal_diary_rollup_update_old", f'''
+        CREATE TRIGGER IF NOT EXISTS meal_diary_rollup_update_old AFTER UPDATE OF {_ROLLUP_COLUMNS} ON meal_diary
+        WHEN {_OLD_COUNTED}
+        BEGIN {subtract} END
+        '''),
+        ("meal_diary_rollup_update_new", f'''
+        CREATE TRIGGER IF NOT EXISTS meal_diary_rollup_update_new AFTER UPDATE OF {_ROLLUP_COLUMNS} ON meal_diary
+        WHEN {_NEW_COUNTED}
+        BEGIN {add} END
+        '''),
+    )
+
+
+ROLLUP_TRIGGERS = _rollup_triggers(DAY_OF)
+
+REBUILD_ROLLUP_SQL = '''
+INSERT INTO daily_totals (user_id, day, meal_count, calories, protein, fat, carbs)
+SELECT m.user_id, {day} AS day, COUNT(*), IFNULL(SUM(m.calories), 0),
+       IFNULL(SUM(m.protein), 0), IFNULL(SUM(m.fat), 0), IFNULL(SUM(m.carbs), 0)
+FROM meal_diary m LEFT JOIN user_profile p ON p.id = m.user_id
+WHERE m.user_id IS NOT NULL AND m.timestamp IS NOT NULL {where}
+GROUP BY m.user_id, day {having}
+'''
+LOCAL_DAY = "local_day(m.timestamp, p.timezone)"
+
+SELECT_RANGE_TOTALS_SQL = '''
+SELECT day, meal_count, calories, protein, fat, carbs
+FROM daily_totals WHERE user_id = ? AND day >= ? AND day <= ?
+ORDER BY day
+'''
+
+ROLLUP_FIELDS = ('meal_count', 'calories', 'protein', 'fat', 'carbs')
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _migrate_v1_baseline(store):
+    with store.transaction() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.execute(statement)
+
+
+def _migrate_v2_meal_owner(store):
+    with store.transaction() as conn:
+        if 'user_id' not in _columns(conn, 'meal_diary'):
+            conn.execute("ALTER TABLE meal_diary ADD COLUMN user_id INTEGER")
+        conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_meal_diary_user_time_food
+        ON meal_diary (user_id, timestamp, food_name)
+        ''')
+
+
+def _migrate_v3_epoch_timestamps(store):
+    meal_columns = "id, user_id, timestamp, food_name, calories, protein, fat, carbs, image_url, correction_log"
+    store.rebuild_table_online(
+        'meal_diary', MEAL_DIARY_V3, meal_columns,
+        meal_columns.replace("timestamp", EPOCH_FROM_TIMESTAMP, 1),
+        MEAL_DIARY_INDEXES,
+    )
+
+    with store.transaction() as conn:
+        if 'user_id' not in _columns(conn, 'recommendations'):
+            conn.execute("ALTER TABLE recommendations ADD COLUMN user_id INTEGER")
+    rec_columns = ("id, user_id, timestamp, suggested_item, place_name, status, "
+                   "rejection_reason, adoption_rate_impact")
+    store.rebuild_table_online(
+        'recommendations', RECOMMENDATIONS_V3, rec_columns,
+        rec_columns.replace("timestamp", EPOCH_FROM_TIMESTAMP, 1),
+        RECOMMENDATIONS_INDEXES,
+    )
+
+
+def _migrate_v4_daily_totals(store):
+    with store.transaction() as conn:
+        conn.execute(DAILY_TOTALS_TABLE)
+        for _, statement in _rollup_triggers(UTC_DAY_OF):
+            conn.execute(statement)
+        conn.execute("DELETE FROM daily_totals")
+        conn.execute(REBUILD_ROLLUP_SQL.format(day=UTC_DAY_OF.format(ref='m'), where="", having=""))
+
+
+def _migrate_v5_daily_totals_by_day(store):
+    # Cohort-wide "everyone's totals for today" reads, covering so the rollup rows are never touched
+    with store.transaction() as conn:
+        conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_daily_totals_day
+        ON daily_totals (day, user_id, calories, protein, fat, carbs)
+        ''')
+
+
+VENUE_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS venues (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        kind TEXT, -- 'convenience_store', 'cafe', 'restaurant'
+        lat FLOAT NOT NULL,
+        lon FLOAT NOT NULL
+    )
+    ''',
+    # Points stored as degenerate boxes; the R*Tree answers bounding-box searches
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS venue_rtree USING rtree (id, min_lat, max_lat, min_lon, max_lon)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS menu_items (
+        id INTEGER PRIMARY KEY,
+        venue_id INTEGER NOT NULL REFERENCES venues (id) ON DELETE CASCADE,
+        name TEXT NOT NULL,
+        calories FLOAT,
+        protein FLOAT,
+        fat FLOAT,
+        carbs FLOAT,
+        price FLOAT
+    )
+    ''',
+    # Covering, so the nearby search ranks items without touching menu_items rows
+    '''
+    CREATE INDEX IF NOT EXISTS idx_menu_items_venue
+    ON menu_items (venue_id, calories, protein, fat, carbs)
+    ''',
+)
+
+
+def _migrate_v6_venues(store):
+    with store.transaction() as conn:
+        for statement in VENUE_SCHEMA:
+            conn.execute(statement)
+
+
+# Vision results keyed by image content + prompt parameters (see analysis_cache.py).
+# Perceptual hashes are split into 16-bit bands so near-duplicate lookups are
+# index probes: two hashes within a few bits of each other share at least one band.
+ANALYSIS_CACHE_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS analysis_cache (
+        key TEXT PRIMARY KEY,
+        params_hash TEXT NOT NULL,
+        phash INTEGER,
+        result TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        created_at INTEGER NOT NULL,
+        last_hit INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_hit ON analysis_cache (last_hit)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS analysis_cache_bands (
+        band INTEGER NOT NULL,
+        value INTEGER NOT NULL,
+        key TEXT NOT NULL REFERENCES analysis_cache (key) ON DELETE CASCADE,
+        PRIMARY KEY (band, value, key)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_analysis_cache_bands_key ON analysis_cache_bands (key)
+    ''',
+)
+
+
+def _migrate_v7_analysis_cache(store):
+    with store.transaction() as conn:
+        for statement in ANALYSIS_CACHE_SCHEMA:
+            conn.execute(statement)
+
+
+# --- Cloud sync (see sync_engine.py) ---
+# Triggers append every meal change to sync_outbox; the sync engine pushes the
+# latest entry per meal to Supabase and clears what was acknowledged.
+
+EPOCH_MS_NOW = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+_SYNCED_COLUMNS = "user_id, timestamp, food_name, calories, protein, fat, carbs, image_url"
+
+SYNC_SCHEMA = (
+    "ALTER TABLE meal_diary ADD COLUMN remote_id TEXT",  # food_logs.id once pushed or pulled
+    "ALTER TABLE meal_diary ADD COLUMN remote_updated_at TEXT",  # food_logs.updated_at of the version we hold
+    '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_meal_diary_remote_id ON meal_diary (remote_id)
+    WHERE remote_id IS NOT NULL
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS sync_outbox (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        meal_id INTEGER NOT NULL,
+        remote_id TEXT,
+        op TEXT NOT NULL, -- 'upsert', 'delete'
+        changed_at INTEGER NOT NULL -- epoch milliseconds, for last-writer-wins
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_sync_outbox_user_meal ON sync_outbox (user_id, meal_id, seq)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS sync_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    ) WITHOUT ROWID
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS meal_diary_outbox_insert AFTER INSERT ON meal_diary
+    WHEN NEW.user_id IS NOT NULL
+    BEGIN
+        INSERT INTO sync_outbox (user_id, meal_id, remote_id, op, changed_at)
+        VALUES (NEW.user_id, NEW.id, NEW.remote_id, 'upsert', {EPOCH_MS_NOW});
+    END
+    ''',
+    # remote_id/remote_updated_at are not in the column list, so recording them is not a change
+    f'''
+    CREATE TRIGGER IF NOT EXISTS meal_diary_outbox_update AFTER UPDATE OF {_SYNCED_COLUMNS} ON meal_diary
+    WHEN NEW.user_id IS NOT NULL
+    BEGIN
+        INSERT INTO sync_outbox (user_id, meal_id, remote_id, op, changed_at)
+        VALUES (NEW.user_id, NEW.id, NEW.remote_id, 'upsert', {EPOCH_MS_NOW});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS meal_diary_outbox_delete AFTER DELETE ON meal_diary
+    WHEN OLD.user_id IS NOT NULL
+    BEGIN
+        INSERT INTO sync_outbox (user_id, meal_id, remote_id, op, changed_at)
+        VALUES (OLD.user_id, OLD.id, OLD.remote_id, 'delete', {EPOCH_MS_NOW});
+    END
+    ''',
+    # Meals logged before sync existed go out with the first push
+    f'''
+    INSERT INTO sync_outbox (user_id, meal_id, remote_id, op, changed_at)
+    SELECT user_id, id, NULL, 'upsert', {EPOCH_MS_NOW} FROM meal_diary WHERE user_id IS NOT NULL
+    ''',
+)
+
+
+GET_STATE_SQL = "SELECT value FROM sync_state WHERE key = ?"
+SET_STATE_SQL = '''
+INSERT INTO sync_state (key, value) VALUES (?, ?)
+ON CONFLICT (key) DO UPDATE SET value = excluded.value
+'''
+
+
+def _migrate_v8_sync_outbox(store):
+    with store.transaction() as conn:
+        for statement in SYNC_SCHEMA:
+            if statement.startswith("ALTER") and statement.split()[5] in _columns(conn, 'meal_diary'):
+                continue
+            conn.execute(statement)
+
+
+# --- Proactive prompts (see proactive_scheduler.py) ---
+# Local mealtime windows need each user's time zone; prompt_state carries the
+# directive's feedback-loop state (ignore streak, unanswered prompt) across restarts.
+
+DEFAULT_TIMEZONE = 'Asia/Seoul'
+
+PROACTIVE_SCHEMA = (
+    "ALTER TABLE user_profile ADD COLUMN timezone TEXT",  # IANA name; NULL means DEFAULT_TIMEZONE
+    '''
+    CREATE TABLE IF NOT EXISTS prompt_state (
+        user_id INTEGER PRIMARY KEY,
+        ignored_streak INTEGER NOT NULL DEFAULT 0, -- prompts in a row sent without a reply
+        last_trigger TEXT,
+        last_sent_at INTEGER, -- epoch seconds
+        awaiting_reply INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+)
+
+
+def _migrate_v9_prompt_state(store):
+    with store.transaction() as conn:
+        for statement in PROACTIVE_SCHEMA:
+            if statement.startswith("ALTER") and statement.split()[5] in _columns(conn, 'user_profile'):
+                continue
+            conn.execute(statement)
+
+
+# --- Recommendation adoption (see adoption_model.py) ---
+# Decayed accept/reject counts per (user, place, item); user_id 0 holds the totals
+# across all users and item '' the place as a whole. Written in periodic batches.
+
+ADOPTION_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS adoption_stats (
+        user_id INTEGER NOT NULL,
+        place TEXT NOT NULL,
+        item TEXT NOT NULL,
+        accepted FLOAT NOT NULL,
+        rejected FLOAT NOT NULL,
+        updated_at FLOAT NOT NULL, -- epoch seconds the counts are decayed to
+        PRIMARY KEY (user_id, place, item)
+    ) WITHOUT ROWID
+    ''',
+)
+
+
+def _migrate_v10_adoption_stats(store):
+    with store.transaction() as conn:
+        for statement in ADOPTION_SCHEMA:
+            conn.execute(statement)
+
+
+# --- Portion corrections (see portion_model.py) ---
+# Each user edit of a logged meal becomes one row per changed field, replacing the
+# free-text correction_log (kept for old rows, no longer written). factor is the
+# portion calibration that was applied to the estimate the user corrected.
+# portion_calibration holds the running per-user, per-food portion ratio derived
+# from them; food_key '' is the user's calibration across all foods.
+
+CORRECTION_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS meal_corrections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        meal_id INTEGER,
+        user_id INTEGER,
+        food_key TEXT NOT NULL, -- food_catalog.normalize(food_name)
+        field TEXT NOT NULL, -- 'calories', 'protein', 'fat', 'carbs'
+        estimated FLOAT NOT NULL,
+        corrected FLOAT NOT NULL,
+        factor FLOAT NOT NULL DEFAULT 1.0,
+        source TEXT NOT NULL DEFAULT 'user', -- 'user', 'legacy'
+        created_at INTEGER NOT NULL -- epoch seconds
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_meal_corrections_user_food ON meal_corrections (user_id, food_key)",
+    "CREATE INDEX IF NOT EXISTS idx_meal_corrections_meal ON meal_corrections (meal_id)",
+    '''
+    CREATE TABLE IF NOT EXISTS portion_calibration (
+        user_id INTEGER NOT NULL,
+        food_key TEXT NOT NULL,
+        log_ratio FLOAT NOT NULL, -- running mean of log(corrected / raw estimate)
+        weight FLOAT NOT NULL, -- corrections behind it, capped at portion_model.MEMORY
+        updated_at INTEGER NOT NULL,
+        PRIMARY KEY (user_id, food_key)
+    ) WITHOUT ROWID
+    ''',
+)
+
+INSERT_CORRECTION_SQL = '''
+INSERT INTO meal_corrections (meal_id, user_id, food_key, field, estimated, corrected, factor, source, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# What the app wrote so far: 'user changed 200kcal to 250kcal', 'protein 20g -> 30g'
+LEGACY_KCAL_RE = re.compile(r'(\d+(?:\.\d+)?)\s*kcal\s*(?:to|->|→)\s*(\d+(?:\.\d+)?)\s*kcal', re.IGNORECASE)
+LEGACY_MACRO_RE = re.compile(r'(protein|fat|carbs)\D{0,20}?(\d+(?:\.\d+)?)\s*g\s*(?:to|->|→)\s*(\d+(?:\.\d+)?)\s*g',
+                             re.IGNORECASE)
+
+
+def parse_correction_log(text):
+    """
+    (field, before, after) tuples recognised in a free-text correction_log
+    """
+    changes = [('calories', float(a), float(b)) for a, b in LEGACY_KCAL_RE.findall(text or '')]
+    changes += [(field.lower(), float(a), float(b)) for field, a, b in LEGACY_MACRO_RE.findall(text or '')]
+    return changes
+
+
+def _migrate_v11_meal_corrections(store):
+    with store.transaction() as conn:
+        for statement in CORRECTION_SCHEMA:
+            conn.execute(statement)
+        rows = conn.execute(
+            "SELECT id, user_id, food_name, timestamp, correction_log FROM meal_diary "
+            "WHERE correction_log IS NOT NULL AND id NOT IN (SELECT meal_id FROM meal_corrections "
+            "WHERE source = 'legacy')"
+        ).fetchall()
+        conn.executemany(INSERT_CORRECTION_SQL, [
+            (meal_id, user_id, normalize(food_name or ''), field, before, after, 1.0, 'legacy', timestamp or 0)
+            for meal_id, user_id, food_name, timestamp, log in rows
+            for field, before, after in parse_correction_log(log)
+        ])
+
+
+def _migrate_v12_local_day_rollup(store):
+    with store.transaction() as conn:
+        for name, statement in ROLLUP_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(statement)
+        store.rebuild_daily_totals()
+
+
+MIGRATIONS = (
+    (1, _migrate_v1_baseline),
+    (2, _migrate_v2_meal_owner),
+    (3, _migrate_v3_epoch_timestamps),
+    (4, _migrate_v4_daily_totals),
+    (5, _migrate_v5_daily_totals_by_day),
+    (6, _migrate_v6_venues),
+    (7, _migrate_v7_analysis_cache),
+    (8, _migrate_v8_sync_outbox),
+    (9, _migrate_v9_prompt_state),
+    (10, _migrate_v10_adoption_stats),
+    (11, _migrate_v11_meal_corrections),
+    (12, _migrate_v12_local_day_rollup),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+class DiaryStore:
+    """
+    Pooled access to foodcoach.db.
+
+    Each thread gets its own connection on first use and keeps reusing it,
+    so prepared statements and the page cache survive across calls.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def connection(self):
+        """
+        Return this thread's connection, opening it on first use
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            isolation_level=None,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.create_function("local_day", 2, local_day, deterministic=True)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run a block of statements in one write transaction on this thread's connection.
+        Nested calls join the outer transaction.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            count("db_rollbacks_total")
+            raise
+        else:
+            with timer("db_commit_seconds"):
+                conn.commit()
+
+    def close(self):
+        """
+        Close every pooled connection
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    # --- Schema ---
+
+    def schema_version(self):
+        return self.connection().execute("PRAGMA user_version").fetchone()[0]
+
+    @timed("db_seconds")
+    def migrate(self):
+        """
+        Apply pending migrations in order; returns the list of versions applied.
+
+        Processes sharing the file serialize on a sidecar lock database rather than on
+        the diary itself, so online migrations keep their short transactions. The
+        version is re-read under the lock: whoever waited finds the work already done.
+        """
+        if self.schema_version() >= SCHEMA_VERSION:
+            return []
+        with self._migration_lock():
+            applied = []
+            for version, migration in MIGRATIONS:
+                if version <= self.schema_version():
+                    continue
+                migration(self)
+                with self.transaction() as conn:
+                    conn.execute(f"PRAGMA user_version = {version}")
+                applied.append(version)
+            return applied
+
+    @contextmanager
+    def _migration_lock(self):
+        if self.db_path == ':memory:' or not self.db_path:
+            yield
+            return
+        lock = sqlite3.connect(self.db_path + '-migrate.lock', timeout=MIGRATION_LOCK_TIMEOUT,
+                               isolation_level=None)
+        try:
+            lock.execute("BEGIN IMMEDIATE")
+            yield
+            lock.execute("ROLLBACK")
+        finally:
+            lock.close()
+
+    def init_schema(self):
+        return self.migrate()
+
+    @timed("db_seconds")
+    def rebuild_table_online(self, table, create_new_sql, columns, select_expr, indexes,
+                             batch_size=MIGRATION_BATCH_SIZE):
+        """
+        Rebuild `table` from `create_new_sql` (which creates `<table>_new`) without a long lock.
+
+        Rows are copied in short id-ordered batches so readers and writers keep running.
+        Triggers record ids updated or deleted behind the copy cursor, and the final swap
+        transaction copies the tail, re-copies those ids and renames the new table in place.
+        Safe to re-run after a crash: a leftover `<table>_new`, dirty-id table and
+        capture triggers are discarded and the copy starts over.
+        """
+        conn = self.connection()
+        new_table = f"{table}_new"
+        dirty_table = f"_rebuild_dirty_{table}"
+
+        with self.transaction():
+            for event in ("update", "delete"):
+                conn.execute(f"DROP TRIGGER IF EXISTS _rebuild_{table}_{event}")
+            conn.execute(f"DROP TABLE IF EXISTS {new_table}")
+            conn.execute(f"DROP TABLE IF EXISTS {dirty_table}")
+            conn.execute(create_new_sql)
+            conn.execute(f"CREATE TABLE {dirty_table} (id INTEGER PRIMARY KEY)")
+            for event, ref in (("UPDATE", "OLD"), ("DELETE", "OLD")):
+                conn.execute(f'''
+                CREATE TRIGGER _rebuild_{table}_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    INSERT OR IGNORE INTO {dirty_table} (id) VALUES ({ref}.id);
+                END
+                ''')
+
+        copy_sql = (f"INSERT INTO {new_table} ({columns}) SELECT {select_expr} FROM {table} "
+                    f"WHERE id > ? ORDER BY id LIMIT ?")
+        last_id = 0
+        while True:
+            with self.transaction():
+                conn.execute(copy_sql, (last_id, batch_size))
+                copied_to = conn.execute(f"SELECT MAX(id) FROM {new_table}").fetchone()[0]
+            if copied_to is None or copied_to == last_id:
+                break
+            last_id = copied_to
+
+        with self.transaction():
+            conn.execute(f"INSERT INTO {new_table} ({columns}) SELECT {select_expr} FROM {table} WHERE id > ?",
+                         (last_id,))
+            conn.execute(f"DELETE FROM {new_table} WHERE id IN (SELECT id FROM {dirty_table})")
+            conn.execute(f"INSERT INTO {new_table} ({columns}) SELECT {select_expr} FROM {table} "
+                         f"WHERE id IN (SELECT id FROM {dirty_table})")
+            seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"DROP TABLE {dirty_table}")
+            conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+            if seq is not None:
+                conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq[0], table))
+            for statement in indexes:
+                conn.execute(statement)
+
+    # --- Writes ---
+
+    @timed("db_seconds")
+    def add_profile(self, age, height, weight, gender, goal):
+        with self.transaction() as conn:
+            return conn.execute(INSERT_PROFILE_SQL, (age, height, weight, gender, goal)).lastrowid
+
+    @timed("db_seconds")
+    def set_timezone(self, user_id, timezone_name):
+        """
+        Change a user's time zone and re-key their daily_totals to the new local days
+        """
+        with self.transaction() as conn:
+            conn.execute("UPDATE user_profile SET timezone = ? WHERE id = ?", (timezone_name, user_id))
+            self.rebuild_daily_totals(user_id)
+
+    @timed("db_seconds")
+    def add_meal(self, food_name, calories, protein, fat, carbs,
+                 timestamp=None, image_url=None, correction_log=None, user_id=None):
+        """
+        Log a meal (timestamp defaults to now); returns its id.
+
+        (user_id, timestamp, food_name) identifies a meal for re-imports and sync, so
+        the same food logged again within one second (a double tap, a second portion)
+        is stored at the next free second rather than rejected.
+        """
+        epoch = to_epoch(timestamp)
+        if epoch is None:
+            epoch = int(time.time())
+        with self.transaction() as conn:
+            while True:
+                cursor = conn.execute(
+                    INSERT_MEAL_SQL,
+                    (food_name, calories, protein, fat, carbs, epoch, image_url, correction_log, user_id),
+                )
+                if cursor.rowcount:
+                    return cursor.lastrowid
+                epoch += 1
+
+    @timed("db_seconds")
+    def bulk_insert_meals(self, meals, chunk_size=DEFAULT_CHUNK_SIZE, upsert=True):
+        """
+        Stream meals (dicts keyed by MEAL_COLUMNS, or tuples in that order) into meal_diary.
+
+        Rows are written with executemany, one transaction per chunk, so memory stays
+        bounded by chunk_size and a failure only rolls back the current chunk.
+        With upsert=True a re-import of the same (user_id, timestamp, food_name) updates
+        the existing row instead of duplicating it. Rows without a user_id or timestamp
+        are rejected then (counted in the result): SQLite treats NULLs in that key as
+        distinct, so they could never match on a re-import.
+
+        Indexes stay in place during the load: meal_diary's only one is the unique
+        (user_id, timestamp, food_name) index the upsert resolves conflicts against.
+        """
+        sql = BULK_UPSERT_MEAL_SQL if upsert else BULK_INSERT_MEAL_SQL
+        conn = self.connection()
+        rows = (_meal_row(meal) for meal in meals)
+        rejected = [0]
+        if upsert:
+            rows = _keyed_rows(rows, rejected)
+
+        total = 0
+        chunks = 0
+        start = time.perf_counter()
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            with self.transaction():
+                conn.executemany(sql, chunk)
+            total += len(chunk)
+            chunks += 1
+        elapsed = time.perf_counter() - start
+
+        return {
+            "rows": total,
+            "rejected": rejected[0],
+            "chunks": chunks,
+            "seconds": elapsed,
+            "rows_per_sec": total / elapsed if elapsed > 0 else 0.0,
+        }
+
+    @timed("db_seconds")
+    def update_meal(self, meal_id, **values):
+        """
+        Correct fields of a logged meal; daily_totals follows through its triggers
+        """
+        unknown = set(values) - set(MEAL_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown meal_diary columns: {sorted(unknown)}")
+        if 'timestamp' in values:
+            values['timestamp'] = to_epoch(values['timestamp'])
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with self.transaction() as conn:
+            conn.execute(f"UPDATE meal_diary SET {assignments} WHERE id = ?", (*values.values(), meal_id))
+
+    @timed("db_seconds")
+    def delete_meal(self, meal_id):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM meal_diary WHERE id = ?", (meal_id,))
+
+    @timed("db_seconds")
+    def add_recommendation(self, suggested_item, place_name, status='pending', user_id=None):
+        with self.transaction() as conn:
+            return conn.execute(INSERT_RECOMMENDATION_SQL, (suggested_item, place_name, status, user_id)).lastrowid
+
+    @timed("db_seconds")
+    def set_recommendation_status(self, rec_id, status, rejection_reason=None):
+        with self.transaction() as conn:
+            conn.execute(UPDATE_RECOMMENDATION_SQL, (status, rejection_reason, rec_id))
+
+    # --- Reads ---
+
+    @timed("db_seconds")
+    def get_profile(self, user_id):
+        row = self.connection().execute(SELECT_PROFILE_SQL, (user_id,)).fetchone()
+        return dict(row) if row else None
+
+    @timed("db_seconds")
+    def recent_meals(self, limit=20):
+        rows = self.connection().execute(SELECT_RECENT_MEALS_SQL, (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    @timed("db_seconds")
+    def meals_between(self, user_id, start, end):
+        """
+        A user's meals with start <= timestamp < end (epoch seconds, datetimes or ISO strings)
+        """
+        rows = self.connection().execute(
+            SELECT_MEALS_BETWEEN_SQL, (user_id, to_epoch(start), to_epoch(end))
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    @timed("db_seconds")
+    def get_range_totals(self, user_id, start, end, fill_gaps=True):
+        """
+        Per-day totals for start..end inclusive (dates or 'YYYY-MM-DD', the user's local days).
+        Reads only daily_totals, so a 30-day trend costs 30 rows whatever the meal count.
+        With fill_gaps, days without meals are returned as zero rows.
+        """
+        start, end = _day_str(start), _day_str(end)
+        rows = self.connection().execute(SELECT_RANGE_TOTALS_SQL, (user_id, start, end)).fetchall()
+        totals = [dict(row) for row in rows]
+        if not fill_gaps:
+            return totals
+
+        by_day = {row['day']: row for row in totals}
+        days = []
+        day = date.fromisoformat(start)
+        last = date.fromisoformat(end)
+        while day <= last:
+            key = day.isoformat()
+            days.append(by_day.get(key) or dict({'day': key}, **{field: 0 for field in ROLLUP_FIELDS}))
+            day += timedelta(days=1)
+        return days
+
+    @timed("db_seconds")
+    def rebuild_daily_totals(self, user_id=None, start=None, end=None):
+        """
+        Recompute daily_totals from meal_diary, optionally for one user and/or a range of local days
+        """
+        where, params = [], []
+        rollup_where, rollup_params = [], []
+        if user_id is not None:
+            where.append("m.user_id = ?")
+            params.append(user_id)
+            rollup_where.append("user_id = ?")
+            rollup_params.append(user_id)
+        # A local day lies within a day either side of the same UTC date
+        having, having_params = [], []
+        if start is not None:
+            where.append("m.timestamp >= ?")
+            params.append(_day_start(start) - 86400)
+            having.append("day >= ?")
+            having_params.append(_day_str(start))
+        if end is not None:
+            where.append("m.timestamp < ?")
+            params.append(_day_start(end) + 2 * 86400)
+            having.append("day <= ?")
+            having_params.append(_day_str(end))
+        rollup_where += having
+        rollup_params += having_params
+
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM daily_totals" + (" WHERE " + " AND ".join(rollup_where) if rollup_where else ""),
+                         rollup_params)
+            cursor = conn.execute(
+                REBUILD_ROLLUP_SQL.format(
+                    day=LOCAL_DAY,
+                    where="".join(" AND " + clause for clause in where),
+                    having=" HAVING " + " AND ".join(having) if having else "",
+                ),
+                params + having_params,
+            )
+            return cursor.rowcount
+
+    @timed("db_seconds")
+    def recommendations_by_status(self, user_id, status='pending'):
+        rows = self.connection().execute(SELECT_RECOMMENDATIONS_BY_STATUS_SQL, (user_id, status)).fetchall()
+        return [dict(row) for row in rows]
+
+    @timed("db_seconds")
+    def max_id(self, table):
+        return self.connection().execute(f"SELECT IFNULL(MAX(id), 0) FROM {table}").fetchone()[0]
+
+    def iter_chunks(self, table, columns, after_id=0, until_id=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Yield lists of plain tuples for rows with after_id < id <= until_id, in id order,
+        chunk_size rows at a time. columns must start with 'id'.
+        until_id defaults to the current MAX(id), so rows added meanwhile wait for the next run.
+        """
+        if columns[0] != 'id':
+            raise ValueError("iter_chunks needs 'id' as the first column")
+        until_id = self.max_id(table) if until_id is None else until_id
+        conn = self.connection()
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        sql = KEYSET_PAGE_SQL.format(columns=", ".join(columns), table=table)
+        # Scanned through mmap, every page of the table would stay resident in this
+        # process; the bounded page cache keeps memory flat instead
+        conn.execute("PRAGMA mmap_size=0")
+        try:
+            while after_id < until_id:
+                with timer("db_seconds", op="DiaryStore.iter_chunks"):
+                    rows = cursor.execute(sql, (after_id, until_id, chunk_size)).fetchall()
+                if not rows:
+                    return
+                yield rows
+                after_id = rows[-1][0]
+        finally:
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+
+
+def to_epoch(value):
+    """
+    Normalize a timestamp to integer epoch seconds.
+    Accepts None, numbers, datetimes and ISO strings; naive values are UTC, the same
+    rule the v3 migration applied to legacy TEXT timestamps.
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _day_str(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def _day_start(value):
+    """
+    Epoch seconds at 00:00 UTC of a date or 'YYYY-MM-DD'
+    """
+    day = date.fromisoformat(value) if isinstance(value, str) else value
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+
+
+@lru_cache(maxsize=None)
+def local_zone(name):
+    """
+    ZoneInfo for an IANA name; unset or unknown names fall back to DEFAULT_TIMEZONE
+    """
+    try:
+        return ZoneInfo(name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def local_day(epoch, timezone_name):
+    """
+    'YYYY-MM-DD' of epoch seconds in a time zone; registered as the local_day() SQL function
+    """
+    return datetime.fromtimestamp(epoch, local_zone(timezone_name)).date().isoformat()
+
+
+TIMESTAMP_INDEX = MEAL_COLUMNS.index('timestamp')
+USER_ID_INDEX = MEAL_COLUMNS.index('user_id')
+
+
+def _meal_row(meal):
+    if isinstance(meal, dict):
+        row = [meal.get(column) for column in MEAL_COLUMNS]
+    else:
+        row = list(meal)
+        row.extend([None] * (len(MEAL_COLUMNS) - len(row)))
+    row[TIMESTAMP_INDEX] = to_epoch(row[TIMESTAMP_INDEX])
+    return row
+
+
+def _keyed_rows(rows, rejected):
+    for row in rows:
+        if row[USER_ID_INDEX] is None or row[TIMESTAMP_INDEX] is None:
+            rejected[0] += 1
+        else:
+            yield row
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_store(db_path=DB_PATH):
+    """
+    Shared store for the default database; other paths get a fresh store
+    """
+    global _default_store
+    if db_path != DB_PATH:
+        return DiaryStore(db_path)
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = DiaryStore(DB_PATH)
+        return _default_store
+
+
+def init_db(db_path=DB_PATH):
+    store = get_store(db_path)
+    store.init_schema()
+    print(f"Database initialized at {db_path}")
+    return store
 
 if __name__ == "__main__":
-    init_db()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="FoodCoach diary database")
+    subparsers = parser.add_subparsers(dest="command")
+    rebuild = subparsers.add_parser("rebuild-rollups", help="recompute daily_totals after a large backfill")
+    rebuild.add_argument("--user", type=int)
+    rebuild.add_argument("--start", help="first local day, YYYY-MM-DD in each user's user_profile.timezone")
+    rebuild.add_argument("--end", help="last local day, YYYY-MM-DD in each user's user_profile.timezone")
+    args = parser.parse_args()
+
+    store = init_db()
+    if args.command == "rebuild-rollups":
+        days = store.rebuild_daily_totals(args.user, args.start, args.end)
+        print(f"Rebuilt {days} daily_totals rows")
@@ -0,0 +1,162 @@
+import os
+import csv
+import time
+import argparse
+
+from execution.diary_db import init_db, get_store, EXPORT_CHUNK_SIZE, GET_STATE_SQL, SET_STATE_SQL
+from execution.metrics import timed
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:       # Parquet / Arrow output needs pyarrow; CSV does not
+    pa = None
+
+FORMATS = ('parquet', 'arrow', 'csv')
+EXTENSIONS = {'.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow', '.csv': 'csv'}
+COMPRESSION = 'zstd'
+
+# Exported columns and their types; id first (it is the keyset and the watermark)
+EXPORT_TABLES = {
+    'meal_diary': (
+        ('id', 'int64'), ('user_id', 'int64'), ('timestamp', 'timestamp'), ('food_name', 'string'),
+        ('calories', 'float64'), ('protein', 'float64'), ('fat', 'float64'), ('carbs', 'float64'),
+        ('image_url', 'string'), ('correction_log', 'string'),
+    ),
+    'recommendations': (
+        ('id', 'int64'), ('user_id', 'int64'), ('timestamp', 'timestamp'), ('suggested_item', 'string'),
+        ('place_name', 'string'), ('status', 'string'), ('rejection_reason', 'string'),
+        ('adoption_rate_impact', 'float64'),
+    ),
+}
+
+
+def _arrow_schema(table):
+    types = {
+        'int64': pa.int64(), 'float64': pa.float64(), 'string': pa.string(),
+        'timestamp': pa.timestamp('s', tz='UTC'),       # epoch seconds in the diary
+    }
+    return pa.schema([(name, types[kind]) for name, kind in EXPORT_TABLES[table]])
+
+
+class CsvSink:
+    def __init__(self, path, table):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file, lineterminator='\n')
+        self.writer.writerow([name for name, _ in EXPORT_TABLES[table]])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowSink:
+    """
+    One record batch per chunk: a Parquet row group or an Arrow IPC file batch
+    """
+
+    def __init__(self, path, table, fmt):
+        if pa is None:
+            raise ImportError("Parquet/Arrow export requires pyarrow (pip install pyarrow)")
+        self.schema = _arrow_schema(table)
+        if fmt == 'parquet':
+            self.writer = pq.ParquetWriter(path, self.schema, compression=COMPRESSION)
+            self._write = self.writer.write_batch
+        else:
+            self.writer = ipc.new_file(path, self.schema, options=ipc.IpcWriteOptions(compression=COMPRESSION))
+            self._write = self.writer.write_batch
+
+    def write(self, rows):
+        columns = zip(*rows)
+        arrays = [pa.array(column, type=field.type) for column, field in zip(columns, self.schema)]
+        self._write(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def format_for(path):
+    fmt = EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Cannot tell the export format of {path}; use one of {', '.join(EXTENSIONS)}")
+    return fmt
+
+
+def watermark_key(table, feed=None):
+    return f"export_hwm:{table}:{feed or 'default'}"
+
+
+def get_watermark(store, table, feed=None):
+    row = store.connection().execute(GET_STATE_SQL, (watermark_key(table, feed),)).fetchone()
+    return int(row[0]) if row else 0
+
+
+@timed("export_seconds")
+def export_table(table, path, fmt=None, incremental=False, feed=None, chunk_size=EXPORT_CHUNK_SIZE, store=None):
+    """
+    Stream `table` into a Parquet, Arrow IPC or CSV file in keyset pages of chunk_size rows.
+
+    Memory stays bounded by one page whatever the table size. The file is written
+    next to `path` and renamed into place when complete. With incremental=True only
+    rows added since the last incremental export of `feed` are written, and the
+    watermark (the last exported id) moves forward once the file is in place.
+    Edits to rows that were already exported need a full export.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table {table}; exportable: {', '.join(EXPORT_TABLES)}")
+    store = store or get_store()
+    fmt = fmt or format_for(path)
+    columns = [name for name, _ in EXPORT_TABLES[table]]
+    after_id = get_watermark(store, table, feed) if incremental else 0
+    until_id = store.max_id(table)
+
+    part = path + ".part"
+    sink = CsvSink(part, table) if fmt == 'csv' else ArrowSink(part, table, fmt)
+    rows = chunks = 0
+    start = time.perf_counter()
+    try:
+        for chunk in store.iter_chunks(table, columns, after_id, until_id, chunk_size):
+            sink.write(chunk)
+            rows += len(chunk)
+            chunks += 1
+    except BaseException:
+        sink.close()
+        os.remove(part)
+        raise
+    sink.close()
+    os.replace(part, path)
+    if incremental:
+        with store.transaction() as conn:
+            conn.execute(SET_STATE_SQL, (watermark_key(table, feed), str(until_id)))
+    seconds = time.perf_counter() - start
+    return {
+        "table": table,
+        "format": fmt,
+        "rows": rows,
+        "chunks": chunks,
+        "from_id": after_id,
+        "to_id": until_id,
+        "bytes": os.path.getsize(path),
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream diary tables to Parquet, Arrow IPC or CSV")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("path", help="output file; the format follows its extension")
+    parser.add_argument("--format", choices=FORMATS, help="override the format implied by the extension")
+    parser.add_argument("--incremental", action="store_true", help="only rows added since the last incremental run")
+    parser.add_argument("--feed", help="watermark name, to keep separate incremental feeds")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    stats = export_table(args.table, args.path, args.format, args.incremental, args.feed, args.chunk_size,
+                         store=init_db())
+    print(f"Exported {stats['rows']} {args.table} rows (id {stats['from_id']}..{stats['to_id']}) to {args.path} "
+          f"in {stats['chunks']} chunks ({stats['seconds']:.2f}s, {stats['rows_per_sec']:.0f} rows/s, "
+          f"{stats['bytes'] / 1e6:.1f} MB)")
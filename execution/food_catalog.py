@@ -0,0 +1,450 @@
+import os
+import csv
+import mmap
+import struct
+import bisect
+import hashlib
+import threading
+import unicodedata
+import json
+import zlib
+from array import array
+from collections import Counter, defaultdict
+
+# Built on first use, so it lives in the user's cache rather than next to the code
+# (which may be a read-only site-packages); FOODCOACH_CATALOG overrides the location.
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'foodcoach')
+CATALOG_PATH = os.environ.get('FOODCOACH_CATALOG') or os.path.join(CACHE_DIR, 'food_catalog.bin')
+
+# Shared seed food database (numeric macros in grams), also the default catalog contents
+FOOD_DATABASE = {
+    "Avocado Toast": {"name_ko": "아보카도 토스트", "calories": 280, "protein": 8, "fat": 22, "carbs": 16, "health_score": 9, "description": "High in healthy fats and fiber."},
+    "Grilled Salmon": {"name_ko": "연어 구이", "calories": 450, "protein": 34, "fat": 28, "carbs": 0, "health_score": 10, "description": "Excellent source of omega-3 fatty acids."},
+    "Quinoa Salad": {"name_ko": "퀴노아 샐러드", "calories": 320, "protein": 12, "fat": 14, "carbs": 45, "health_score": 9, "description": "Packed with complete plant-protein."},
+    "Chicken Pasta": {"name_ko": "치킨 파스타", "calories": 650, "protein": 28, "fat": 22, "carbs": 85, "health_score": 6, "description": "Energy-rich meal with balanced macros."},
+    "Tofu Stir-fry": {"name_ko": "두부 볶음", "calories": 240, "protein": 18, "fat": 12, "carbs": 15, "health_score": 9, "description": "Light, high-protein plant-based meal."},
+    "Beef Steak": {"name_ko": "소고기 스테이크", "calories": 720, "protein": 52, "fat": 48, "carbs": 0, "health_score": 7, "description": "Iron-rich, high-quality protein source."},
+    "Greek Yogurt": {"name_ko": "그릭 요거트", "calories": 150, "protein": 15, "fat": 4, "carbs": 12, "health_score": 10, "description": "Probiotic-rich snack for gut health."},
+    "Oatmeal": {"name_ko": "오트밀", "calories": 300, "protein": 10, "fat": 6, "carbs": 54, "health_score": 9, "description": "Great slow-release energy source."},
+    "Sushi Roll": {"name_ko": "초밥 롤", "calories": 380, "protein": 14, "fat": 12, "carbs": 58, "health_score": 8, "description": "Balanced rice, fish, and veggies."},
+    "Lentil Soup": {"name_ko": "렌틸콩 수프", "calories": 220, "protein": 16, "fat": 2, "carbs": 36, "health_score": 10, "description": "High fiber and plant-based protein."},
+    "Caesar Salad": {"name_ko": "시저 샐러드", "calories": 420, "protein": 22, "fat": 32, "carbs": 14, "health_score": 5, "description": "Contains protein but high in fat (dressing)."},
+    "Shrimp Scampi": {"name_ko": "새우 스캄피", "calories": 510, "protein": 28, "fat": 24, "carbs": 48, "health_score": 7, "description": "Flavorful seafood dish with pasta."},
+    "Turkey Sandwich": {"name_ko": "칠면조 샌드위치", "calories": 400, "protein": 24, "fat": 12, "carbs": 48, "health_score": 8, "description": "Lean protein with whole grains."},
+    "Pizza Slice": {"name_ko": "피자 한 조각", "calories": 285, "protein": 12, "fat": 10, "carbs": 36, "health_score": 4, "description": "Comfort food, high in simple carbs."},
+    "Falafel Wrap": {"name_ko": "팔라펠 랩", "calories": 550, "protein": 18, "fat": 24, "carbs": 68, "health_score": 7, "description": "Satisfying vegetarian wrap."},
+    "Scrambled Eggs": {"name_ko": "스크램블 에그", "calories": 210, "protein": 14, "fat": 16, "carbs": 2, "health_score": 8, "description": "Quick, high-quality protein breakfast."},
+    "Smoothie": {"name_ko": "스무디", "calories": 250, "protein": 5, "fat": 2, "carbs": 54, "health_score": 9, "description": "Vitamin-packed liquid energy."},
+    "Burrito Bowl": {"name_ko": "부리토 볼", "calories": 780, "protein": 42, "fat": 34, "carbs": 82, "health_score": 7, "description": "Hearty meal with diverse ingredients."},
+    "Miso Soup": {"name_ko": "미소국", "calories": 80, "protein": 6, "fat": 3, "carbs": 10, "health_score": 9, "description": "Low calorie, fermented soybean soup."},
+    "Hummus & Pita": {"name_ko": "후무스와 피타", "calories": 350, "protein": 12, "fat": 18, "carbs": 42, "health_score": 8, "description": "Classic Middle Eastern snack."},
+    "Roasted Veggies": {"name_ko": "구운 채소", "calories": 180, "protein": 6, "fat": 12, "carbs": 18, "health_score": 10, "description": "Essential micronutrients and fiber."},
+    "Pancakes": {"name_ko": "팬케이크", "calories": 520, "protein": 12, "fat": 18, "carbs": 78, "health_score": 4, "description": "Indulgent breakfast, high in sugar."},
+    "Chicken Wings": {"name_ko": "치킨 윙", "calories": 840, "protein": 48, "fat": 62, "carbs": 8, "health_score": 3, "description": "High in protein but very oily."},
+    "Poke Bowl": {"name_ko": "포케 볼", "calories": 480, "protein": 26, "fat": 18, "carbs": 54, "health_score": 9, "description": "Fresh and nutritionally balanced bowl."},
+    "Carbonara": {"name_ko": "까르보나라", "calories": 720, "protein": 24, "fat": 36, "carbs": 74, "health_score": 5, "description": "Rich and delicious cream-based pasta."},
+    "Fried Rice": {"name_ko": "볶음밥", "calories": 450, "protein": 10, "fat": 15, "carbs": 68, "health_score": 5, "description": "Quick meal, can be high in sodium."},
+    "Hamburger": {"name_ko": "햄버거", "calories": 550, "protein": 28, "fat": 32, "carbs": 38, "health_score": 5, "description": "Classic meal, best eaten in moderation."},
+    "Tomato Soup": {"name_ko": "토마토 수프", "calories": 150, "protein": 4, "fat": 5, "carbs": 22, "health_score": 8, "description": "Antioxidant-rich, soul-warming soup."},
+    "Bagel & Cream Cheese": {"name_ko": "베이글과 크림치즈", "calories": 410, "protein": 12, "fat": 18, "carbs": 52, "health_score": 6, "description": "Dense carbs with dairy fat."},
+    "Chicken Pho": {"name_ko": "치킨 쌀국수", "calories": 380, "protein": 24, "fat": 8, "carbs": 54, "health_score": 9, "description": "Lean, aromatic and hydrating meal."},
+    "Dim Sum": {"name_ko": "딤섬", "calories": 320, "protein": 15, "fat": 18, "carbs": 28, "health_score": 6, "description": "Bite-sized flavorful dumplings."},
+    "Tacos (Beef)": {"name_ko": "소고기 타코", "calories": 480, "protein": 24, "fat": 26, "carbs": 42, "health_score": 6, "description": "Satisfying protein with corn shells."},
+    "Cobb Salad": {"name_ko": "콥 샐러드", "calories": 560, "protein": 36, "fat": 44, "carbs": 12, "health_score": 7, "description": "High protein, but watch the dressing."},
+    "Fish and Chips": {"name_ko": "피시 앤 칩스", "calories": 950, "protein": 42, "fat": 54, "carbs": 78, "health_score": 3, "description": "Deep-fried, best for occasional treats."},
+    "Lasagna": {"name_ko": "라자냐", "calories": 680, "protein": 34, "fat": 38, "carbs": 52, "health_score": 6, "description": "Complex, comforting layered meal."},
+    "Pad Thai": {"name_ko": "팟타이", "calories": 750, "protein": 22, "fat": 28, "carbs": 104, "health_score": 5, "description": "Flavorful, very high carb count."},
+    "Shepherd's Pie": {"name_ko": "셰퍼드 파이", "calories": 520, "protein": 26, "fat": 32, "carbs": 34, "health_score": 7, "description": "Balanced meat and potato dish."},
+    "Clam Chowder": {"name_ko": "클램 차우더", "calories": 450, "protein": 18, "fat": 28, "carbs": 34, "health_score": 5, "description": "Creamy seafood soup, high in fat."},
+    "Ramen": {"name_ko": "라멘", "calories": 820, "protein": 32, "fat": 44, "carbs": 75, "health_score": 4, "description": "High sodium, delicious savory broth."},
+    "Chicken Curry": {"name_ko": "치킨 카레", "calories": 580, "protein": 34, "fat": 26, "carbs": 52, "health_score": 8, "description": "Anti-inflammatory spices with protein."},
+    "Ratatouille": {"name_ko": "라따뚜이", "calories": 160, "protein": 4, "fat": 8, "carbs": 20, "health_score": 10, "description": "All-vegetable healthy stew."},
+    "Grilled Cheese": {"name_ko": "그릴드 치즈 샌드위치", "calories": 420, "protein": 14, "fat": 24, "carbs": 38, "health_score": 4, "description": "Simple comfort food, high in dairy fat."},
+    "Eggs Benedict": {"name_ko": "에그 베네딕트", "calories": 710, "protein": 28, "fat": 52, "carbs": 34, "health_score": 5, "description": "Rich brunch special with hollandaise."},
+    "Bibimbap": {"name_ko": "비빔밥", "calories": 540, "protein": 24, "fat": 18, "carbs": 72, "health_score": 9, "description": "Traditional balanced Korean meal."},
+    "Kimchi Jjigae": {"name_ko": "김치찌개", "calories": 280, "protein": 18, "fat": 14, "carbs": 22, "health_score": 9, "description": "Probiotic-rich and spicy stew."},
+    "Gnocchi": {"name_ko": "뇨끼", "calories": 410, "protein": 8, "fat": 12, "carbs": 68, "health_score": 6, "description": "Soft potato pasta with herbs."},
+    "BBQ Ribs": {"name_ko": "바비큐 립", "calories": 980, "protein": 54, "fat": 68, "carbs": 44, "health_score": 3, "description": "High calorie, high protein, high sugar sauce."},
+    "French Onion Soup": {"name_ko": "프렌치 어니언 수프", "calories": 310, "protein": 12, "fat": 18, "carbs": 26, "health_score": 6, "description": "Savory onion soup with cheese crust."},
+    "Lobster Roll": {"name_ko": "랍스터 롤", "calories": 480, "protein": 32, "fat": 24, "carbs": 34, "health_score": 7, "description": "Luxury protein on a toasted bun."},
+    "Chili Con Carne": {"name_ko": "칠리 콘 카르네", "calories": 420, "protein": 32, "fat": 18, "carbs": 34, "health_score": 8, "description": "Great fiber and protein combination."}
+}
+
+
+# --- On-disk layout (little-endian) ---
+# header | records | entries | strings | trigram table | postings | exact-name table
+# Records hold the macros; entries are the searchable names (English and Korean
+# names of one record are separate entries pointing at the same record).
+# The header's flags say whether the file was built from the FOOD_DATABASE seed list,
+# and it ends with a digest of that list, so a seeded catalog knows when the seed
+# list has changed since. Catalogs built from a CSV export are never rebuilt.
+MAGIC = b'FCAT'
+FORMAT_VERSION = 3
+READABLE_VERSIONS = (2, 3)                # v2 is v3 without flags (digest 0 for CSV builds)
+FLAG_SEEDED = 1
+HEADER = struct.Struct('<4sHHIIII6QQ')    # magic, version, flags, counts, section offsets, seed digest
+RECORD = struct.Struct('<IHIHffffB3x')    # name, name_ko, calories, protein, fat, carbs, health_score
+ENTRY = struct.Struct('<IH2x')            # record id, name language (0 en, 1 ko)
+TRIGRAM = struct.Struct('<III')           # trigram hash, postings offset, postings count
+EXACT = struct.Struct('<QI4x')            # normalized-name hash, entry id
+
+MAX_CANDIDATE_TRIGRAMS = 8     # rarest query trigrams used to gather candidates
+MAX_POSTINGS_SCANNED = 4096    # per-query budget; very common trigrams are skipped past it
+MAX_CANDIDATES = 32            # candidates re-scored exactly
+MIN_MATCH_SCORE = 0.35
+
+
+def normalize(text):
+    """
+    Lowercase, fold accents and split Hangul syllables into jamo (NFKD), so
+    '김치찌게' and '김치찌개' share most trigrams just like 'jigae' and 'jjigae'
+    """
+    text = unicodedata.normalize('NFKD', text.lower())
+    cleaned = []
+    for ch in text:
+        if unicodedata.combining(ch) and not 'ᄀ' <= ch <= 'ᇿ':
+            continue
+        cleaned.append(ch if ch.isalnum() else ' ')
+    return ' '.join(''.join(cleaned).split())
+
+
+def trigrams(normalized):
+    padded = f'  {normalized} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_key(gram):
+    return zlib.crc32(gram.encode('utf-8'))
+
+
+def name_key(normalized):
+    return int.from_bytes(hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def dice(a, b):
+    if not a or not b:
+        return 0.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+
+# --- Building ---
+
+def build_catalog(records, path=CATALOG_PATH, source_digest=None):
+    """
+    Write a catalog from an iterable of dicts with name, name_ko (optional),
+    calories, protein, fat, carbs and health_score (optional). Returns the record count.
+    source_digest is seed_digest() for a build from the seed list, None otherwise.
+    """
+    strings = bytearray()
+    string_offsets = {}
+
+    def intern(text):
+        if not text:
+            return 0, 0
+        data = text.encode('utf-8')
+        if data not in string_offsets:
+            string_offsets[data] = len(strings)
+            strings.extend(data)
+        return string_offsets[data], len(data)
+
+    record_bytes = bytearray()
+    entry_bytes = bytearray()
+    postings = defaultdict(list)
+    exact = {}
+    n_records = n_entries = 0
+
+    for record in records:
+        name = record['name']
+        name_ko = record.get('name_ko') or ''
+        name_off, name_len = intern(name)
+        ko_off, ko_len = intern(name_ko)
+        record_bytes += RECORD.pack(
+            name_off, name_len, ko_off, ko_len,
+            float(record['calories']), float(record['protein']),
+            float(record['fat']), float(record['carbs']),
+            int(record.get('health_score') or 0),
+        )
+        for lang, label in enumerate((name, name_ko)):
+            normalized = normalize(label) if label else ''
+            if not normalized:
+                continue
+            grams = trigrams(normalized)
+            entry_bytes += ENTRY.pack(n_records, lang)
+            for gram in grams:
+                postings[trigram_key(gram)].append(n_entries)
+            exact.setdefault(name_key(normalized), n_entries)
+            n_entries += 1
+        n_records += 1
+
+    trigram_bytes = bytearray()
+    posting_bytes = array('I')
+    for key in sorted(postings):
+        ids = postings[key]
+        trigram_bytes += TRIGRAM.pack(key, len(posting_bytes), len(ids))
+        posting_bytes.extend(ids)
+
+    exact_bytes = bytearray()
+    for key in sorted(exact):
+        exact_bytes += EXACT.pack(key, exact[key])
+
+    sections = [record_bytes, entry_bytes, strings, trigram_bytes, posting_bytes.tobytes(), exact_bytes]
+    offsets = []
+    position = HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        flags = 0 if source_digest is None else FLAG_SEEDED
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, flags, n_records, n_entries, len(postings), len(exact), *offsets,
+                            source_digest or 0))
+        for section in sections:
+            f.write(section)
+    os.replace(tmp_path, path)
+    return n_records
+
+
+def seed_records():
+    for name, data in FOOD_DATABASE.items():
+        yield dict(data, name=name)
+
+
+def seed_digest():
+    data = json.dumps(FOOD_DATABASE, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def _header(path):
+    """
+    (format version, seeded, seed digest) of a catalog file, or None when it is missing
+    or foreign; seeded and digest are None for a format this code cannot read
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(data) < 6 or data[:4] != MAGIC:
+        return None
+    version = struct.unpack_from('<H', data, 4)[0]
+    if version not in READABLE_VERSIONS or len(data) < HEADER.size:
+        return version, None, None
+    header = HEADER.unpack(data)
+    digest = header[-1]
+    if version == 2:
+        return version, digest != 0, digest     # v2 only wrote a digest for seed builds
+    return version, bool(header[2] & FLAG_SEEDED), digest
+
+
+def _stale_seed_build(path):
+    """
+    True when path holds no catalog yet, or one built from an older seed list
+    """
+    header = _header(path)
+    if header is None:
+        return True
+    version, seeded, digest = header
+    if seeded is None:
+        return version < min(READABLE_VERSIONS)   # older formats were only ever seed-built
+    return seeded and (version != FORMAT_VERSION or digest != seed_digest())
+
+
+def iter_csv_records(csv_path):
+    """
+    USDA-style export: name, name_ko, calories, protein, fat, carbs, health_score
+    """
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield row
+
+
+# --- Lookup ---
+
+class _KeyColumn:
+    """
+    Read-only sequence view over the sorted key column of a fixed-width table, for bisect
+    """
+
+    def __init__(self, buf, offset, count, fmt):
+        self.buf = buf
+        self.offset = offset
+        self.count = count
+        self.size = fmt.size
+        self.key = struct.Struct('<' + fmt.format[1])
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        return self.key.unpack_from(self.buf, self.offset + i * self.size)[0]
+
+
+class FoodCatalog:
+    """
+    Memory-mapped food catalog with a trigram index.
+
+    Nothing is read until the first lookup; after that the OS pages in only the
+    parts of the file a query touches, so opening a 500k-food catalog is instant.
+
+    A seeded catalog (the default one at CATALOG_PATH) is built from FOOD_DATABASE
+    on first use and rebuilt whenever the seed list or file format has changed,
+    unless the file there came from a CSV export: that one is always used as is.
+    """
+
+    def __init__(self, path=CATALOG_PATH, seeded=None):
+        self.path = path
+        self.seeded = path == CATALOG_PATH if seeded is None else seeded
+        self._buf = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._buf is not None:
+                return
+            if self.seeded and _stale_seed_build(self.path):
+                build_catalog(seed_records(), self.path, seed_digest())
+            with open(self.path, 'rb') as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            (magic, version, _, self.n_records, self.n_entries, self.n_trigrams, self.n_exact,
+             self._records, self._entries, self._strings, self._trigrams, self._postings,
+             self._exact, _) = HEADER.unpack_from(buf, 0)
+            if magic != MAGIC or version not in READABLE_VERSIONS:
+                buf.close()
+                raise ValueError(f"{self.path} is not a v{FORMAT_VERSION} food catalog")
+            self._trigram_keys = _KeyColumn(buf, self._trigrams, self.n_trigrams, TRIGRAM)
+            self._exact_keys = _KeyColumn(buf, self._exact, self.n_exact, EXACT)
+            self._buf = buf
+
+    def __len__(self):
+        self._load()
+        return self.n_records
+
+    def close(self):
+        with self._lock:
+            if self._buf is not None:
+                self._buf.close()
+                self._buf = None
+
+    def _string(self, offset, length):
+        start = self._strings + offset
+        return self._buf[start:start + length].decode('utf-8')
+
+    def record(self, record_id):
+        name_off, name_len, ko_off, ko_len, calories, protein, fat, carbs, health_score = \
+            RECORD.unpack_from(self._buf, self._records + record_id * RECORD.size)
+        return {
+            "food_name": self._string(name_off, name_len),
+            "name_ko": self._string(ko_off, ko_len) if ko_len else None,
+            "calories": round(calories, 1),
+            "protein": round(protein, 1),
+            "fat": round(fat, 1),
+            "carbs": round(carbs, 1),
+            "health_score": health_score,
+        }
+
+    def _entry(self, entry_id):
+        return ENTRY.unpack_from(self._buf, self._entries + entry_id * ENTRY.size)
+
+    def _entry_name(self, entry_id):
+        record_id, lang = self._entry(entry_id)
+        name_off, name_len, ko_off, ko_len = RECORD.unpack_from(
+            self._buf, self._records + record_id * RECORD.size)[:4]
+        return self._string(ko_off, ko_len) if lang else self._string(name_off, name_len)
+
+    def _exact_entry(self, normalized):
+        key = name_key(normalized)
+        i = bisect.bisect_left(self._exact_keys, key)
+        if i < self.n_exact and self._exact_keys[i] == key:
+            return EXACT.unpack_from(self._buf, self._exact + i * EXACT.size)[1]
+        return None
+
+    def _posting_list(self, gram):
+        key = trigram_key(gram)
+        i = bisect.bisect_left(self._trigram_keys, key)
+        if i >= self.n_trigrams or self._trigram_keys[i] != key:
+            return None
+        _, offset, count = TRIGRAM.unpack_from(self._buf, self._trigrams + i * TRIGRAM.size)
+        return self._postings + offset * 4, count
+
+    def search(self, query, limit=5):
+        """
+        Best matches for a free-text food name (English or Korean, typos allowed),
+        as a list of records with a 'match_score' in [0, 1]
+        """
+        self._load()
+        normalized = normalize(query)
+        if not normalized:
+            return []
+
+        exact = self._exact_entry(normalized)
+        if exact is not None:
+            return [dict(self.record(self._entry(exact)[0]), match_score=1.0)]
+
+        # Gather candidates from the rarest query trigrams, then re-score exactly
+        query_grams = trigrams(normalized)
+        lists = [p for p in (self._posting_list(g) for g in query_grams) if p is not None]
+        lists.sort(key=lambda posting: posting[1])
+        hits = Counter()
+        budget = MAX_POSTINGS_SCANNED
+        for start, count in lists[:MAX_CANDIDATE_TRIGRAMS]:
+            if hits and count > budget:
+                break
+            count = min(count, budget)
+            ids = array('I')
+            ids.frombytes(self._buf[start:start + count * 4])
+            hits.update(ids)
+            budget -= count
+
+        best = {}
+        for entry_id, _ in hits.most_common(MAX_CANDIDATES):
+            record_id = self._entry(entry_id)[0]
+            score = dice(query_grams, trigrams(normalize(self._entry_name(entry_id))))
+            if score > best.get(record_id, 0.0):
+                best[record_id] = score
+
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [dict(self.record(record_id), match_score=round(score, 3)) for record_id, score in ranked]
+
+    def match(self, query, min_score=MIN_MATCH_SCORE):
+        """
+        Single best record for a query, or None when nothing is close enough
+        """
+        results = self.search(query, limit=1)
+        if results and results[0]['match_score'] >= min_score:
+            return results[0]
+        return None
+
+
+_default_catalog = None
+
+
+def get_catalog():
+    global _default_catalog
+    if _default_catalog is None:
+        _default_catalog = FoodCatalog()
+    return _default_catalog
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="FoodCoach food catalog")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="build the catalog from the seed list or a CSV export")
+    build.add_argument("--csv", help="CSV with name, name_ko, calories, protein, fat, carbs, health_score")
+    build.add_argument("--out", default=CATALOG_PATH)
+    lookup = subparsers.add_parser("search", help="look up a food name")
+    lookup.add_argument("query")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if args.csv:
+            count = build_catalog(iter_csv_records(args.csv), args.out)
+        else:
+            count = build_catalog(seed_records(), args.out, seed_digest())
+        print(f"Built catalog with {count} foods at {args.out}")
+    else:
+        for result in get_catalog().search(args.query):
+            print(result)
@@ -0,0 +1,178 @@
+import time
+
+import numpy as np
+
+from execution.diary_db import get_store
+from execution.metrics import timed
+
+NUTRIENTS = ('calories', 'protein', 'fat', 'carbs')
+
+# Mifflin-St Jeor sex constant; unknown gender falls between the two
+GENDER_OFFSET_SQL = "CASE lower(gender) WHEN 'male' THEN 5.0 WHEN 'female' THEN -161.0 ELSE -78.0 END"
+GOAL_CODE_SQL = "CASE lower(goal) WHEN 'lose' THEN 0 WHEN 'gain' THEN 2 ELSE 1 END"
+
+ACTIVITY_FACTOR = 1.375           # lightly active
+GOAL_CALORIE_DELTA = np.array([-500.0, 0.0, 300.0])    # lose, maintain, gain
+GOAL_PROTEIN_PER_KG = np.array([1.6, 1.2, 2.0])        # g per kg body weight
+MIN_CALORIES = 1200.0
+FAT_CALORIE_SHARE = 0.25
+# user_ids per IN (...) query, under SQLite's 999 bound parameters (SQLITE_MAX_VARIABLE_NUMBER before 3.32)
+ID_CHUNK_SIZE = 900
+
+SELECT_COHORT_SQL = f'''
+SELECT id, age, height, weight, {GENDER_OFFSET_SQL}, {GOAL_CODE_SQL}
+FROM user_profile
+'''
+
+SELECT_DAY_INTAKE_SQL = '''
+SELECT user_id, calories, protein, fat, carbs FROM daily_totals WHERE day = ?
+'''
+
+# Each user's own calendar day at a given instant; profiles drive the join so every
+# lookup is a daily_totals primary-key probe
+SELECT_LOCAL_DAY_INTAKE_SQL = '''
+SELECT user_id, calories, protein, fat, carbs
+FROM user_profile p CROSS JOIN daily_totals d
+WHERE d.user_id = p.id AND d.day = local_day(?, p.timezone)
+'''
+
+
+def compute_targets(age, height, weight, gender_offset, goal_code):
+    """
+    Daily targets for whole arrays of users at once.
+    Returns an (n, 4) array ordered like NUTRIENTS.
+    """
+    bmr = 10.0 * weight + 6.25 * height - 5.0 * age + gender_offset
+    tdee = bmr * ACTIVITY_FACTOR
+    calories = np.maximum(tdee + GOAL_CALORIE_DELTA[goal_code], MIN_CALORIES)
+    protein = weight * GOAL_PROTEIN_PER_KG[goal_code]
+    fat = calories * FAT_CALORIE_SHARE / 9.0
+    carbs = np.maximum(calories - protein * 4.0 - fat * 9.0, 0.0) / 4.0
+    return np.column_stack((calories, protein, fat, carbs))
+
+
+class Cohort:
+    """
+    Column arrays for a set of users, sorted by user id
+    """
+
+    def __init__(self, user_ids, age, height, weight, gender_offset, goal_code, intake):
+        self.user_ids = user_ids
+        self.age = age
+        self.height = height
+        self.weight = weight
+        self.gender_offset = gender_offset
+        self.goal_code = goal_code
+        self.intake = intake
+
+    def __len__(self):
+        return len(self.user_ids)
+
+
+class GapResult:
+    def __init__(self, user_ids, targets, intake, gaps):
+        self.user_ids = user_ids
+        self.targets = targets
+        self.intake = intake
+        self.gaps = gaps
+
+    def for_user(self, user_id):
+        i = int(np.searchsorted(self.user_ids, user_id))
+        if i >= len(self.user_ids) or self.user_ids[i] != user_id:
+            return None
+        return {name: float(self.gaps[i, k]) for k, name in enumerate(NUTRIENTS)}
+
+    def missing_nutrients(self, threshold=0.2):
+        """
+        Per user, the macros whose gap exceeds `threshold` of the expected intake,
+        as a boolean (n, 4) mask ordered like NUTRIENTS
+        """
+        return self.gaps > threshold * self.targets
+
+
+class GapEngine:
+    """
+    Batched nutrient-gap analysis for a user cohort.
+
+    Profiles and today's intake (from daily_totals) are loaded into NumPy columns,
+    so targets and gaps for every user come out of a handful of array operations.
+    "Today" is a 'YYYY-MM-DD' day from the caller, or else each user's local day
+    (user_profile.timezone) at `now`, epoch seconds defaulting to the current time.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or get_store()
+
+    @timed("db_seconds")
+    def load_cohort(self, day=None, user_ids=None, now=None):
+        conn = self.store.connection()
+        if day is None:
+            intake_sql, day_param = SELECT_LOCAL_DAY_INTAKE_SQL, int(time.time() if now is None else now)
+        else:
+            intake_sql, day_param = SELECT_DAY_INTAKE_SQL, day
+
+        if user_ids is None:
+            profile_rows = conn.execute(SELECT_COHORT_SQL + " ORDER BY id").fetchall()
+            intake_rows = conn.execute(intake_sql, (day_param,)).fetchall()
+        else:
+            # Sorted chunks keep the profile rows in id order across queries
+            ids = sorted(set(user_ids))
+            profile_rows, intake_rows = [], []
+            for i in range(0, len(ids), ID_CHUNK_SIZE):
+                params = tuple(ids[i:i + ID_CHUNK_SIZE])
+                placeholders = ','.join('?' * len(params))
+                profile_rows += conn.execute(
+                    SELECT_COHORT_SQL + f" WHERE id IN ({placeholders}) ORDER BY id", params).fetchall()
+                intake_rows += conn.execute(
+                    intake_sql + f" AND user_id IN ({placeholders})", (day_param,) + params).fetchall()
+        profiles = np.array(profile_rows, dtype=np.float64)
+        if profiles.size == 0:
+            profiles = np.empty((0, 6))
+
+        ids = profiles[:, 0].astype(np.int64)
+        intake = np.zeros((len(ids), len(NUTRIENTS)))
+        rows = np.array(intake_rows, dtype=np.float64)
+        if rows.size and len(ids):
+            row_ids = rows[:, 0].astype(np.int64)
+            pos = np.minimum(np.searchsorted(ids, row_ids), len(ids) - 1)
+            known = ids[pos] == row_ids
+            intake[pos[known]] = rows[known, 1:]
+
+        return Cohort(
+            ids,
+            np.nan_to_num(profiles[:, 1], nan=30.0),
+            np.nan_to_num(profiles[:, 2], nan=170.0),
+            np.nan_to_num(profiles[:, 3], nan=65.0),
+            profiles[:, 4],
+            profiles[:, 5].astype(np.int64),
+            intake,
+        )
+
+    def compute_gaps(self, cohort, day_fraction=1.0):
+        """
+        Gap between the share of the daily target expected by now and what was eaten.
+        day_fraction is how much of the day's intake is due (e.g. ~0.35 by lunch).
+        """
+        targets = compute_targets(cohort.age, cohort.height, cohort.weight, cohort.gender_offset, cohort.goal_code)
+        expected = targets * day_fraction
+        gaps = np.maximum(expected - cohort.intake, 0.0)
+        return GapResult(cohort.user_ids, expected, cohort.intake, gaps)
+
+    def cohort_gaps(self, day=None, user_ids=None, day_fraction=1.0, now=None):
+        return self.compute_gaps(self.load_cohort(day, user_ids, now), day_fraction)
+
+    def missing_nutrients(self, user_id, day=None, day_fraction=1.0, threshold=0.2, now=None):
+        """
+        Names of the macros a single user is short on, most severe first, e.g. ['protein']
+        """
+        result = self.cohort_gaps(day, [user_id], day_fraction, now)
+        if not len(result.user_ids):
+            return []
+        shortfall = result.gaps[0] / np.maximum(result.targets[0], 1e-9)
+        return [NUTRIENTS[k] for k in np.argsort(-shortfall) if shortfall[k] > threshold]
+
+
+if __name__ == "__main__":
+    engine = GapEngine()
+    result = engine.cohort_gaps()
+    print(f"Computed gaps for {len(result.user_ids)} users")
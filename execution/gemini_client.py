@@ -0,0 +1,309 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import queue
+import threading
+
+import aiohttp
+
+from execution.metrics import count, observe, in_flight
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Free-tier Flash defaults; raise them for a paid plan
+DEFAULT_RPM = 15
+DEFAULT_TPM = 1000000
+
+IMAGE_TOKENS = 258                # Gemini bills each inline image at a flat token count
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GeminiError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f"Gemini request failed ({status}): {body}")
+        self.status = status
+        self.body = body
+
+
+class TokenBucket:
+    """
+    Refills `rate_per_minute` tokens per minute up to `capacity`; acquire() waits for enough tokens
+    """
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets applied together
+    """
+
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+    async def acquire(self, tokens):
+        if self.requests:
+            await self.requests.acquire(1)
+        if self.tokens:
+            await self.tokens.acquire(tokens)
+
+
+def estimate_tokens(payload):
+    """
+    Rough prompt size: ~4 characters per text token plus a flat cost per image
+    """
+    total = 0
+    for content in payload.get("contents", []):
+        for part in content.get("parts", []):
+            if "text" in part:
+                total += len(part["text"]) // 4 + 1
+            elif "inline_data" in part or "inlineData" in part:
+                total += IMAGE_TOKENS
+    return total + payload.get("generationConfig", {}).get("maxOutputTokens", 256)
+
+
+def extract_text(response):
+    return response["candidates"][0]["content"]["parts"][0]["text"]
+
+
+class ClientStats:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.coalesced = 0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "server_errors": self.server_errors,
+            "coalesced": self.coalesced,
+        }
+
+
+class GeminiClient:
+    """
+    Async Gemini client over one pooled aiohttp session.
+
+    Every call passes through an RPM/TPM token-bucket scheduler, retries 429/5xx
+    with exponential backoff and full jitter (honouring Retry-After), and identical
+    in-flight requests are coalesced into a single upstream call.
+    """
+
+    def __init__(self, api_key=None, model=DEFAULT_MODEL, base_url=GEMINI_BASE_URL,
+                 rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_retries=5, base_delay=0.5, max_delay=30.0,
+                 max_connections=20, timeout=60.0):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.stats = ClientStats()
+        self._session = None
+        self._limiter = None
+        self._inflight = {}
+        self._loop = None
+        self._loop_thread = None
+
+    async def _ensure_session(self):
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # Session, locks and limiter are bound to the loop that created them
+            await self._discard_session()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._limiter = RateLimiter(self.rpm, self.tpm)
+            self._inflight = {}
+            self._loop = loop
+        return self._session
+
+    async def _discard_session(self):
+        """
+        Close a session created on another event loop before replacing it
+        """
+        session, loop = self._session, self._loop
+        self._session = None
+        if session is None or session.closed:
+            return
+        if loop.is_closed():
+            # Its connections died with the loop; close() only marks the pool closed
+            await session.close()
+        else:
+            # Transports belong to their loop, so the close has to run there
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        await self._ensure_session()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _url(self, model=None):
+        return f"{self.base_url}/models/{model or self.model}:generateContent"
+
+    async def generate(self, payload, model=None):
+        """
+        POST a generateContent payload and return the decoded JSON response
+        """
+        await self._ensure_session()
+        key = hashlib.sha256(
+            json.dumps([model or self.model, payload], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+            count("gemini_coalesced_total")
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(self._send_with_retry(payload, model))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def generate_text(self, prompt, model=None, **generation_config):
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        if generation_config:
+            payload["generationConfig"] = generation_config
+        return extract_text(await self.generate(payload, model))
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def _send_with_retry(self, payload, model):
+        session = self._session
+        tokens = estimate_tokens(payload)
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["x-goog-api-key"] = self.api_key
+
+        attempt = 0
+        while True:
+            await self._limiter.acquire(tokens)
+            self.stats.requests += 1
+            start = time.perf_counter()
+            retry_after = None
+            try:
+                with in_flight("external_calls_in_flight", service="gemini"):
+                    async with session.post(self._url(model), json=payload, headers=headers) as response:
+                        if response.status == 200:
+                            body = await response.json()
+                            observe("external_call_seconds", time.perf_counter() - start, service="gemini",
+                                    status=200)
+                            return body
+                        text = await response.text()
+                        status = response.status
+                        retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, text = None, str(e)
+            observe("external_call_seconds", time.perf_counter() - start, service="gemini", status=status or "error")
+
+            if status == 429:
+                self.stats.throttled += 1
+            elif status is None or status >= 500:
+                self.stats.server_errors += 1
+
+            if (status is not None and status not in RETRY_STATUSES) or attempt >= self.max_retries:
+                raise GeminiError(status, text)
+            self.stats.retries += 1
+            count("gemini_retries_total")
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    # --- Synchronous callers ---
+
+    def run_sync(self, coro):
+        """
+        Run a coroutine on this client's background event loop and wait for it, so
+        synchronous callers share one session and rate limiter across calls
+        """
+        if self._loop_thread is None:
+            self._loop_thread = _BackgroundLoop()
+        return self._loop_thread.run(coro)
+
+    def iter_sync(self, aiterable):
+        """
+        Iterate an async generator from synchronous code: it runs on the background
+        loop and hands each item over through a queue as soon as it is produced
+        """
+        if self._loop_thread is None:
+            self._loop_thread = _BackgroundLoop()
+        items = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in aiterable:
+                    items.put((True, item))
+            except BaseException as e:
+                items.put((False, e))
+            else:
+                items.put((False, None))
+
+        self._loop_thread.submit(pump())
+        while True:
+            ok, item = items.get()
+            if ok:
+                yield item
+            elif item is None:
+                return
+            else:
+                raise item
+
+
+class _BackgroundLoop:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="gemini-client", daemon=True)
+        self.thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        return self.submit(coro).result()
@@ -0,0 +1,179 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from aiohttp import web
+
+from execution.gemini_client import GeminiClient, GeminiError
+from execution import metrics
+
+STUB_ANALYSIS = {
+    "food_name": "Chicken Breast Salad",
+    "food_name_ko": "닭가슴살 샐러드",
+    "estimated_calories": 350,
+    "macros": {"protein": 30, "fat": 15, "carbs": 10},
+    "confidence": 0.92,
+}
+
+# Gemini accepts inline requests up to 20MB
+MAX_REQUEST_BYTES = 20 * 1024 * 1024
+
+
+class GeminiStub:
+    """
+    Local stand-in for generateContent that injects latency, 429s and 5xx.
+
+    With server_rpm set it also enforces a sliding one-minute request quota, like
+    the real free tier, and answers over-quota calls with 429 + Retry-After.
+    """
+
+    def __init__(self, latency_ms=(50, 250), error_429=0.0, error_5xx=0.0, server_rpm=None, seed=None,
+                 per_image_ms=0, batch_drop=0.0):
+        self.latency_ms = latency_ms
+        self.per_image_ms = per_image_ms
+        self.batch_drop = batch_drop
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.server_rpm = server_rpm
+        self.random = random.Random(seed)
+        self.window = []
+        self.counts = {"requests": 0, "ok": 0, "429": 0, "5xx": 0}
+
+    def _over_quota(self):
+        if not self.server_rpm:
+            return False
+        now = time.monotonic()
+        self.window = [t for t in self.window if now - t < 60.0]
+        if len(self.window) >= self.server_rpm:
+            return True
+        self.window.append(now)
+        return False
+
+    async def generate_content(self, request):
+        self.counts["requests"] += 1
+        payload = await request.json()
+        images = sum(1 for content in payload.get("contents", []) for part in content.get("parts", [])
+                     if "inline_data" in part)
+        await asyncio.sleep((self.random.uniform(*self.latency_ms) + self.per_image_ms * images) / 1000.0)
+
+        if self._over_quota() or self.random.random() < self.error_429:
+            self.counts["429"] += 1
+            return web.json_response({"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}},
+                                     status=429, headers={"Retry-After": "1"})
+        if self.random.random() < self.error_5xx:
+            self.counts["5xx"] += 1
+            return web.json_response({"error": {"code": 503, "status": "UNAVAILABLE"}}, status=503)
+
+        self.counts["ok"] += 1
+        wants_json = payload.get("generationConfig", {}).get("responseMimeType") == "application/json"
+        if wants_json and images > 1:
+            # Multi-image prompt: one entry per image, some dropped to exercise fallbacks
+            entries = [dict(STUB_ANALYSIS, image=n) for n in range(1, images + 1)
+                       if self.random.random() >= self.batch_drop]
+            text = json.dumps(entries, ensure_ascii=False)
+        else:
+            text = json.dumps(STUB_ANALYSIS, ensure_ascii=False) if wants_json else "OK"
+        return web.json_response({"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]})
+
+    def app(self):
+        app = web.Application(client_max_size=MAX_REQUEST_BYTES)
+        app.router.add_post("/v1beta/models/{model}", self.generate_content)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Serve on host:port (0 picks a free port); returns the base URL for GeminiClient
+        """
+        self.runner = web.AppRunner(self.app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/v1beta"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def run_load(requests=200, concurrency=50, rpm=600, tpm=None, max_retries=5,
+                   error_429=0.1, error_5xx=0.02, server_rpm=None, duplicates=0.0, seed=7):
+    """
+    Drive GeminiClient against the stub and report throughput and tail latency
+    """
+    stub = GeminiStub(error_429=error_429, error_5xx=error_5xx, server_rpm=server_rpm, seed=seed)
+    base_url = await stub.start()
+    client = GeminiClient("stub-key", base_url=base_url, rpm=rpm, tpm=tpm,
+                          max_retries=max_retries, base_delay=0.05, max_delay=2.0)
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+    failures = 0
+
+    async def one(i):
+        nonlocal failures
+        # A share of prompts repeat to exercise in-flight coalescing
+        n = rng.randrange(max(i, 1)) if rng.random() < duplicates else i
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await client.generate_text(f"Request {n}: Say 'OK'")
+                durations.append(time.perf_counter() - start)
+            except GeminiError:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await client.close()
+    await stub.stop()
+
+    report = {
+        "requests": requests,
+        "succeeded": len(durations),
+        "failed": failures,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(durations) / elapsed, 1),
+        "p50_ms": round(percentile(durations, 50) * 1000, 1),
+        "p95_ms": round(percentile(durations, 95) * 1000, 1),
+        "p99_ms": round(percentile(durations, 99) * 1000, 1),
+        "client": client.stats.as_dict(),
+        "server": stub.counts,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test GeminiClient against a local stub server")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rpm", type=int, default=600, help="client-side request budget")
+    parser.add_argument("--server-rpm", type=int, default=None, help="stub quota; omit for none")
+    parser.add_argument("--error-429", type=float, default=0.1)
+    parser.add_argument("--error-5xx", type=float, default=0.02)
+    parser.add_argument("--duplicates", type=float, default=0.0)
+    parser.add_argument("--serve", action="store_true", help="only run the stub on --port")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--metrics", action="store_true", help="print client metrics in Prometheus format")
+    args = parser.parse_args()
+
+    if args.serve:
+        stub = GeminiStub(error_429=args.error_429, error_5xx=args.error_5xx, server_rpm=args.server_rpm)
+        web.run_app(stub.app(), host="127.0.0.1", port=args.port)
+    else:
+        if args.metrics:
+            metrics.enable()
+        report = asyncio.run(run_load(args.requests, args.concurrency, args.rpm,
+                                      error_429=args.error_429, error_5xx=args.error_5xx,
+                                      server_rpm=args.server_rpm, duplicates=args.duplicates))
+        print(json.dumps(report, indent=2))
+        if args.metrics:
+            print(metrics.prometheus_text())
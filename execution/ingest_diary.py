@@ -0,0 +1,50 @@
+import csv
+import json
+import argparse
+
+from execution.diary_db import init_db, MEAL_COLUMNS, DEFAULT_CHUNK_SIZE
+
+NUMERIC_COLUMNS = ('calories', 'protein', 'fat', 'carbs')
+
+
+def _clean(record):
+    # Only blanks are missing; a 0 (fat: 0) is a value
+    meal = {column: None if record.get(column) in (None, '') else record[column] for column in MEAL_COLUMNS}
+    for column in NUMERIC_COLUMNS:
+        if meal[column] is not None:
+            meal[column] = float(meal[column])
+    if meal['user_id'] is not None:
+        meal['user_id'] = int(meal['user_id'])
+    return meal
+
+
+def iter_meals(path):
+    """
+    Stream meal records from a .csv (header row) or .jsonl export without loading the file
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield _clean(json.loads(line))
+        else:
+            for record in csv.DictReader(f):
+                yield _clean(record)
+
+
+def run_ingest(path, chunk_size=DEFAULT_CHUNK_SIZE, store=None):
+    store = store or init_db()
+    stats = store.bulk_insert_meals(iter_meals(path), chunk_size=chunk_size)
+    print(f"Ingested {stats['rows']} rows from {path} in {stats['chunks']} chunks "
+          f"({stats['seconds']:.2f}s, {stats['rows_per_sec']:.0f} rows/s)")
+    if stats['rejected']:
+        print(f"Rejected {stats['rejected']} rows without a user_id or timestamp")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import a historical meal diary")
+    parser.add_argument("path", help="CSV or JSONL file with columns: " + ", ".join(MEAL_COLUMNS))
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+    run_ingest(args.path, args.chunk_size)
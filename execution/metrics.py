@@ -0,0 +1,373 @@
+import os
+import json
+import time
+import bisect
+import inspect
+import functools
+import threading
+
+NAMESPACE = "foodcoach"
+ENV_FLAG = "FOODCOACH_METRICS"
+
+# Upper bounds (seconds) shared by every latency histogram; +Inf is implicit
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Off unless FOODCOACH_METRICS is set or enable() is called; every recorder checks
+# this first, so instrumented code pays one global lookup when it is off
+ENABLED = os.getenv(ENV_FLAG, "") not in ("", "0")
+
+
+class _Buffer:
+    """
+    One thread's metrics. Only the owning thread writes; scrapes read and merge
+    """
+    __slots__ = ("counters", "gauges", "histograms")
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}       # key -> [count, sum, per-bucket counts..., +Inf count]
+
+    def merge(self, other):
+        for key, value in list(other.counters.items()):
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, value in list(other.gauges.items()):
+            self.gauges[key] = self.gauges.get(key, 0) + value
+        for key, hist in list(other.histograms.items()):
+            mine = self.histograms.get(key)
+            if mine is None:
+                self.histograms[key] = list(hist)
+            else:
+                for i, value in enumerate(hist):
+                    mine[i] += value
+
+
+_local = threading.local()
+_lock = threading.Lock()
+_buffers = []              # (thread, buffer) for every thread that recorded something
+_retired = _Buffer()       # buffers of finished threads, folded in at scrape time
+
+
+def _buffer():
+    try:
+        return _local.buffer
+    except AttributeError:
+        buf = _local.buffer = _Buffer()
+        with _lock:
+            _buffers.append((threading.current_thread(), buf))
+        return buf
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def _observe(key, seconds):
+    histograms = _buffer().histograms
+    hist = histograms.get(key)
+    if hist is None:
+        hist = histograms[key] = [0, 0.0] + [0] * (len(LATENCY_BUCKETS) + 1)
+    hist[0] += 1
+    hist[1] += seconds
+    hist[2 + bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+
+def _count(key, value=1):
+    counters = _buffer().counters
+    counters[key] = counters.get(key, 0) + value
+
+
+def _error_name(name):
+    return (name[:-len("_seconds")] if name.endswith("_seconds") else name) + "_errors_total"
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    """
+    Drop recorded counters and histograms. In-flight gauges keep tracking the
+    blocks still running, so they are left alone.
+    """
+    with _lock:
+        for buf in [_retired] + [buf for _, buf in _buffers]:
+            buf.counters.clear()
+            buf.histograms.clear()
+
+
+# --- Recording ---
+
+def count(name, value=1, **labels):
+    if ENABLED:
+        _count(_key(name, labels), value)
+
+
+def observe(name, seconds, **labels):
+    if ENABLED:
+        _observe(_key(name, labels), seconds)
+
+
+class _Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _Noop()
+
+
+class _Timer:
+    __slots__ = ("key", "start", "seconds")
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.start
+        _observe(self.key, self.seconds)
+        if exc_type is not None:
+            _count((_error_name(self.key[0]), self.key[1]))
+        return False
+
+
+class _InFlight:
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        gauges = _buffer().gauges
+        gauges[self.key] = gauges.get(self.key, 0) + 1
+        return self
+
+    def __exit__(self, *exc):
+        # Decrements land in the exiting thread's buffer; the merged sum is still right
+        gauges = _buffer().gauges
+        gauges[self.key] = gauges.get(self.key, 0) - 1
+        return False
+
+
+def timer(name, **labels):
+    """
+    with timer("x_seconds", op="y"): ... records the block's latency (and an
+    x_errors_total count when it raises)
+    """
+    if not ENABLED:
+        return _NOOP
+    return _Timer(_key(name, labels))
+
+
+def in_flight(name, **labels):
+    """
+    Gauge of blocks currently inside `with in_flight(...)`
+    """
+    if not ENABLED:
+        return _NOOP
+    return _InFlight(_key(name, labels))
+
+
+def timed(name, **labels):
+    """
+    Decorator form of timer() for functions and coroutines.
+    Without labels the function's qualified name becomes the `op` label.
+    """
+    def decorate(fn):
+        if inspect.isgeneratorfunction(fn) or inspect.isasyncgenfunction(fn):
+            # The call only creates the generator; time the consuming loop with timer()
+            raise TypeError(f"timed() cannot time generator {fn.__qualname__}")
+        key = _key(name, labels or {"op": fn.__qualname__})
+        errors = (_error_name(name), key[1])
+
+        if inspect.iscoroutinefunction(fn):
+            async def wrapper(*args, **kwargs):
+                if not ENABLED:
+                    return await fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except BaseException:
+                    _count(errors)
+                    raise
+                finally:
+                    _observe(key, time.perf_counter() - start)
+        else:
+            def wrapper(*args, **kwargs):
+                if not ENABLED:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                except BaseException:
+                    _count(errors)
+                    raise
+                finally:
+                    _observe(key, time.perf_counter() - start)
+        return functools.wraps(fn)(wrapper)
+    return decorate
+
+
+# --- Scraping ---
+
+def collect():
+    """
+    Merge every thread's buffer into one; finished threads are folded away for good
+    """
+    merged = _Buffer()
+    with _lock:
+        live = []
+        for thread, buf in _buffers:
+            if thread.is_alive():
+                live.append((thread, buf))
+            else:
+                _retired.merge(buf)
+        _buffers[:] = live
+        merged.merge(_retired)
+        for _, buf in live:
+            merged.merge(buf)
+    return merged
+
+
+def quantile(hist, q):
+    """
+    Estimate a quantile from histogram counts by interpolating inside its bucket
+    """
+    count = hist[0]
+    if not count:
+        return 0.0
+    rank = q * count
+    seen = 0
+    lower = 0.0
+    for upper, n in zip(LATENCY_BUCKETS + (None,), hist[2:]):
+        if n and seen + n >= rank:
+            if upper is None:         # +Inf bucket: the best we can say is the top bound
+                return lower
+            return lower + (upper - lower) * (rank - seen) / n
+        seen += n
+        lower = upper if upper is not None else lower
+    return lower
+
+
+def _labels_dict(labels):
+    return {k: str(v) for k, v in labels}
+
+
+def snapshot():
+    """
+    Plain dict of everything recorded, for JSON dumps and summaries
+    """
+    merged = collect()
+    return {
+        "counters": [{"name": name, "labels": _labels_dict(labels), "value": value}
+                     for (name, labels), value in sorted(merged.counters.items())],
+        "gauges": [{"name": name, "labels": _labels_dict(labels), "value": value}
+                   for (name, labels), value in sorted(merged.gauges.items())],
+        "histograms": [{"name": name, "labels": _labels_dict(labels), "count": hist[0], "sum": hist[1],
+                        "p50": quantile(hist, 0.5), "p95": quantile(hist, 0.95), "p99": quantile(hist, 0.99)}
+                       for (name, labels), hist in sorted(merged.histograms.items())],
+    }
+
+
+def dump_json(path=None):
+    text = json.dumps(snapshot(), indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+    return text
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(labels, extra=()):
+    pairs = [f'{k}="{_escape(v)}"' for k, v in tuple(labels) + tuple(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def prometheus_text():
+    """
+    Prometheus text exposition format (0.0.4)
+    """
+    merged = collect()
+    lines = []
+    typed = set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(merged.counters.items()):
+        full = f"{NAMESPACE}_{name}"
+        header(full, "counter")
+        lines.append(f"{full}{_labels_text(labels)} {value}")
+    for (name, labels), value in sorted(merged.gauges.items()):
+        full = f"{NAMESPACE}_{name}"
+        header(full, "gauge")
+        lines.append(f"{full}{_labels_text(labels)} {value}")
+    for (name, labels), hist in sorted(merged.histograms.items()):
+        full = f"{NAMESPACE}_{name}"
+        header(full, "histogram")
+        cumulative = 0
+        for upper, n in zip(LATENCY_BUCKETS, hist[2:]):
+            cumulative += n
+            lines.append(f"{full}_bucket{_labels_text(labels, [('le', repr(upper))])} {cumulative}")
+        lines.append(f"{full}_bucket{_labels_text(labels, [('le', '+Inf')])} {hist[0]}")
+        lines.append(f"{full}_sum{_labels_text(labels)} {hist[1]}")
+        lines.append(f"{full}_count{_labels_text(labels)} {hist[0]}")
+    return "\n".join(lines) + "\n"
+
+
+def _handler():
+    # http.server costs ~30 ms to import; only processes that serve pay for it
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = prometheus_text(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = dump_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return MetricsHandler
+
+
+def serve(port=9464, host="127.0.0.1"):
+    """
+    Serve /metrics (Prometheus) and /metrics.json from a daemon thread; returns the server
+    """
+    from http.server import ThreadingHTTPServer
+
+    enable()
+    server = ThreadingHTTPServer((host, port), _handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
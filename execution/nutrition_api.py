@@ -1,33 +1,59 @@
-import requests
 import os
 
+from execution.food_catalog import get_catalog
+from execution.venue_store import VenueStore, DEFAULT_RADIUS_M
+from execution.metrics import timed, count
+
 class NutritionEngine:
-    def __init__(self, api_key=None, app_id=None):
+    def __init__(self, api_key=None, app_id=None, catalog=None, venues=None, adoption=None, portions=None):
         self.api_key = api_key or os.getenv("NUTRITIONIX_API_KEY")
         self.app_id = app_id or os.getenv("NUTRITIONIX_APP_ID")
+        # Not `or`: that would call len() and load the lazy catalog, and replace an empty one
+        self.catalog = catalog if catalog is not None else get_catalog()
+        self.venues = venues or VenueStore()
+        self.adoption = adoption
+        self.portions = portions
 
-    def get_nutrition(self, query):
+    def get_nutrition(self, query, user_id=None):
         """
-        Fetch detailed nutrition data for a food string
+        Fetch detailed nutrition data for a food string.
+        Resolved against the local food catalog first; remote lookup only on a miss.
+        With a PortionModel and a user_id, values are scaled to the user's portions.
         """
+        match = self.catalog.match(query)
+        if match:
+            count("nutrition_lookups_total", source="catalog")
+            result, food_name = dict(match, source="catalog"), match["food_name"]
+        else:
+            count("nutrition_lookups_total", source="remote")
+            result, food_name = self._fetch_remote(query), query
+        if self.portions is not None and user_id is not None:
+            return self.portions.apply(user_id, food_name, result)
+        return result
+
+    @timed("external_call_seconds", service="nutritionix")
+    def _fetch_remote(self, query):
         # Mocking Nutritionix API call
         return {
             "calories": 250,
             "protein": 5,
             "fat": 10,
-            "carbs": 35
+            "carbs": 35,
+            "source": "remote"
         }
 
-    def find_nearby_recommendations(self, lat, lon, missing_nutrients):
+    def find_nearby_recommendations(self, lat, lon, missing_nutrients, radius_m=DEFAULT_RADIUS_M, limit=3,
+                                    user_id=None):
         """
-        Find nearby food items that fill nutrient gaps
+        Find nearby food items that fill nutrient gaps, with numeric distance_m in meters.
+        With an AdoptionModel, items the user tends to accept rank higher.
         """
         print(f"Searching nearby {lat}, {lon} for {missing_nutrients}")
-        return [
-            {"name": "Protein Shake", "place": "CU Convenience Store", "distance": "200m"},
-            {"name": "Greek Yogurt", "place": "Starbucks", "distance": "450m"}
-        ]
+        adoption = self.adoption.scorer(user_id) if self.adoption else None
+        return self.venues.find_nearby(lat, lon, missing_nutrients, radius_m=radius_m, limit=limit,
+                                       adoption=adoption)
 
 if __name__ == "__main__":
     engine = NutritionEngine()
+    engine.venues.seed_demo_venues()
     print(engine.find_nearby_recommendations(37.5665, 126.9780, ["protein"]))
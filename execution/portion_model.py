@@ -0,0 +1,262 @@
+import math
+import time
+import threading
+from functools import lru_cache
+
+from execution.diary_db import get_store, init_db, INSERT_CORRECTION_SQL, MEAL_COLUMNS
+from execution.food_catalog import normalize
+from execution.metrics import timed
+
+ALL_FOODS = ''
+NUTRIENT_FIELDS = ('calories', 'protein', 'fat', 'carbs')
+
+MEMORY = 20.0                 # corrections a calibration averages over before older ones fade
+PRIOR_STRENGTH = 3.0          # pseudo-corrections each level borrows from the one above
+MIN_FACTOR, MAX_FACTOR = 0.25, 4.0
+
+SELECT_MEAL_SQL = "SELECT user_id, food_name, calories, protein, fat, carbs FROM meal_diary WHERE id = ?"
+SELECT_CALIBRATION_SQL = "SELECT user_id, food_key, log_ratio, weight FROM portion_calibration"
+UPSERT_CALIBRATION_SQL = '''
+INSERT INTO portion_calibration (user_id, food_key, log_ratio, weight, updated_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (user_id, food_key) DO UPDATE SET
+    log_ratio = excluded.log_ratio, weight = excluded.weight, updated_at = excluded.updated_at
+'''
+# Only a meal's first calorie correction is measured against a model estimate;
+# later edits of the same meal correct the user's own number
+FIRST_CALORIE_CORRECTION_SQL = "SELECT 1 FROM meal_corrections WHERE meal_id = ? AND field = 'calories' LIMIT 1"
+SELECT_CALORIE_CORRECTIONS_SQL = '''
+SELECT user_id, food_key, estimated, corrected, factor, created_at FROM meal_corrections
+WHERE id IN (SELECT MIN(id) FROM meal_corrections WHERE field = 'calories' GROUP BY meal_id)
+  AND user_id IS NOT NULL
+ORDER BY id
+'''
+
+
+class PortionModel:
+    """
+    Per-user portion calibration learned from meal corrections.
+
+    A calorie correction says how far the raw estimate (vision or catalog, before
+    any calibration) was from what the user actually ate. The log of that ratio is
+    averaged per (user, food) and per user across all foods, over the last MEMORY
+    corrections. A food's factor is shrunk toward the user's overall factor, which
+    is shrunk toward 1, so one correction moves estimates only part of the way.
+
+    Factors are recomputed when a correction arrives and kept in a dict, so
+    factor() is two lookups at request time.
+    """
+
+    def __init__(self, store=None, memory=MEMORY, prior_strength=PRIOR_STRENGTH, clock=time.time):
+        self.store = store or get_store()
+        self.memory = memory
+        self.prior_strength = prior_strength
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._stats = {}              # (user_id, food_key) -> [mean log ratio, weight]
+        self._foods = {}              # user_id -> food keys with their own stats
+        self._factors = {}            # (user_id, food_key) -> factor, ALL_FOODS included
+
+    def __len__(self):
+        return len(self._stats)
+
+    # --- Lookups ---
+
+    def factor(self, user_id, food_name):
+        """
+        Multiplier for this user's raw portion estimate of food_name (1.0 when unknown)
+        """
+        factor = self._factors.get((user_id, _food_key(food_name)))
+        if factor is None:
+            factor = self._factors.get((user_id, ALL_FOODS), 1.0)
+        return factor
+
+    def apply(self, user_id, food_name, nutrition):
+        """
+        Copy of a nutrition dict (calories/protein/fat/carbs keys) scaled to the
+        user's portions, with the factor used as portion_factor
+        """
+        factor = self.factor(user_id, food_name)
+        scaled = dict(nutrition, portion_factor=round(factor, 4))
+        for field in NUTRIENT_FIELDS:
+            if isinstance(nutrition.get(field), (int, float)):
+                scaled[field] = round(nutrition[field] * factor, 1)
+        return scaled
+
+    def apply_analysis(self, user_id, analysis):
+        """
+        apply() for a vision result (estimated_calories plus a macros dict)
+        """
+        factor = self.factor(user_id, analysis.get("food_name"))
+        scaled = dict(analysis, portion_factor=round(factor, 4))
+        if isinstance(analysis.get("estimated_calories"), (int, float)):
+            scaled["estimated_calories"] = round(analysis["estimated_calories"] * factor, 1)
+        macros = analysis.get("macros") or {}
+        scaled["macros"] = {k: round(v * factor, 1) if isinstance(v, (int, float)) else v
+                            for k, v in macros.items()}
+        return scaled
+
+    # --- Learning ---
+
+    def _shrunk(self, key, prior):
+        stats = self._stats.get(key)
+        if stats is None:
+            return prior
+        mean, weight = stats
+        return (mean * weight + prior * self.prior_strength) / (weight + self.prior_strength)
+
+    def _refresh(self, user_id, food_keys):
+        user_level = self._shrunk((user_id, ALL_FOODS), 0.0)
+        self._factors[(user_id, ALL_FOODS)] = _clamp(math.exp(user_level))
+        for food_key in food_keys:
+            self._factors[(user_id, food_key)] = _clamp(math.exp(self._shrunk((user_id, food_key), user_level)))
+
+    def _learn(self, user_id, food_key, log_ratio):
+        """
+        Both levels' stats with one more log ratio folded in, as rows to persist;
+        nothing changes in memory until _remember() is given them
+        """
+        rows = []
+        keys = [(user_id, ALL_FOODS)]
+        if food_key != ALL_FOODS:
+            keys.append((user_id, food_key))
+        for key in keys:
+            mean, weight = self._stats.get(key, (0.0, 0.0))
+            weight = min(weight + 1.0, self.memory)
+            rows.append(key + (mean + (log_ratio - mean) / weight, weight))
+        return rows
+
+    def _remember(self, rows):
+        foods = None
+        for user_id, food_key, mean, weight in rows:
+            self._stats[(user_id, food_key)] = [mean, weight]
+            foods = self._foods.setdefault(user_id, set())
+            if food_key != ALL_FOODS:
+                foods.add(food_key)
+        if foods is not None:
+            # A new user-level mean shifts every food prior of this user
+            self._refresh(user_id, foods)
+
+    @timed("db_seconds")
+    def record_correction(self, meal_id, factor=1.0, **values):
+        """
+        Apply a user's edit to a logged meal and learn from it.
+
+        values are the corrected nutrient fields (and any other meal_diary column);
+        factor is the portion_factor of the estimate that was shown, so the lesson is
+        taken against the raw estimate. Every changed nutrient is stored in
+        meal_corrections; a calorie change also updates the calibration.
+        Returns the user's new factor for this food.
+        """
+        unknown = set(values) - set(MEAL_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown meal_diary columns: {sorted(unknown)}")
+        row = self.store.connection().execute(SELECT_MEAL_SQL, (meal_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No meal {meal_id}")
+        user_id, food_name = row[0], values.get('food_name', row[1])
+        key = _food_key(food_name)
+        before = dict(zip(NUTRIENT_FIELDS, row[2:]))
+        now = int(self.clock())
+
+        changes = [(field, before[field], float(values[field])) for field in NUTRIENT_FIELDS
+                   if values.get(field) is not None and before[field] is not None
+                   and float(values[field]) != before[field]]
+        # The lock spans the commit so the next correction learns from these stats,
+        # and memory only changes once the calibration rows are committed
+        calibration = []
+        with self._lock:
+            with self.store.transaction() as conn:
+                first = conn.execute(FIRST_CALORIE_CORRECTION_SQL, (meal_id,)).fetchone() is None
+                self.store.update_meal(meal_id, **values)
+                conn.executemany(INSERT_CORRECTION_SQL, [
+                    (meal_id, user_id, key, field, estimated, corrected, factor, 'user', now)
+                    for field, estimated, corrected in changes
+                ])
+                calories = [(estimated, corrected) for field, estimated, corrected in changes if field == 'calories']
+                if calories and first and user_id is not None:
+                    log_ratio = _log_ratio(calories[0][0], calories[0][1], factor)
+                    if log_ratio is not None:
+                        calibration = self._learn(user_id, key, log_ratio)
+                        conn.executemany(UPSERT_CALIBRATION_SQL, [r + (now,) for r in calibration])
+            self._remember(calibration)
+        return self.factor(user_id, food_name)
+
+    # --- Persistence ---
+
+    @timed("db_seconds")
+    def load(self):
+        """
+        Read portion_calibration into memory, rebuilding from meal_corrections when it is empty
+        """
+        rows = self.store.connection().execute(SELECT_CALIBRATION_SQL).fetchall()
+        if not rows:
+            return self.rebuild()
+        with self._lock:
+            self._reset()
+            for user_id, food_key, log_ratio, weight in rows:
+                self._stats[(user_id, food_key)] = [log_ratio, weight]
+                foods = self._foods.setdefault(user_id, set())
+                if food_key != ALL_FOODS:
+                    foods.add(food_key)
+            for user_id, foods in self._foods.items():
+                self._refresh(user_id, foods)
+        return len(self)
+
+    @timed("db_seconds")
+    def rebuild(self):
+        """
+        Replay every calorie correction (legacy ones included) and rewrite portion_calibration
+        """
+        corrections = self.store.connection().execute(SELECT_CALORIE_CORRECTIONS_SQL).fetchall()
+        with self._lock:
+            self._reset()
+            updated = {}
+            for user_id, food_key, estimated, corrected, factor, created_at in corrections:
+                log_ratio = _log_ratio(estimated, corrected, factor)
+                if log_ratio is not None:
+                    calibration = self._learn(user_id, food_key, log_ratio)
+                    self._remember(calibration)
+                    for user, key, mean, weight in calibration:
+                        updated[(user, key)] = (mean, weight, created_at)
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM portion_calibration")
+            conn.executemany(UPSERT_CALIBRATION_SQL, [key + value for key, value in updated.items()])
+        return len(self)
+
+
+@lru_cache(maxsize=4096)
+def _food_key(food_name):
+    # Dish names repeat heavily, so the Unicode folding is cached
+    return normalize(food_name or '')
+
+
+def _log_ratio(estimated, corrected, factor):
+    # The estimate shown was raw * factor, so corrected / raw = corrected * factor / estimated
+    if not estimated or not corrected or not factor or estimated <= 0 or corrected <= 0:
+        return None
+    return math.log(corrected * factor / estimated)
+
+
+def _clamp(factor):
+    return min(max(factor, MIN_FACTOR), MAX_FACTOR)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-user portion calibration from meal corrections")
+    parser.add_argument("command", choices=["rebuild", "show"])
+    parser.add_argument("--user", type=int)
+    args = parser.parse_args()
+
+    model = PortionModel(init_db())
+    if args.command == "rebuild":
+        print(f"Rebuilt {model.rebuild()} portion calibrations from meal_corrections")
+    else:
+        model.load()
+        for (user_id, food_key), factor in sorted(model._factors.items()):
+            if args.user is None or user_id == args.user:
+                print(f"user {user_id:>6}  {food_key or '(all foods)':30s}  x{factor:.3f}")
@@ -0,0 +1,215 @@
+import json
+import uuid
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+
+@lru_cache(maxsize=1 << 18)
+def _parse_ts(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _split_top_level(text):
+    """
+    Split 'a,and(b,c),d' on commas outside parentheses
+    """
+    parts, depth, current = [], 0, ""
+    for ch in text:
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += ch == "("
+        depth -= ch == ")"
+        current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _coerce(column, value):
+    return _parse_ts(value) if column in ("updated_at", "created_at", "deleted_at") else value
+
+
+def _condition(expr):
+    """
+    One PostgREST filter ('col.op.value', 'and(...)', 'or(...)') as a row predicate
+    """
+    for logic, combine in (("and(", all), ("or(", any)):
+        if expr.startswith(logic):
+            inner = [_condition(part) for part in _split_top_level(expr[len(logic):-1])]
+            return lambda row, inner=inner, combine=combine: combine(c(row) for c in inner)
+    column, op, value = expr.split(".", 2)
+    return _filter(column, op, value)
+
+
+def _filter(column, op, value):
+    if op == "in":
+        allowed = set(value.strip("()").split(","))
+        return lambda row: str(row.get(column)) in allowed
+    if op == "is":
+        return lambda row: row.get(column) is None if value == "null" else row.get(column) is not None
+    target = _coerce(column, value)
+    compare = {
+        "eq": lambda a, b: a == b, "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b,
+        "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b,
+    }[op]
+
+    def predicate(row):
+        current = row.get(column)
+        if current is None:
+            return False
+        return compare(_coerce(column, current) if isinstance(current, str) else current, target)
+    return predicate
+
+
+class PostgrestStub:
+    """
+    In-memory stand-in for Supabase's PostgREST `food_logs` endpoint.
+
+    Supports what the sync engine uses: array upserts (POST ?on_conflict=id),
+    PATCH by id=in.(...), and GET with eq/gt/in/is filters, or=/and= groups,
+    order and limit. Like the food_logs trigger, every write stamps updated_at
+    with a strictly increasing server time. Counts requests per method.
+    """
+
+    def __init__(self, table="food_logs"):
+        self.table = table
+        self.rows = OrderedDict()     # kept in updated_at order: every write moves its row to the end
+        self.requests = {"GET": 0, "POST": 0, "PATCH": 0}
+        self._lock = threading.Lock()
+        self._last_stamp = datetime.now(timezone.utc)
+
+    def _stamp(self):
+        now = datetime.now(timezone.utc)
+        if now <= self._last_stamp:
+            now = self._last_stamp + timedelta(microseconds=1)
+        self._last_stamp = now
+        return now.isoformat(timespec="microseconds")
+
+    def upsert(self, records):
+        written = []
+        with self._lock:
+            for record in records:
+                record = dict(record)
+                row_id = record.setdefault("id", str(uuid.uuid4()))
+                row = self.rows.get(row_id, {"created_at": self._stamp(), "deleted_at": None})
+                row.update(record)
+                row["updated_at"] = self._stamp()
+                self.rows[row_id] = row
+                self.rows.move_to_end(row_id)
+                written.append(row)
+        return written
+
+    def patch(self, predicate, changes):
+        with self._lock:
+            for row in [row for row in self.rows.values() if predicate(row)]:
+                row.update(changes)
+                row["updated_at"] = self._stamp()
+                self.rows.move_to_end(row["id"])
+
+    def select(self, filters, order=None, limit=None):
+        limit = int(limit) if limit else None
+        with self._lock:
+            if order in ("updated_at", "updated_at.asc", "updated_at.asc,id.asc"):
+                # Storage order already is the requested order (stamps are unique)
+                rows = []
+                for row in self.rows.values():
+                    if all(f(row) for f in filters):
+                        rows.append(dict(row))
+                        if limit and len(rows) >= limit:
+                            break
+                return rows
+            rows = [row for row in self.rows.values() if all(f(row) for f in filters)]
+        for term in reversed(order.split(",") if order else []):
+            column, _, direction = term.partition(".")
+            rows.sort(key=lambda r: _coerce(column, r[column]) if isinstance(r.get(column), str) else r.get(column),
+                      reverse=direction.startswith("desc"))
+        return [dict(row) for row in (rows[:limit] if limit else rows)]
+
+    # --- HTTP ---
+
+    def start(self, host="127.0.0.1", port=0):
+        """
+        Serve in a background thread; returns the base URL (like SUPABASE_URL)
+        """
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _route(self):
+                url = urlsplit(self.path)
+                if url.path.rstrip("/") != f"/rest/v1/{stub.table}":
+                    self._reply(404, {"message": "not found"})
+                    return None
+                return parse_qsl(url.query, keep_blank_values=True)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"null")
+
+            def _reply(self, status, body=None):
+                data = b"" if body is None else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _filters(self, params):
+                return [_condition(f"{key}({value[1:-1]})") if key in ("or", "and")
+                        else _condition(f"{key}.{value}")
+                        for key, value in params if key not in ("order", "limit", "select", "on_conflict")]
+
+            def do_GET(self):
+                stub.requests["GET"] += 1
+                params = self._route()
+                if params is None:
+                    return
+                options = dict(params)
+                self._reply(200, stub.select(self._filters(params), options.get("order"), options.get("limit")))
+
+            def do_POST(self):
+                stub.requests["POST"] += 1
+                params = self._route()
+                if params is None:
+                    return
+                params = dict(params)
+                body = self._body()
+                written = stub.upsert(body if isinstance(body, list) else [body])
+                if "return=representation" in self.headers.get("Prefer", ""):
+                    columns = params.get("select", "*").split(",")
+                    self._reply(201, [row if columns == ["*"] else {c: row.get(c) for c in columns}
+                                      for row in written])
+                else:
+                    self._reply(201)
+
+            def do_PATCH(self):
+                stub.requests["PATCH"] += 1
+                params = self._route()
+                if params is None:
+                    return
+                filters = self._filters(params)
+                stub.patch(lambda row: all(f(row) for f in filters), self._body())
+                self._reply(204)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="postgrest-stub", daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def round_trips(self):
+        return sum(self.requests.values())
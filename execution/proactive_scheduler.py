@@ -0,0 +1,355 @@
+import time
+import heapq
+import asyncio
+from datetime import datetime, time as clock_time
+from functools import lru_cache
+
+import numpy as np
+
+from execution.diary_db import get_store, init_db, local_zone, DEFAULT_TIMEZONE
+from execution.gap_engine import GapEngine, NUTRIENTS
+from execution.metrics import timed
+
+# directives/proactive_agent_flow.md: (name, window start, share of the day's intake due by then, message)
+TRIGGERS = (
+    ('morning', clock_time(8, 0), 0.0,
+     "좋은 아침입니다! 오늘 아침 식사는 무엇인가요? 사진을 찍어주시면 바로 분석해 드릴게요."),
+    ('lunch', clock_time(12, 0), 0.35,
+     "점심시간이네요! 오늘 점심은 무엇을 드시나요?"),
+    ('evening', clock_time(18, 30), 0.7,
+     "오늘 하루도 수고하셨습니다. 저녁 식사를 기록하고 오늘의 영양 성적표를 확인해 보세요."),
+)
+TRIGGER_INDEX = {name: i for i, (name, _, _, _) in enumerate(TRIGGERS)}
+
+# Feedback loop
+IGNORE_LIMIT = 3                  # unanswered prompts in a row before prompts move later
+IGNORE_DELAY = 30 * 60
+LATER_DELAY = 60 * 60             # "나중에" -> remind again in an hour
+LATER_REPLIES = ('나중에', 'later')
+
+# Contextual logic (Korean BMI cut-offs)
+UNDERWEIGHT_BMI = 18.5
+OVERWEIGHT_BMI = 23.0
+GAP_THRESHOLD = 0.2
+NUTRIENT_LABELS = {'calories': '열량', 'protein': '단백질', 'fat': '지방', 'carbs': '탄수화물'}
+GAP_HINT = "오늘은 {} 섭취가 조금 부족해요."
+UNDERWEIGHT_HINT = "단백질과 열량이 충분한 메뉴를 추천드려요."
+OVERWEIGHT_HINT = "탄수화물은 줄이고 포만감이 높은 메뉴 어떠신가요?"
+
+CONTEXT_BATCH_SIZE = 500
+SEND_CONCURRENCY = 1000
+
+PROMPT, REMINDER = 0, 1
+
+SELECT_USERS_SQL = '''
+SELECT p.id, p.timezone, s.ignored_streak, s.last_trigger, s.awaiting_reply
+FROM user_profile p LEFT JOIN prompt_state s ON s.user_id = p.id
+'''
+
+RECORD_SENT_SQL = '''
+INSERT INTO prompt_state (user_id, ignored_streak, last_trigger, last_sent_at, awaiting_reply)
+VALUES (?, ?, ?, ?, 1)
+ON CONFLICT (user_id) DO UPDATE SET
+    ignored_streak = excluded.ignored_streak,
+    last_trigger = excluded.last_trigger,
+    last_sent_at = excluded.last_sent_at,
+    awaiting_reply = 1
+'''
+
+RECORD_REPLY_SQL = '''
+INSERT INTO prompt_state (user_id) VALUES (?)
+ON CONFLICT (user_id) DO UPDATE SET ignored_streak = 0, awaiting_reply = 0
+'''
+
+
+@lru_cache(maxsize=8192)
+def _window_starts(tz_name, ordinal):
+    """
+    Epoch seconds of each trigger window's start on one local calendar day
+    """
+    zone = local_zone(tz_name)
+    day = datetime.fromordinal(ordinal).date()
+    return tuple(int(datetime.combine(day, start, zone).timestamp()) for _, start, _, _ in TRIGGERS)
+
+
+def next_window(tz_name, after, delay=0):
+    """
+    (window start, trigger index) of the first window whose delayed fire time is after `after`
+    """
+    ordinal = datetime.fromtimestamp(after, local_zone(tz_name)).toordinal()
+    for day in (ordinal, ordinal + 1):
+        for index, start in enumerate(_window_starts(tz_name, day)):
+            if start + delay > after:
+                return start, index
+    raise AssertionError("every local day has trigger windows")
+
+
+def is_later(text):
+    return bool(text) and any(word in text.lower() for word in LATER_REPLIES)
+
+
+def compose_message(trigger, bmi=None, missing=()):
+    hints = []
+    if missing:
+        hints.append(GAP_HINT.format(NUTRIENT_LABELS[missing[0]]))
+    if bmi is not None and bmi < UNDERWEIGHT_BMI:
+        hints.append(UNDERWEIGHT_HINT)
+    elif bmi is not None and bmi >= OVERWEIGHT_BMI:
+        hints.append(OVERWEIGHT_HINT)
+    return " ".join([TRIGGERS[trigger][3]] + hints)
+
+
+class WallClock:
+    def now(self):
+        return time.time()
+
+    async def sleep_until(self, when, wake):
+        try:
+            await asyncio.wait_for(wake.wait(), max(when - self.now(), 0.0))
+        except asyncio.TimeoutError:
+            pass
+
+
+class SimClock:
+    """
+    Deterministic clock for tests and simulations: sleeping jumps straight to the deadline
+    """
+
+    def __init__(self, start):
+        self.t = float(start)
+
+    def now(self):
+        return self.t
+
+    def advance(self, seconds):
+        self.t += seconds
+
+    async def sleep_until(self, when, wake):
+        await asyncio.sleep(0)
+        if not wake.is_set():
+            self.t = max(self.t, when)
+
+
+class ProactiveScheduler:
+    """
+    Fires the mealtime prompts of directives/proactive_agent_flow.md on every user's local clock.
+
+    Due prompts live in one heap of (fire_at, user_id, trigger, kind). The loop sleeps
+    until the earliest and takes everything due at that moment as one batch: one
+    prompt_state write and one gap query per CONTEXT_BATCH_SIZE users, so a 12:00
+    burst does not turn into a query per user. Rescheduled users leave stale heap
+    entries behind, which are skipped when popped.
+
+    `send` is an async callable receiving one prompt dict.
+    """
+
+    def __init__(self, send, store=None, clock=None, context_batch_size=CONTEXT_BATCH_SIZE,
+                 send_concurrency=SEND_CONCURRENCY):
+        self.send = send
+        self.store = store or get_store()
+        self.clock = clock or WallClock()
+        self.gaps = GapEngine(self.store)
+        self.context_batch_size = context_batch_size
+        self.send_concurrency = send_concurrency
+        self._heap = []
+        self._due = {}           # user_id -> (fire_at, window start) of the next regular prompt
+        self._reminders = {}     # user_id -> fire_at of a pending "나중에" reminder
+        self._tz = {}
+        self._streak = {}
+        self._last_trigger = {}
+        self._awaiting = set()
+        self._wake = asyncio.Event()
+        self.stats = {"ticks": 0, "prompts": 0, "reminders": 0, "ignored": 0,
+                      "context_queries": 0, "send_errors": 0}
+
+    def _delay(self, user_id):
+        return IGNORE_DELAY if self._streak.get(user_id, 0) >= IGNORE_LIMIT else 0
+
+    def _schedule(self, user_id, after):
+        delay = self._delay(user_id)
+        start, trigger = next_window(self._tz[user_id], after, delay)
+        self._due[user_id] = (start + delay, start)
+        heapq.heappush(self._heap, (start + delay, user_id, trigger, PROMPT))
+
+    @timed("db_seconds")
+    def load(self):
+        """
+        Read every user's time zone and feedback state and schedule their next prompt
+        """
+        now = self.clock.now()
+        for user_id, tz_name, streak, last_trigger, awaiting in self.store.connection().execute(SELECT_USERS_SQL):
+            self._tz[user_id] = tz_name or DEFAULT_TIMEZONE
+            self._streak[user_id] = streak or 0
+            self._last_trigger[user_id] = TRIGGER_INDEX.get(last_trigger, 0)
+            if awaiting:
+                self._awaiting.add(user_id)
+            self._schedule(user_id, now)
+        return len(self._due)
+
+    def add_user(self, user_id, tz_name=None):
+        self._tz[user_id] = tz_name or DEFAULT_TIMEZONE
+        self._streak.setdefault(user_id, 0)
+        self._schedule(user_id, self.clock.now())
+        self._wake.set()
+
+    def next_fire(self, user_id):
+        due = self._due.get(user_id)
+        return due[0] if due else None
+
+    # --- Replies ---
+
+    def record_reply(self, user_id, text=None):
+        """
+        A reply to the user's last prompt. '나중에' asks for the same prompt again in an
+        hour; any reply resets the ignore streak (and with it the 30 minute delay).
+        """
+        now = self.clock.now()
+        was_delayed = self._delay(user_id)
+        self._awaiting.discard(user_id)
+        self._streak[user_id] = 0
+        self._reminders.pop(user_id, None)
+        if is_later(text):
+            self._reminders[user_id] = now + LATER_DELAY
+            heapq.heappush(self._heap, (now + LATER_DELAY, user_id, self._last_trigger.get(user_id, 0), REMINDER))
+        if was_delayed and user_id in self._due:
+            _, start = self._due[user_id]
+            self._schedule(user_id, max(now, start - 1))
+        with self.store.transaction() as conn:
+            conn.execute(RECORD_REPLY_SQL, (user_id,))
+        self._wake.set()
+
+    # --- Firing ---
+
+    def _context(self, user_ids, day, day_fraction):
+        """
+        {user_id: (bmi, missing macros most severe first)}, one gap query per batch of users
+        """
+        context = {}
+        for i in range(0, len(user_ids), self.context_batch_size):
+            cohort = self.gaps.load_cohort(day, user_ids[i:i + self.context_batch_size])
+            self.stats["context_queries"] += 1
+            if not len(cohort):
+                continue
+            result = self.gaps.compute_gaps(cohort, day_fraction)
+            bmi = cohort.weight / np.maximum(cohort.height / 100.0, 0.5) ** 2
+            shortfall = result.gaps / np.maximum(result.targets, 1e-9)
+            order = np.argsort(-shortfall, axis=1)
+            mask = result.missing_nutrients(GAP_THRESHOLD)
+            for k, user_id in enumerate(cohort.user_ids.tolist()):
+                missing = [NUTRIENTS[n] for n in order[k] if mask[k, n]]
+                context[user_id] = (float(bmi[k]), missing)
+        return context
+
+    @timed("scheduler_tick_seconds")
+    async def tick(self):
+        """
+        Send every prompt that is due now; returns how many went out
+        """
+        now = self.clock.now()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, user_id, trigger, kind = heapq.heappop(self._heap)
+            if kind == REMINDER:
+                if self._reminders.get(user_id) != fire_at:
+                    continue
+                del self._reminders[user_id]
+                start = None
+            else:
+                if self._due.get(user_id, (None,))[0] != fire_at:
+                    continue
+                _, start = self._due.pop(user_id)
+            due.append((user_id, trigger, kind, start))
+        if not due:
+            return 0
+        self.stats["ticks"] += 1
+
+        # Intake is read for each user's own calendar day: an 18:30 prompt in Los Angeles
+        # falls on the next UTC day
+        days = {user_id: datetime.fromtimestamp(now, local_zone(self._tz[user_id])).date().isoformat()
+                for user_id, _, _, _ in due}
+        groups = {}
+        for user_id, trigger, _, _ in due:
+            groups.setdefault((trigger, days[user_id]), []).append(user_id)
+        context = {}
+        for (trigger, day), user_ids in groups.items():
+            context[trigger, day] = self._context(user_ids, day, TRIGGERS[trigger][2])
+
+        prompts, state = [], []
+        for user_id, trigger, kind, start in due:
+            if user_id in self._awaiting:
+                self._streak[user_id] = self._streak.get(user_id, 0) + 1
+                self.stats["ignored"] += 1
+            self._awaiting.add(user_id)
+            if kind == PROMPT:
+                # The window after this one, delayed if this ignore completed a streak
+                self._schedule(user_id, start + self._delay(user_id))
+            self._last_trigger[user_id] = trigger
+            bmi, missing = context[trigger, days[user_id]].get(user_id, (None, []))
+            prompts.append({
+                "user_id": user_id,
+                "trigger": TRIGGERS[trigger][0],
+                "kind": "reminder" if kind == REMINDER else "prompt",
+                "fire_at": now,
+                "message": compose_message(trigger, bmi, missing),
+                "missing": missing,
+            })
+            state.append((user_id, self._streak[user_id], TRIGGERS[trigger][0], int(now)))
+            self.stats["reminders" if kind == REMINDER else "prompts"] += 1
+        with self.store.transaction() as conn:
+            conn.executemany(RECORD_SENT_SQL, state)
+
+        await self._deliver(prompts)
+        return len(prompts)
+
+    async def _deliver(self, prompts):
+        # A fixed pool of senders sharing one iterator: no task per prompt, and a slow
+        # send only holds up its own worker
+        pending = iter(prompts)
+
+        async def worker():
+            errors = 0
+            for prompt in pending:
+                try:
+                    await self.send(prompt)
+                except Exception:
+                    errors += 1
+            return errors
+
+        workers = min(self.send_concurrency, len(prompts))
+        self.stats["send_errors"] += sum(await asyncio.gather(*(worker() for _ in range(workers))))
+
+    async def run(self, until=None):
+        """
+        Fire prompts as they come due, until the `until` epoch (or forever)
+        """
+        while self._heap:
+            next_at = self._heap[0][0]
+            if until is not None and next_at > until:
+                break
+            self._wake.clear()
+            if next_at > self.clock.now():
+                await self.clock.sleep_until(next_at, self._wake)
+                if self._wake.is_set():
+                    continue
+            await self.tick()
+        if until is not None and self.clock.now() < until:
+            self._wake.clear()
+            await self.clock.sleep_until(until, self._wake)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Send proactive mealtime prompts (prints them)")
+    parser.add_argument("--hours", type=float, help="stop after this many hours (default: run forever)")
+    args = parser.parse_args()
+
+    async def print_prompt(prompt):
+        print(f"[{datetime.now():%H:%M}] user {prompt['user_id']} ({prompt['trigger']}): {prompt['message']}")
+
+    async def main():
+        scheduler = ProactiveScheduler(print_prompt, init_db())
+        print(f"Scheduled {scheduler.load()} users")
+        await scheduler.run(time.time() + args.hours * 3600 if args.hours else None)
+
+    asyncio.run(main())
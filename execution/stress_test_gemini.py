@@ -1,37 +1,36 @@
 import os
-import requests
 import time
-import concurrent.futures
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv(dotenv_path="../.env")
-
-def call_gemini(api_key, request_id):
-    model = "gemini-2.5-flash"
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
-    
-    payload = {
-        "contents": [{
-            "parts": [{"text": f"Request {request_id}: Say 'OK'"}]
-        }]
-    }
-    
-    headers = {'Content-Type': 'application/json'}
-    
+import asyncio
+import argparse
+
+from execution.gemini_client import GeminiClient, GeminiError
+from execution.gemini_stub_server import percentile
+from execution import metrics
+
+
+async def call_gemini(client, request_id):
+    start_time = time.perf_counter()
     try:
-        start_time = time.time()
-        response = requests.post(url, json=payload, headers=headers)
-        duration = time.time() - start_time
-        
-        if response.status_code == 200:
-            return True, response.status_code, duration, None
-        else:
-            return False, response.status_code, duration, response.json()
-    except Exception as e:
-        return False, 500, 0, str(e)
-
-def run_stress_test():
+        await client.generate_text(f"Request {request_id}: Say 'OK'")
+        status, body = 200, None
+    except GeminiError as e:
+        status, body = e.status, e.body
+    duration = time.perf_counter() - start_time
+    metrics.observe("stress_request_seconds", duration, status=status)
+    return status == 200, status, duration, body
+
+
+async def probe(api_key, num_requests):
+    # No client-side limiter and no retries: we want to see the raw quota response
+    async with GeminiClient(api_key, rpm=None, tpm=None, max_retries=0) as client:
+        return await asyncio.gather(*(call_gemini(client, i) for i in range(num_requests)))
+
+
+def run_stress_test(num_requests=20, metrics_json=None):
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.env'))
+
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         print("Error: GEMINI_API_KEY not found in environment.")
@@ -39,27 +38,30 @@ def run_stress_test():
 
     print(f"--- Starting Gemini API Plan Stress Test ---")
     print(f"API Key: {api_key[:5]}...{api_key[-5:]}")
-    
-    # Testing with 20 concurrent requests. 
-    # Free tier for Gemini 1.5 Flash usually has limits around 15 RPM.
+
+    # Testing with 20 concurrent requests by default.
+    # Free tier for Gemini Flash usually has limits around 15 RPM.
     # Pay-as-you-go has much higher limits (2000 RPM).
-    num_requests = 20
+    metrics.enable()
     print(f"Sending {num_requests} concurrent requests to check rate limits...")
-    
-    results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        futures = [executor.submit(call_gemini, api_key, i) for i in range(num_requests)]
-        for future in concurrent.futures.as_completed(futures):
-            results.append(future.result())
+
+    results = asyncio.run(probe(api_key, num_requests))
 
     success_count = sum(1 for r in results if r[0])
     fail_count = num_requests - success_count
-    
+    durations = [r[2] for r in results if r[0]]
+
     print(f"\nTest Results Summary:")
     print(f"- Total Requests: {num_requests}")
     print(f"- Success: {success_count}")
     print(f"- Failed: {fail_count}")
-    
+    if durations:
+        print(f"- Latency p50/p95/max: {percentile(durations, 50):.2f}s / "
+              f"{percentile(durations, 95):.2f}s / {max(durations):.2f}s")
+    if metrics_json:
+        metrics.dump_json(metrics_json)
+        print(f"- Metrics written to {metrics_json}")
+
     rate_limited = False
     for success, status, duration, error_data in results:
         if status == 429:
@@ -71,9 +73,10 @@ def run_stress_test():
     if rate_limited:
         print("RESULT: Likely FREE TIER (Rate Limited).")
         print("We hit the 429 (Too Many Requests) error, which is common on the free tier after just a few requests.")
+        print("Use GeminiClient's default rpm/tpm so the scheduler stays under this quota.")
     elif success_count == num_requests:
         print("RESULT: Likely PRO PLAN (Pay-as-you-go).")
-        print("All 20 concurrent requests succeeded without any 429 errors. This strongly indicates a higher tier quota.")
+        print(f"All {num_requests} concurrent requests succeeded without any 429 errors. This strongly indicates a higher tier quota.")
     else:
         print("RESULT: Inconclusive. Some requests failed but not necessarily due to rate limits.")
         for r in results:
@@ -81,4 +84,8 @@ def run_stress_test():
                 print(f"Error ({r[1]}): {r[3]}")
 
 if __name__ == "__main__":
-    run_stress_test()
+    parser = argparse.ArgumentParser(description="Probe the Gemini plan's rate limits with concurrent requests")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--metrics-json", help="write request/upstream latency histograms to this file")
+    args = parser.parse_args()
+    run_stress_test(args.requests, args.metrics_json)
@@ -0,0 +1,324 @@
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+
+from execution.diary_db import get_store, init_db, local_zone, GET_STATE_SQL, SET_STATE_SQL
+from execution.metrics import timed, in_flight, observe
+
+SUPABASE_URL = os.getenv("SUPABASE_URL", "https://ahrmhfbiagjhrzohqsmf.supabase.co")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY", "sb_publishable_azCVnn4OFdLd4vyyji55gA_l-f43-M1")
+
+PUSH_BATCH_SIZE = 500
+PULL_PAGE_SIZE = 1000
+REQUEST_TIMEOUT = 30
+
+# Latest outbox entry per meal for one user, oldest change first
+SELECT_OUTBOX_SQL = '''
+SELECT o.seq, o.meal_id, o.op, o.remote_id, o.changed_at
+FROM sync_outbox o
+WHERE o.user_id = ? AND o.seq = (SELECT MAX(seq) FROM sync_outbox WHERE user_id = o.user_id AND meal_id = o.meal_id)
+ORDER BY o.seq
+LIMIT ?
+'''
+
+SELECT_PUSH_ROWS_SQL = '''
+SELECT id, remote_id, timestamp, food_name, calories, protein, fat, carbs, image_url
+FROM meal_diary WHERE id IN ({placeholders})
+'''
+
+CLEAR_OUTBOX_SQL = "DELETE FROM sync_outbox WHERE user_id = ? AND meal_id = ? AND seq <= ?"
+SET_REMOTE_ID_SQL = "UPDATE meal_diary SET remote_id = ? WHERE id = ?"
+SET_REMOTE_VERSION_SQL = "UPDATE meal_diary SET remote_updated_at = ? WHERE remote_id = ?"
+SELECT_PENDING_CHANGE_SQL = "SELECT MAX(changed_at) FROM sync_outbox WHERE user_id = ? AND meal_id = ?"
+SELECT_BY_REMOTE_ID_SQL = '''
+SELECT id, timestamp, food_name, calories, protein, fat, carbs, image_url, remote_updated_at
+FROM meal_diary WHERE remote_id = ?
+'''
+
+# A pulled meal may already exist locally without a remote_id (logged on both
+# sides); the (user, time, food) key merges it instead of duplicating.
+APPLY_REMOTE_SQL = '''
+INSERT INTO meal_diary (remote_id, remote_updated_at, user_id, timestamp, food_name, calories, protein, fat, carbs,
+                        image_url)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, timestamp, food_name) DO UPDATE SET
+    remote_id = excluded.remote_id,
+    remote_updated_at = excluded.remote_updated_at,
+    calories = excluded.calories,
+    protein = excluded.protein,
+    fat = excluded.fat,
+    carbs = excluded.carbs,
+    image_url = excluded.image_url
+'''
+UPDATE_FROM_REMOTE_SQL = '''
+UPDATE meal_diary SET timestamp = ?, food_name = ?, calories = ?, protein = ?, fat = ?, carbs = ?, image_url = ?,
+    remote_updated_at = ?
+WHERE id = ?
+'''
+
+# The mobile app stores macros as display strings ("12g", "3.5 g")
+QUANTITY_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def meal_type_for(epoch, zone):
+    # Same buckets the mobile app uses, on the meal's hour in the user's time zone
+    hour = datetime.fromtimestamp(epoch, zone).hour
+    if hour < 11:
+        return "Breakfast"
+    if hour < 16:
+        return "Lunch"
+    if hour < 21:
+        return "Dinner"
+    return "Snack"
+
+
+def _iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def _epoch(value):
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+def _epoch_ms(value):
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1000)
+
+
+def _quantity(value):
+    """
+    A food_logs number as written by either side: 12, 12.5, "12g", "12.5 g", "" or null
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    match = QUANTITY_RE.search(str(value))
+    return float(match.group()) if match else None
+
+
+class SyncEngine:
+    """
+    Offline-first sync between one user's meal_diary and Supabase food_logs.
+
+    Push: the latest sync_outbox entry per meal goes out as one array upsert per
+    PUSH_BATCH_SIZE meals, deletes as one soft-delete PATCH per batch.
+    Pull: food_logs rows changed since the stored high-water mark
+    (updated_at, id), paged in keyset order, applied in one transaction per page
+    together with the new mark.
+
+    Conflicts are last-writer-wins on wall-clock time: a meal with an unpushed
+    local change newer than the remote updated_at keeps the local version (and
+    pushes it); otherwise the remote version is applied and the local change
+    dropped. Ties go to the remote copy.
+    """
+
+    def __init__(self, local_user_id, remote_user_id, store=None, base_url=SUPABASE_URL, api_key=SUPABASE_KEY,
+                 push_batch_size=PUSH_BATCH_SIZE, pull_page_size=PULL_PAGE_SIZE):
+        self.local_user_id = local_user_id
+        self.remote_user_id = remote_user_id
+        self.store = store or get_store()
+        self.url = f"{base_url.rstrip('/')}/rest/v1/food_logs"
+        self.push_batch_size = push_batch_size
+        self.pull_page_size = pull_page_size
+        import requests   # deferred: ~70 ms to import, only sync runs need it
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "apikey": api_key,
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+        self.round_trips = 0
+
+    def _request(self, method, **kwargs):
+        self.round_trips += 1
+        start = time.perf_counter()
+        status = "error"
+        try:
+            with in_flight("external_calls_in_flight", service="supabase"):
+                response = self.session.request(method, self.url, timeout=REQUEST_TIMEOUT, **kwargs)
+            status = response.status_code
+        finally:
+            observe("external_call_seconds", time.perf_counter() - start, service="supabase", status=status)
+        response.raise_for_status()
+        return response
+
+    # --- High-water mark ---
+
+    @property
+    def _hwm_key(self):
+        return f"food_logs_hwm:{self.local_user_id}:{self.remote_user_id}"
+
+    def high_water_mark(self):
+        row = self.store.connection().execute(GET_STATE_SQL, (self._hwm_key,)).fetchone()
+        if row is None:
+            return None
+        updated_at, _, row_id = row[0].partition("|")
+        return updated_at, row_id
+
+    # --- Push ---
+
+    @timed("sync_seconds")
+    def push(self):
+        """
+        Send pending local changes; returns (upserted, deleted)
+        """
+        conn = self.store.connection()
+        profile = self.store.get_profile(self.local_user_id)
+        zone = local_zone(profile["timezone"] if profile else None)
+        upserted = deleted = 0
+        while True:
+            entries = conn.execute(SELECT_OUTBOX_SQL, (self.local_user_id, self.push_batch_size)).fetchall()
+            if not entries:
+                return upserted, deleted
+
+            upserts = [e for e in entries if e[2] == 'upsert']
+            rows = {}
+            if upserts:
+                rows = {r[0]: r for r in conn.execute(
+                    SELECT_PUSH_ROWS_SQL.format(placeholders=",".join("?" * len(upserts))),
+                    [e[1] for e in upserts],
+                )}
+
+            records, new_ids = [], []
+            for _, meal_id, _, _, _ in upserts:
+                row = rows.get(meal_id)
+                if row is None:
+                    continue            # deleted since; its delete entry is newer and comes later
+                remote_id = row[1]
+                if remote_id is None:
+                    remote_id = str(uuid.uuid4())
+                    new_ids.append((remote_id, meal_id))
+                records.append({
+                    "id": remote_id,
+                    "user_id": self.remote_user_id,
+                    "created_at": _iso(row[2]),
+                    "food_name": row[3],
+                    "calories": row[4],
+                    "protein": row[5],
+                    "fat": row[6],
+                    "carbs": row[7],
+                    "image_url": row[8],
+                    "meal_type": meal_type_for(row[2], zone),
+                    "deleted_at": None,
+                })
+            tombstones = [e[3] for e in entries if e[2] == 'delete' and e[3] is not None]
+
+            # Ids are recorded before the upsert so a retry after a lost response reuses them
+            if new_ids:
+                with self.store.transaction() as txn:
+                    txn.executemany(SET_REMOTE_ID_SQL, new_ids)
+            versions = []
+            if records:
+                # Only id and the new updated_at come back; they let pull skip our own echoes
+                written = self._request("POST", params={"on_conflict": "id", "select": "id,updated_at"},
+                                        json=records,
+                                        headers={"Prefer": "resolution=merge-duplicates,return=representation"})
+                versions = [(row["updated_at"], row["id"]) for row in written.json()]
+            if tombstones:
+                self._request("PATCH", params={"id": f"in.({','.join(tombstones)})"},
+                              json={"deleted_at": datetime.now(timezone.utc).isoformat()},
+                              headers={"Prefer": "return=minimal"})
+
+            with self.store.transaction() as txn:
+                txn.executemany(SET_REMOTE_VERSION_SQL, versions)
+                txn.executemany(CLEAR_OUTBOX_SQL, [(self.local_user_id, e[1], e[0]) for e in entries])
+            upserted += len(records)
+            deleted += len(tombstones)
+
+    # --- Pull ---
+
+    @timed("sync_seconds")
+    def pull(self):
+        """
+        Apply remote changes since the high-water mark; returns (applied, conflicts)
+        """
+        applied = conflicts = 0
+        while True:
+            params = {
+                "user_id": f"eq.{self.remote_user_id}",
+                "order": "updated_at.asc,id.asc",
+                "limit": str(self.pull_page_size),
+            }
+            mark = self.high_water_mark()
+            if mark is not None:
+                updated_at, row_id = mark
+                params["or"] = f"(updated_at.gt.{updated_at},and(updated_at.eq.{updated_at},id.gt.{row_id}))"
+            page = self._request("GET", params=params).json()
+            if not page:
+                return applied, conflicts
+
+            with self.store.transaction() as conn:
+                for remote in page:
+                    outcome = self._apply(conn, remote)
+                    applied += outcome == 'applied'
+                    conflicts += outcome in ('kept_local', 'took_remote')
+                last = page[-1]
+                conn.execute(SET_STATE_SQL, (self._hwm_key, f"{last['updated_at']}|{last['id']}"))
+            if len(page) < self.pull_page_size:
+                return applied, conflicts
+
+    def _apply(self, conn, remote):
+        local = conn.execute(SELECT_BY_REMOTE_ID_SQL, (remote["id"],)).fetchone()
+        outcome = 'applied'
+        if local is not None and local[8] == remote["updated_at"]:
+            return 'unchanged'              # the version we pushed or pulled last
+        if local is not None:
+            pending = conn.execute(SELECT_PENDING_CHANGE_SQL, (self.local_user_id, local[0])).fetchone()[0]
+            if pending is not None:
+                if pending > _epoch_ms(remote["updated_at"]):
+                    return 'kept_local'
+                outcome = 'took_remote'
+
+        # Writes made while applying are the remote's, not local changes to push back
+        seq_before = conn.execute("SELECT IFNULL(MAX(seq), 0) FROM sync_outbox").fetchone()[0]
+        if remote.get("deleted_at"):
+            if local is None:
+                return 'skipped'
+            conn.execute("DELETE FROM meal_diary WHERE id = ?", (local[0],))
+        else:
+            values = (_epoch(remote["created_at"]), remote["food_name"], _quantity(remote.get("calories")),
+                      _quantity(remote.get("protein")), _quantity(remote.get("fat")), _quantity(remote.get("carbs")),
+                      remote.get("image_url"))
+            if local is None:
+                conn.execute(APPLY_REMOTE_SQL, (remote["id"], remote["updated_at"], self.local_user_id) + values)
+            else:
+                conn.execute(UPDATE_FROM_REMOTE_SQL, values + (remote["updated_at"], local[0]))
+        conn.execute("DELETE FROM sync_outbox WHERE seq > ?", (seq_before,))
+        if local is not None:
+            conn.execute(CLEAR_OUTBOX_SQL, (self.local_user_id, local[0], seq_before))
+        return outcome
+
+    # --- Both ---
+
+    def sync(self):
+        """
+        Pull then push; returns counts, round trips and throughput for this run
+        """
+        start = time.perf_counter()
+        trips_before = self.round_trips
+        pulled, conflicts = self.pull()
+        upserted, deleted = self.push()
+        seconds = time.perf_counter() - start
+        rows = pulled + upserted + deleted
+        return {
+            "pulled": pulled,
+            "pushed": upserted,
+            "deleted": deleted,
+            "conflicts": conflicts,
+            "round_trips": self.round_trips - trips_before,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(rows / seconds, 1) if seconds else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sync the local meal diary with Supabase food_logs")
+    parser.add_argument("--user", type=int, required=True, help="local user_profile id")
+    parser.add_argument("--remote-user", required=True, help="Supabase auth user id (uuid)")
+    args = parser.parse_args()
+
+    engine = SyncEngine(args.user, args.remote_user, init_db())
+    print(engine.sync())
@@ -0,0 +1,136 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from execution.diary_db import DiaryStore
+from execution.venue_store import VenueStore, DEMO_VENUES
+from execution.adoption_model import AdoptionModel, HALF_LIFE
+
+NOW = 1717400000.0
+
+
+class Clock:
+    def __init__(self, t):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _setup(tmp):
+    store = DiaryStore(os.path.join(tmp, 'adoption.db'))
+    store.migrate()
+    return store
+
+
+def test_feedback_moves_scores():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        clock = Clock(NOW)
+        model = AdoptionModel(store, clock=clock)
+        me, other = store.add_profile(30, 175, 70, 'male', 'gain'), store.add_profile(28, 160, 55, 'female', 'lose')
+
+        assert model.score(me, "Protein Shake", "CU Convenience Store") == 0.5
+        for _ in range(5):
+            rec_id = store.add_recommendation("Protein Shake", "CU Convenience Store", user_id=other)
+            assert model.record_feedback(rec_id, 'accepted') > 0
+        # Everyone else's acceptances lift the item (and the place) for a user with no history
+        assert model.score(me, "Protein Shake", "CU Convenience Store") > 0.7
+        assert model.score(me, "Triangle Kimbap", "CU Convenience Store") > 0.5
+
+        rec_id = store.add_recommendation("Protein Shake", "CU Convenience Store", user_id=me)
+        impact = model.record_feedback(rec_id, 'rejected', 'too sweet')
+        assert impact < 0
+        assert model.record_feedback(rec_id, 'rejected', 'too sweet') == 0.0      # counted once
+        row = store.connection().execute(
+            "SELECT status, rejection_reason, adoption_rate_impact FROM recommendations WHERE id = ?",
+            (rec_id,)).fetchone()
+        assert tuple(row) == ('rejected', 'too sweet', round(impact, 6))
+
+        # Old feedback fades towards the prior
+        before = model.score(other, "Protein Shake", "CU Convenience Store")
+        clock.t += 4 * HALF_LIFE
+        after = model.score(other, "Protein Shake", "CU Convenience Store")
+        assert 0.5 < after < before
+        store.close()
+
+
+def test_persistence_and_rebuild():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        model = AdoptionModel(store, clock=Clock(NOW))
+        user_id = store.add_profile(30, 175, 70, 'male', 'gain')
+        for status in ('accepted', 'accepted', 'rejected', 'ignored'):
+            rec_id = store.add_recommendation("Greek Yogurt", "Starbucks", user_id=user_id)
+            store.connection().execute("UPDATE recommendations SET timestamp = ? WHERE id = ?", (int(NOW), rec_id))
+            model.record_feedback(rec_id, status)
+        expected = model.score(user_id, "Greek Yogurt", "Starbucks")
+        assert model.flush() == 0                  # feedback commits its counts as it goes
+
+        reloaded = AdoptionModel(store, clock=Clock(NOW))
+        assert reloaded.load() == 4
+        assert abs(reloaded.score(user_id, "Greek Yogurt", "Starbucks") - expected) < 1e-9
+
+        rebuilt = AdoptionModel(store, clock=Clock(NOW))
+        assert rebuilt.rebuild() == 4
+        assert abs(rebuilt.score(user_id, "Greek Yogurt", "Starbucks") - expected) < 1e-9
+        store.close()
+
+
+def test_feedback_is_learned_only_once_it_commits():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        model = AdoptionModel(store, clock=Clock(NOW))
+        user_id = store.add_profile(30, 175, 70, 'male', 'gain')
+        rec_id = store.add_recommendation("Protein Shake", "CU Convenience Store", user_id=user_id)
+        store.connection().execute(
+            "CREATE TRIGGER refuse_feedback BEFORE UPDATE ON recommendations "
+            "BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+        try:
+            model.record_feedback(rec_id, 'accepted')
+        except Exception as e:
+            assert 'disk full' in str(e)
+        else:
+            raise AssertionError("the feedback should have failed")
+        assert len(model) == 0 and model.score(user_id, "Protein Shake", "CU Convenience Store") == 0.5
+        assert store.connection().execute("SELECT COUNT(*) FROM adoption_stats").fetchone()[0] == 0
+
+        store.connection().execute("DROP TRIGGER refuse_feedback")
+        # Several threads reporting the same outcome: it is counted once
+        with ThreadPoolExecutor(4) as pool:
+            impacts = list(pool.map(lambda _: model.record_feedback(rec_id, 'accepted'), range(8)))
+        assert sum(1 for impact in impacts if impact) == 1
+        reloaded = AdoptionModel(store, clock=Clock(NOW))
+        reloaded.load()
+        assert reloaded.score(user_id, "Protein Shake", "CU Convenience Store") == \
+            model.score(user_id, "Protein Shake", "CU Convenience Store") > 0.5
+        store.close()
+
+
+def test_ranking_uses_adoption():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        venues = VenueStore(store)
+        venues.seed_demo_venues()
+        model = AdoptionModel(store, clock=Clock(NOW))
+        user_id = store.add_profile(30, 175, 70, 'male', 'gain')
+        baseline = venues.find_nearby(37.5665, 126.9780, ['protein'], limit=len(DEMO_VENUES),
+                                      adoption=model.scorer(user_id))
+        loser = baseline[0]
+        for _ in range(6):
+            rec_id = store.add_recommendation(loser["name"], loser["place"], user_id=user_id)
+            model.record_feedback(rec_id, 'rejected')
+        ranked = venues.find_nearby(37.5665, 126.9780, ['protein'], limit=len(DEMO_VENUES),
+                                    adoption=model.scorer(user_id))
+        scores = {r["name"]: r["score"] for r in ranked}
+        # The adoption term (weight 0.2) falls from the 0.5 prior to almost nothing
+        assert scores[loser["name"]] < loser["score"] - 0.09
+        store.close()
+
+
+if __name__ == "__main__":
+    test_feedback_moves_scores()
+    test_persistence_and_rebuild()
+    test_feedback_is_learned_only_once_it_commits()
+    test_ranking_uses_adoption()
+    print("Adoption model OK")
@@ -0,0 +1,127 @@
+import io
+import os
+import tempfile
+
+from PIL import Image, ImageDraw
+
+from execution.diary_db import DiaryStore
+from execution.analysis_cache import AnalysisCache, dhash
+
+PARAMS = {"prompt": "analyze_food_photo", "model": "gemini-2.5-flash"}
+
+
+class Clock:
+    def __init__(self, t=1717400000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _setup(tmp):
+    store = DiaryStore(os.path.join(tmp, 'cache.db'))
+    store.migrate()
+    return store
+
+
+def _plate(shade, size=(320, 240), quality=90):
+    img = Image.new("RGB", size, (240, 240, 235))
+    draw = ImageDraw.Draw(img)
+    w, h = size
+    draw.ellipse((w * 0.15, h * 0.1, w * 0.85, h * 0.9), fill=(shade, 120, 60))
+    draw.rectangle((w * 0.4, h * 0.3, w * 0.6, h * 0.5), fill=(30, 160, 40))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def test_memory_tier_is_an_lru_with_ttl():
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = Clock()
+        cache = AnalysisCache(_setup(tmp), memory_entries=2, ttl=3600, clock=clock)
+        for name in (b"a", b"b", b"c"):
+            cache.put(name, PARAMS, {"food_name": name.decode()})
+        assert cache.get(b"b", PARAMS) == {"food_name": "b"}
+        assert list(cache._memory) == [cache.make_key(b"c", PARAMS)[0], cache.make_key(b"b", PARAMS)[0]]
+        assert cache.get(b"a", PARAMS) == {"food_name": "a"}           # fell out of memory, served from disk
+        assert cache.stats.memory_hits == 1 and cache.stats.disk_hits == 1
+
+        clock.t += 3601
+        assert cache.get(b"a", PARAMS) is None and cache.get(b"c", PARAMS) is None
+        assert cache.stats.misses == 2
+        cache.store.close()
+
+
+def test_sqlite_tier_survives_restart_and_keys_on_params():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        AnalysisCache(store).put(b"photo", PARAMS, {"food_name": "비빔밥", "calories": 550})
+
+        cache = AnalysisCache(store)
+        assert cache.get(b"photo", PARAMS) == {"food_name": "비빔밥", "calories": 550}
+        assert cache.stats.disk_hits == 1
+        assert cache.get(b"photo", dict(PARAMS, model="gemini-2.5-pro")) is None
+        store.close()
+
+
+def test_eviction_honours_row_and_byte_budgets():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        clock = Clock()
+        cache = AnalysisCache(store, max_rows=10, max_bytes=3000, clock=clock)
+        for i in range(8):
+            clock.t += 1
+            cache.put(f"photo {i}".encode(), PARAMS, {"food_name": f"meal {i}", "notes": "x" * 500})
+        conn = store.connection()
+        size = conn.execute("SELECT size FROM analysis_cache LIMIT 1").fetchone()[0]
+        assert size > 500
+
+        # Photo 0 was looked at again, so it is the most recent hit
+        cache._memory.clear()
+        clock.t += 1
+        cache.get(b"photo 0", PARAMS)
+        assert cache.evict() == 8 - 3000 // size
+        kept = conn.execute("SELECT COUNT(*), SUM(size) FROM analysis_cache").fetchone()
+        assert kept[1] <= 3000 and kept[0] == 3000 // size
+        cache._memory.clear()
+        assert cache.get(b"photo 0", PARAMS) is not None and cache.get(b"photo 1", PARAMS) is None
+
+        cache.max_bytes = 10 ** 9
+        cache.max_rows = 1
+        assert cache.evict() == kept[0] - 1
+        store.close()
+
+
+def test_perceptual_lookup_through_dhash_bands():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        cache = AnalysisCache(store, perceptual=True)
+        original = _plate(200)
+        cache.put(original, PARAMS, {"food_name": "Tteokbokki"})
+
+        # Same plate re-encoded at another size and quality: new bytes, same picture
+        reshot = _plate(200, size=(640, 480), quality=60)
+        assert reshot != original
+        assert bin(dhash(original) ^ dhash(reshot)).count("1") <= cache.max_distance
+        assert cache.get(reshot, PARAMS) == {"food_name": "Tteokbokki"}
+        assert cache.stats.perceptual_hits == 1
+
+        bands = store.connection().execute("SELECT COUNT(*) FROM analysis_cache_bands").fetchone()[0]
+        assert bands == 4
+        other = Image.new("RGB", (320, 240), (20, 20, 20))
+        ImageDraw.Draw(other).rectangle((0, 0, 160, 240), fill=(250, 250, 250))
+        buf = io.BytesIO()
+        other.save(buf, "JPEG")
+        assert cache.get(buf.getvalue(), PARAMS) is None
+
+        cache.clear()
+        assert store.connection().execute("SELECT COUNT(*) FROM analysis_cache_bands").fetchone()[0] == 0
+        store.close()
+
+
+if __name__ == "__main__":
+    test_memory_tier_is_an_lru_with_ttl()
+    test_sqlite_tier_survives_restart_and_keys_on_params()
+    test_eviction_honours_row_and_byte_budgets()
+    test_perceptual_lookup_through_dhash_bands()
+    print("Analysis cache OK")
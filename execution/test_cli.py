@@ -0,0 +1,47 @@
+import sys
+import os
+import csv
+import json
+import tempfile
+import subprocess
+
+from execution.cli import main
+from execution.bench_import_time import ROOT, HEAVY_MODULES
+
+
+def test_startup_stays_light():
+    probe = f"import sys, execution.cli; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    loaded = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert loaded.stdout.strip() == "", loaded.stdout
+    result = subprocess.run([sys.executable, '-m', 'execution.cli', '--help'], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0 and all(c in result.stdout for c in ("init-db", "simulate", "ingest", "stress", "export"))
+
+
+def test_ingest_then_export():
+    with tempfile.TemporaryDirectory() as tmp:
+        db, diary, out = (os.path.join(tmp, name) for name in ('cli.db', 'diary.csv', 'meals.csv'))
+        assert main(['init-db', '--db', db]) == 0
+        with open(diary, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['user_id', 'timestamp', 'food_name', 'calories', 'protein', 'fat', 'carbs'])
+            for i in range(25):
+                writer.writerow([1, f'2024-06-{1 + i // 24:02d}T{i % 24:02d}:00:00+00:00', f'Meal {i}', 500, 20, 10, 60])
+        main(['ingest', diary, '--db', db, '--chunk-size', '10'])
+        main(['export', 'meal_diary', out, '--db', db])
+        with open(out, newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 25 and rows[-1]['food_name'] == 'Meal 24'
+
+
+def test_simulate_prints_the_report_without_out():
+    result = subprocess.run([sys.executable, '-m', 'execution.cli', 'simulate', '--users', '12', '--workers', '1'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    report = json.loads(result.stdout)
+    assert report["meta"]["users"] == 12 and [run["workers"] for run in report["runs"]] == [1]
+
+
+if __name__ == "__main__":
+    test_startup_stays_light()
+    test_ingest_then_export()
+    test_simulate_prints_the_report_without_out()
+    print("CLI OK")
@@ -0,0 +1,213 @@
+import os
+import time
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+
+from execution.diary_db import DiaryStore, SCHEMA_VERSION, to_epoch
+
+NOTES_NEW = "CREATE TABLE notes_new (id INTEGER PRIMARY KEY AUTOINCREMENT, body TEXT, length INTEGER)"
+
+
+def _store(tmp):
+    store = DiaryStore(os.path.join(tmp, 'diary.db'))
+    store.migrate()
+    return store
+
+
+def test_pool_gives_each_thread_one_wal_connection():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        conn = store.connection()
+        assert store.connection() is conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+        others = []
+        thread = threading.Thread(target=lambda: others.append(store.connection()))
+        thread.start()
+        thread.join()
+        assert others[0] is not conn and len(store._connections) == 2
+
+        store.close()
+        try:
+            conn.execute("SELECT 1")
+        except sqlite3.ProgrammingError:
+            pass
+        else:
+            raise AssertionError("close() left a pooled connection open")
+        assert store.connection() is not conn         # reopened on next use
+        store.close()
+
+
+def test_transactions_nest_and_roll_back():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        with store.transaction():
+            meal = store.add_meal("Kimchi", 40, 2, 0.5, 7, timestamp=1717400000, user_id=1)
+            assert store.connection().in_transaction      # add_meal joined, did not commit
+        try:
+            with store.transaction():
+                store.add_meal("Ramen", 500, 10, 20, 70, timestamp=1717403600, user_id=1)
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+        assert [m["id"] for m in store.recent_meals()] == [meal]
+        store.close()
+
+
+def test_readers_run_during_a_write():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        store.add_meal("Kimchi", 40, 2, 0.5, 7, timestamp=1717400000, user_id=1)
+        seen = []
+        with store.transaction():
+            store.add_meal("Ramen", 500, 10, 20, 70, timestamp=1717403600, user_id=1)
+            # WAL: another connection reads the last commit instead of waiting on the writer
+            reader = threading.Thread(target=lambda: seen.append(len(store.recent_meals())))
+            reader.start()
+            reader.join(timeout=2)
+        assert seen == [1]
+        assert len(store.recent_meals()) == 2
+        store.close()
+
+
+def test_daily_totals_use_the_local_day():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        seoul = store.add_profile(30, 170, 65, 'male', 'maintain')          # timezone unset -> Asia/Seoul
+        # 07:30 KST on the 17th is still the 16th in UTC
+        store.add_meal("Gimbap", 350, 9, 8, 60, timestamp="2024-02-17T07:30:00+09:00", user_id=seoul)
+        assert store.get_range_totals(seoul, '2024-02-16', '2024-02-17', fill_gaps=False) == [
+            {'day': '2024-02-17', 'meal_count': 1, 'calories': 350, 'protein': 9, 'fat': 8, 'carbs': 60}]
+
+        store.set_timezone(seoul, 'America/Los_Angeles')                  # 14:30 on the 16th there
+        assert [row['day'] for row in store.get_range_totals(seoul, '2024-02-16', '2024-02-17', False)] == \
+            ['2024-02-16']
+        store.rebuild_daily_totals(start='2024-02-16', end='2024-02-16')
+        assert store.get_range_totals(seoul, '2024-02-16', '2024-02-16', False)[0]['calories'] == 350
+        store.close()
+
+
+def test_chunked_load_keeps_the_rollup_live():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        user = store.add_profile(30, 170, 65, 'male', 'maintain')
+
+        def rows():
+            yield (user, "2024-02-10T03:00:00+00:00", "Rice", 300, 5, 1, 65)
+            # An app write lands between two chunks of the backfill
+            store.add_meal("Ramen", 500, 10, 20, 70, timestamp="2024-03-01T12:00:00+09:00", user_id=user)
+            yield (user, "2024-02-11T03:00:00+00:00", "Soup", 100, 4, 2, 10)
+
+        store.bulk_insert_meals(rows(), chunk_size=1)
+        totals = store.get_range_totals(user, '2024-02-01', '2024-03-31', fill_gaps=False)
+        assert [(row['day'], row['calories']) for row in totals] == \
+            [('2024-02-10', 300), ('2024-02-11', 100), ('2024-03-01', 500)]
+        store.close()
+
+
+def _fail_after(limit):
+    def copy(id_):
+        if id_ > limit:
+            raise RuntimeError("crash mid-copy")
+        return id_
+    return copy
+
+
+def test_interrupted_rebuild_can_rerun():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        conn = store.connection()
+        with store.transaction():
+            conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY AUTOINCREMENT, body TEXT)")
+            conn.executemany("INSERT INTO notes (body) VALUES (?)", [(f"note {i}",) for i in range(50)])
+
+        conn.create_function("copy_id", 1, _fail_after(20))
+        try:
+            store.rebuild_table_online('notes', NOTES_NEW, "id, body, length", "copy_id(id), body, length(body)",
+                                       (), batch_size=10)
+        except sqlite3.OperationalError:
+            pass
+        else:
+            raise AssertionError("the copy should have crashed")
+        leftovers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE name LIKE '%rebuild%'")}
+        assert "_rebuild_notes_update" in leftovers
+
+        conn.execute("DELETE FROM notes WHERE id = 3")
+        store.rebuild_table_online('notes', NOTES_NEW, "id, body, length", "id, body, length(body)", (),
+                                   batch_size=10)
+        rows = conn.execute("SELECT id, length FROM notes ORDER BY id").fetchall()
+        assert len(rows) == 49 and rows[-1]["length"] == len("note 49")
+        assert not conn.execute("SELECT name FROM sqlite_master WHERE name LIKE '%rebuild%'").fetchall()
+        store.close()
+
+
+def test_naive_timestamps_are_utc():
+    saved = os.environ.get("TZ")
+    os.environ["TZ"] = "Asia/Seoul"
+    time.tzset()
+    try:
+        # Same instant the v3 migration gives a legacy '2024-02-17T12:30:00' (test_query_plans)
+        assert to_epoch('2024-02-17T12:30:00') == 1708173000
+        assert to_epoch(datetime(2024, 2, 17, 12, 30)) == 1708173000
+        assert to_epoch('2024-02-17T21:30:00+09:00') == 1708173000
+    finally:
+        if saved is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = saved
+        time.tzset()
+
+
+def test_same_second_meals_are_both_kept():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        user = store.add_profile(30, 170, 65, 'male', 'maintain')
+        first = store.add_meal("Rice", 300, 5, 1, 65, timestamp=1708173000, user_id=user)
+        second = store.add_meal("Rice", 300, 5, 1, 65, timestamp=1708173000, user_id=user)
+        third = store.add_meal("Rice", 300, 5, 1, 65, timestamp=1708173000, user_id=user)
+        rows = store.connection().execute(
+            "SELECT id, timestamp FROM meal_diary WHERE user_id = ? ORDER BY id", (user,)).fetchall()
+        assert [tuple(r) for r in rows] == \
+            [(first, 1708173000), (second, 1708173001), (third, 1708173002)]
+        assert store.get_range_totals(user, '2024-02-17', '2024-02-17', False)[0]['calories'] == 900
+        store.close()
+
+
+def test_concurrent_migrations_apply_each_version_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'diary.db')
+        stores = [DiaryStore(path) for _ in range(4)]
+        applied, errors = [], []
+
+        def migrate(store):
+            try:
+                applied.extend(store.migrate())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=migrate, args=(store,)) for store in stores]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert sorted(applied) == list(range(1, SCHEMA_VERSION + 1))
+        assert all(store.schema_version() == SCHEMA_VERSION for store in stores)
+        for store in stores:
+            store.close()
+
+
+if __name__ == "__main__":
+    test_pool_gives_each_thread_one_wal_connection()
+    test_transactions_nest_and_roll_back()
+    test_readers_run_during_a_write()
+    test_daily_totals_use_the_local_day()
+    test_chunked_load_keeps_the_rollup_live()
+    test_interrupted_rebuild_can_rerun()
+    test_naive_timestamps_are_utc()
+    test_same_second_meals_are_both_kept()
+    test_concurrent_migrations_apply_each_version_once()
+    print("Diary store OK")
@@ -0,0 +1,68 @@
+import os
+import csv
+import tempfile
+
+import pytest
+
+from execution.diary_db import DiaryStore
+from execution.export_diary import export_table
+
+
+def _setup(tmp, meals):
+    store = DiaryStore(os.path.join(tmp, 'export.db'))
+    store.migrate()
+    store.bulk_insert_meals((1 + i % 3, 1700000000 + i * 600, f"food {i % 11}", 100.5 + i, 5, 5, 10)
+                            for i in range(meals))
+    return store
+
+
+def test_csv_incremental():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp, 250)
+        first = export_table('meal_diary', os.path.join(tmp, 'a.csv'), incremental=True, chunk_size=40, store=store)
+        assert first["rows"] == 250 and first["chunks"] == 7
+        store.bulk_insert_meals([(2, 1800000000, "Bibimbap", 600, 20, 15, 90)])
+        second = export_table('meal_diary', os.path.join(tmp, 'b.csv'), incremental=True, chunk_size=40, store=store)
+        assert second["rows"] == 1 and second["from_id"] == 250
+        with open(os.path.join(tmp, 'b.csv'), newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert rows == [{"id": "251", "user_id": "2", "timestamp": "1800000000", "food_name": "Bibimbap",
+                         "calories": "600.0", "protein": "20.0", "fat": "15.0", "carbs": "90.0",
+                         "image_url": "", "correction_log": ""}]
+        # A separate feed and a full export both start from the beginning
+        assert export_table('meal_diary', os.path.join(tmp, 'c.csv'), incremental=True, feed="study",
+                            store=store)["rows"] == 251
+        assert export_table('meal_diary', os.path.join(tmp, 'd.csv'), store=store)["rows"] == 251
+        store.close()
+
+
+def test_columnar_formats():
+    pytest.importorskip("pyarrow")
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp, 1000)
+        store.add_recommendation("Greek Yogurt", "Starbucks", user_id=1)
+        stats = export_table('meal_diary', os.path.join(tmp, 'meals.parquet'), chunk_size=300, store=store)
+        assert stats["chunks"] == 4
+        table = pq.read_table(os.path.join(tmp, 'meals.parquet'))
+        assert table.num_rows == 1000 and pq.ParquetFile(os.path.join(tmp, 'meals.parquet')).num_row_groups == 4
+        assert table.column('id').to_pylist() == list(range(1, 1001))
+        assert table.schema.field("timestamp").type.tz == "UTC"       # Parquet stores seconds as ms
+
+        export_table('recommendations', os.path.join(tmp, 'recs.arrow'), store=store)
+        with ipc.open_file(os.path.join(tmp, 'recs.arrow')) as reader:
+            recs = reader.read_all()
+        assert recs.column('suggested_item').to_pylist() == ["Greek Yogurt"]
+        assert not [name for name in os.listdir(tmp) if name.endswith('.part')]
+        store.close()
+
+
+if __name__ == "__main__":
+    test_csv_incremental()
+    try:
+        test_columnar_formats()
+    except pytest.skip.Exception as e:
+        print(f"test_columnar_formats skipped: {e}")
+    print("Diary export OK")
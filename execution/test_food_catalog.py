@@ -0,0 +1,99 @@
+import sys
+import os
+import csv
+import tempfile
+import subprocess
+
+from execution import food_catalog
+from execution.food_catalog import FoodCatalog, build_catalog, seed_records, FOOD_DATABASE
+from execution.bench_import_time import ROOT
+from execution.nutrition_api import NutritionEngine
+
+
+def test_match_and_trigram_recall():
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = FoodCatalog(os.path.join(tmp, 'catalog.bin'), seeded=True)
+        assert len(catalog) == len(FOOD_DATABASE)
+        assert catalog.match("Greek Yogurt")["match_score"] == 1.0
+        assert catalog.match("김치찌개")["food_name"] == "Kimchi Jjigae"
+        # Typos and spelling variants still land on the right food through shared trigrams
+        for query, expected in (("kimchi jigae", "Kimchi Jjigae"), ("grilled salmn", "Grilled Salmon"),
+                                ("김치찌게", "Kimchi Jjigae"), ("avocado tost", "Avocado Toast")):
+            found = catalog.match(query)
+            assert found and found["food_name"] == expected, (query, found)
+        assert catalog.match("zzzz qqqq") is None
+        catalog.close()
+
+
+def test_explicit_path_is_left_alone():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'nested', 'usda.bin')
+        assert build_catalog([{"name": "Banana", "calories": 105, "protein": 1.3, "fat": 0.4, "carbs": 27}],
+                             path) == 1
+        catalog = FoodCatalog(path)
+        assert not catalog.seeded and len(catalog) == 1
+        assert catalog.match("banan")["calories"] == 105.0
+        catalog.close()
+
+
+def test_seeded_catalog_rebuilds_when_the_seed_list_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalog.bin')
+        build_catalog(seed_records(), path, source_digest=1)      # built from an older seed list
+        FOOD_DATABASE["Dakgalbi"] = {"name_ko": "닭갈비", "calories": 520, "protein": 38, "fat": 22, "carbs": 40,
+                                     "health_score": 7, "description": "Spicy stir-fried chicken."}
+        try:
+            catalog = FoodCatalog(path, seeded=True)
+            assert catalog.match("닭갈비")["food_name"] == "Dakgalbi"
+            catalog.close()
+            assert food_catalog._header(path) == (food_catalog.FORMAT_VERSION, True, food_catalog.seed_digest())
+        finally:
+            del FOOD_DATABASE["Dakgalbi"]
+
+        catalog = FoodCatalog(path, seeded=True)
+        assert catalog.match("닭갈비") is None and len(catalog) == len(FOOD_DATABASE)
+        catalog.close()
+
+
+def test_csv_catalog_at_the_default_path_is_kept():
+    with tempfile.TemporaryDirectory() as tmp:
+        path, export = os.path.join(tmp, 'cache', 'food_catalog.bin'), os.path.join(tmp, 'usda.csv')
+        with open(export, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'name_ko', 'calories', 'protein', 'fat', 'carbs', 'health_score'])
+            writer.writerow(['Dakgalbi', '닭갈비', 520, 38, 22, 40, 7])
+            writer.writerow(['Banana', '', 105, 1.3, 0.4, 27, 8])
+        env = dict(os.environ, FOODCOACH_CATALOG=path)
+
+        def catalog(*args):
+            return subprocess.run([sys.executable, '-m', 'execution.food_catalog', *args], cwd=ROOT, env=env,
+                                  capture_output=True, text=True, check=True).stdout
+
+        catalog('build', '--csv', export)
+        assert food_catalog._header(path) == (food_catalog.FORMAT_VERSION, False, 0)
+        # Loading it through the default catalog must not replace it with the seed list
+        assert "'food_name': 'Dakgalbi'" in catalog('search', '닭갈비')
+        assert "Bibimbap" not in catalog('search', 'bibimbap')
+        loaded = FoodCatalog(path, seeded=True)
+        assert len(loaded) == 2
+        loaded.close()
+
+
+def test_engine_keeps_the_catalog_it_is_given():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'empty.bin')
+        build_catalog([], path)
+        empty = FoodCatalog(path)
+        engine = NutritionEngine(catalog=empty, venues=object())
+        assert engine.catalog is empty and empty._buf is None      # still unopened
+        assert len(empty) == 0 and engine.catalog.match("Bibimbap") is None
+        empty.close()
+
+
+if __name__ == "__main__":
+    test_match_and_trigram_recall()
+    test_explicit_path_is_left_alone()
+    test_seeded_catalog_rebuilds_when_the_seed_list_changes()
+    test_csv_catalog_at_the_default_path_is_kept()
+    test_engine_keeps_the_catalog_it_is_given()
+    print("Food catalog OK")
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from execution.diary_db import DiaryStore
+from execution.gap_engine import GapEngine, ACTIVITY_FACTOR, NUTRIENTS, ID_CHUNK_SIZE
+from execution.bench_gap_engine import per_user_gaps
+
+# (age, height, weight, gender, goal); age 30 like the onboarding estimate
+PROFILES = [
+    (30, 180, 75, 'male', 'gain'),
+    (30, 162, 54, 'female', 'lose'),
+    (30, 171, 68, 'male', 'maintain'),
+    (30, 158, 90, 'female', 'maintain'),
+]
+
+
+def _baseline_bmr(height, weight, gender):
+    """
+    The per-user Mifflin-St Jeor estimate of mobile/app/onboarding.tsx (baseline commit)
+    """
+    if gender == 'male':
+        return 10 * weight + 6.25 * height - 5 * 30 + 5
+    return 10 * weight + 6.25 * height - 5 * 30 - 161
+
+
+def _setup(tmp):
+    store = DiaryStore(os.path.join(tmp, 'gaps.db'))
+    store.migrate()
+    return store
+
+
+def test_matches_the_per_user_equation():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        ids = [store.add_profile(*profile) for profile in PROFILES]
+        store.add_meal('Pasta', 600, 15, 20, 90, timestamp="2024-06-03T12:30:00+09:00", user_id=ids[0])
+        store.add_meal('Salad', 200, 5, 10, 15, timestamp="2024-06-03T13:00:00+09:00", user_id=ids[1])
+
+        engine = GapEngine(store)
+        result = engine.cohort_gaps('2024-06-03', day_fraction=0.35)
+        intake = [[600, 15, 20, 90], [200, 5, 10, 15], [0] * 4, [0] * 4]
+        reference = per_user_gaps([(user_id,) + profile for user_id, profile in zip(ids, PROFILES)], intake,
+                                  day_fraction=0.35)
+        for user_id in ids:
+            assert np.allclose([result.for_user(user_id)[n] for n in NUTRIENTS], reference[user_id])
+
+        cohort = engine.load_cohort('2024-06-03')
+        maintain = cohort.goal_code == 1
+        targets = engine.compute_gaps(cohort).targets[maintain, 0]
+        expected = [_baseline_bmr(h, w, g) * ACTIVITY_FACTOR for _, h, w, g, goal in PROFILES if goal == 'maintain']
+        assert np.allclose(targets, expected)
+        store.close()
+
+
+def test_today_is_each_users_local_day():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        seoul = store.add_profile(*PROFILES[0])
+        la = store.add_profile(*PROFILES[1])
+        store.set_timezone(la, 'America/Los_Angeles')
+        # 07:30 KST breakfast is the previous UTC day; 12:00 PDT lunch is the same
+        # instant's previous local day in Los Angeles
+        store.add_meal('Gimbap', 350, 9, 8, 60, timestamp="2024-06-04T07:30:00+09:00", user_id=seoul)
+        store.add_meal('Burrito', 700, 30, 25, 80, timestamp="2024-06-03T12:00:00-07:00", user_id=la)
+
+        now = int(datetime(2024, 6, 4, 9, 0, tzinfo=ZoneInfo('Asia/Seoul')).timestamp())   # 17:00 PDT on the 3rd
+        cohort = GapEngine(store).load_cohort(user_ids=[seoul, la], now=now)
+        assert cohort.intake[:, 0].tolist() == [350, 700]
+        store.close()
+
+
+def test_long_id_lists_are_chunked():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        ids = [store.add_profile(*PROFILES[i % len(PROFILES)]) for i in range(ID_CHUNK_SIZE + 50)]
+        for user_id in ids[::100]:
+            store.add_meal('Pasta', 600, 15, 20, 90, timestamp="2024-06-03T12:30:00+09:00", user_id=user_id)
+
+        engine = GapEngine(store)
+        whole = engine.load_cohort('2024-06-03')
+        # The bound-parameter limit of builds before SQLite 3.32; more ids than that, out of order
+        store.connection().setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        wanted = list(range(3000, 0, -1))
+        cohort = engine.load_cohort('2024-06-03', user_ids=wanted)
+        assert cohort.user_ids.tolist() == ids == whole.user_ids.tolist()
+        assert np.array_equal(cohort.intake, whole.intake) and cohort.intake[:, 0].sum() == 600 * 10
+        store.close()
+
+
+if __name__ == "__main__":
+    test_matches_the_per_user_equation()
+    test_today_is_each_users_local_day()
+    test_long_id_lists_are_chunked()
+    print("Gap engine OK")
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+from execution.gemini_client import GeminiClient, GeminiError
+from execution.gemini_stub_server import GeminiStub
+
+
+def _client(base_url, **options):
+    options = dict(dict(rpm=None, tpm=None, base_delay=0.01, max_delay=0.05), **options)
+    return GeminiClient("stub-key", base_url=base_url, **options)
+
+
+async def _with_stub(stub, scenario):
+    base_url = await stub.start()
+    try:
+        return await scenario(base_url)
+    finally:
+        await stub.stop()
+
+
+def test_throttled_requests_are_retried():
+    stub = GeminiStub(latency_ms=(1, 3), error_429=0.3, seed=3)
+
+    async def scenario(base_url):
+        async with _client(base_url, max_retries=8) as client:
+            texts = await asyncio.gather(*(client.generate_text(f"Request {i}") for i in range(30)))
+            return texts, client.stats
+
+    texts, stats = asyncio.run(_with_stub(stub, scenario))
+    assert texts == ["OK"] * 30
+    assert stats.throttled == stub.counts["429"] > 0
+    assert stats.retries == stats.throttled and stats.requests == stub.counts["requests"]
+
+
+def test_retries_give_up_after_max_retries():
+    stub = GeminiStub(latency_ms=(1, 2), error_429=1.0)
+
+    async def scenario(base_url):
+        async with _client(base_url, max_retries=2) as client:
+            try:
+                await client.generate_text("Always throttled")
+            except GeminiError as e:
+                return e.status
+        return None
+
+    assert asyncio.run(_with_stub(stub, scenario)) == 429
+    assert stub.counts["requests"] == 3
+
+
+def test_backoff_is_capped_and_honours_retry_after():
+    client = GeminiClient("stub-key", base_delay=0.5, max_delay=4.0)
+    for attempt in range(8):
+        assert 0.0 <= client._backoff(attempt) <= min(4.0, 0.5 * 2 ** attempt)
+    assert client._backoff(0, "2") == 2.0
+    assert client._backoff(0, "120") == 4.0
+    assert 0.0 <= client._backoff(1, "Wed, 21 Oct 2026 07:28:00 GMT") <= 1.0
+
+
+def test_identical_requests_are_coalesced():
+    stub = GeminiStub(latency_ms=(50, 60))
+
+    async def scenario(base_url):
+        async with _client(base_url) as client:
+            texts = await asyncio.gather(*(client.generate_text("Same prompt") for _ in range(10)))
+            await client.generate_text("Same prompt")       # finished calls are not reused
+            return texts, client.stats
+
+    texts, stats = asyncio.run(_with_stub(stub, scenario))
+    assert texts == ["OK"] * 10
+    assert stats.coalesced == 9 and stub.counts["requests"] == 2
+
+
+def test_session_from_a_finished_loop_is_closed():
+    stub = GeminiStub(latency_ms=(1, 2))
+    server_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=server_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        base_url = asyncio.run_coroutine_threadsafe(stub.start(), server_loop).result()
+        client = _client(base_url)
+        assert asyncio.run(client.generate_text("first loop")) == "OK"
+        first = client._session
+        assert asyncio.run(client.generate_text("second loop")) == "OK"
+        assert first.closed and client._session is not first
+        asyncio.run(client.close())
+    finally:
+        asyncio.run_coroutine_threadsafe(stub.stop(), server_loop).result()
+        server_loop.call_soon_threadsafe(server_loop.stop)
+        thread.join()
+        server_loop.close()
+
+
+if __name__ == "__main__":
+    test_throttled_requests_are_retried()
+    test_retries_give_up_after_max_retries()
+    test_backoff_is_capped_and_honours_retry_after()
+    test_identical_requests_are_coalesced()
+    test_session_from_a_finished_loop_is_closed()
+    print("Gemini client OK")
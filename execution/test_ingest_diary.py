@@ -0,0 +1,38 @@
+import os
+import json
+import tempfile
+
+from execution.diary_db import DiaryStore
+from execution.ingest_diary import run_ingest
+
+ROWS = [
+    {"user_id": 1, "timestamp": "2024-06-03T03:30:00+00:00", "food_name": "Kimchi", "calories": 40,
+     "protein": 2, "fat": 0, "carbs": 7},
+    {"user_id": 1, "timestamp": "2024-06-03T10:00:00+00:00", "food_name": "Ramen", "calories": 500,
+     "protein": 10, "fat": 20, "carbs": 70},
+    {"user_id": "", "timestamp": "2024-06-03T11:00:00+00:00", "food_name": "Banana", "calories": 105,
+     "protein": 1, "fat": 0, "carbs": 27},
+    {"user_id": 2, "timestamp": "", "food_name": "Salad", "calories": 150, "protein": 5, "fat": 8, "carbs": 12},
+]
+
+
+def test_reimport_is_idempotent():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'diary.jsonl')
+        with open(path, 'w') as f:
+            f.write("\n".join(json.dumps(row) for row in ROWS) + "\n")
+        store = DiaryStore(os.path.join(tmp, 'ingest.db'))
+        store.migrate()
+        first = run_ingest(path, store=store)
+        second = run_ingest(path, store=store)
+        assert first["rejected"] == second["rejected"] == 2
+        meals = store.recent_meals()
+        assert len(meals) == 2
+        kimchi = next(m for m in meals if m["food_name"] == "Kimchi")
+        assert kimchi["fat"] == 0 and kimchi["fat"] is not None
+        store.close()
+
+
+if __name__ == "__main__":
+    test_reimport_is_idempotent()
+    print("Ingest OK")
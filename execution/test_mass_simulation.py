@@ -0,0 +1,99 @@
+import os
+import queue
+import tempfile
+import threading
+
+from execution.diary_db import DiaryStore
+from execution.adoption_model import AdoptionModel
+from execution.bench.mass_simulation import plan_users, prepare_db, run, _apply_group, _write, STAGES
+
+
+def _counts(db_path):
+    store = DiaryStore(db_path)
+    conn = store.connection()
+    counts = [conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ('user_profile', 'meal_diary', 'recommendations')]
+    decided = conn.execute(
+        "SELECT COUNT(*) FROM recommendations WHERE status IN ('accepted', 'rejected')").fetchone()[0]
+    store.close()
+    return counts, decided
+
+
+def test_writer_queue_and_direct_writes_agree():
+    plans = plan_users(60, seed=7)
+    assert plans == plan_users(60, seed=7)
+    for direct in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'mass.db')
+            prepare_db(db_path, venues=3000, seed=7)
+            report = run(plans, 3, db_path, batch_size=8, direct_writes=direct)
+            (profiles, meals, recommendations), decided = _counts(db_path)
+        assert profiles == meals == 60
+        assert recommendations == decided == report["recommended"] > 0
+        assert all(report["stages"][stage]["count"] == 60 for stage in STAGES + ('end_to_end',))
+        if direct:
+            assert report["writer"] is None
+        else:
+            # 3 shards of 20 users in batches of 8: 9 log writes plus up to 9 feedback writes
+            assert 9 < report["writer"]["queue_wait"]["count"] <= 18
+
+
+def test_failed_group_rolls_back_adoption_counts():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DiaryStore(os.path.join(tmp, 'writer.db'))
+        store.migrate()
+        adoption = AdoptionModel(store, clock=lambda: 1717400000)
+        user_id = store.add_profile(30, 175, 70, 'male', 'maintain')
+        _apply_group(store, adoption, [('feedback', [(user_id, "Protein Shake", "Gym Cafe", 'accepted', None)])])
+        before = adoption.score(user_id, "Protein Shake", "Gym Cafe")
+
+        # One bad message fails the whole group after its feedback was learned
+        writes = [('feedback', [(user_id, "Protein Shake", "Gym Cafe", 'rejected', "too sweet")] * 3),
+                  ('unknown', [])]
+        try:
+            _apply_group(store, adoption, writes)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("the group should have failed")
+        assert adoption.score(user_id, "Protein Shake", "Gym Cafe") == before
+        assert store.connection().execute("SELECT COUNT(*) FROM recommendations").fetchone()[0] == 1
+        store.close()
+
+
+def test_workers_stop_waiting_for_a_stopped_writer():
+    requests, stopped = queue.Queue(), threading.Event()
+    stopped.set()
+    try:
+        _write(requests, queue.Queue(), stopped, 0, 0, 'log', [])
+    except RuntimeError as e:
+        assert "Writer stopped" in str(e)
+    else:
+        raise AssertionError("the write should have failed")
+    assert requests.qsize() == 1
+
+
+def test_workers_reload_adoption_without_writing():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DiaryStore(os.path.join(tmp, 'worker.db'))
+        store.migrate()
+        store.connection().execute(
+            "CREATE TRIGGER refuse_writes BEFORE DELETE ON adoption_stats BEGIN SELECT RAISE(ABORT, 'read only'); END")
+        adoption = AdoptionModel(store, clock=lambda: 1717400000)
+        assert adoption.load(rebuild_empty=False) == 0
+
+        user_id = store.add_profile(30, 175, 70, 'male', 'maintain')
+        writer = AdoptionModel(store, clock=lambda: 1717400000)
+        writer.load(rebuild_empty=False)
+        _apply_group(store, writer, [('feedback', [(user_id, "Protein Shake", "Gym Cafe", 'accepted', None)])])
+        assert adoption.load(rebuild_empty=False) == len(writer) > 0
+        assert adoption.score(user_id, "Protein Shake", "Gym Cafe") == writer.score(user_id, "Protein Shake", "Gym Cafe")
+        store.close()
+
+
+if __name__ == "__main__":
+    test_writer_queue_and_direct_writes_agree()
+    test_failed_group_rolls_back_adoption_counts()
+    test_workers_stop_waiting_for_a_stopped_writer()
+    test_workers_reload_adoption_without_writing()
+    print("Mass simulation OK")
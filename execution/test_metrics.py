@@ -0,0 +1,139 @@
+import os
+import json
+import asyncio
+import tempfile
+import threading
+import urllib.request
+
+from execution import metrics
+from execution.diary_db import DiaryStore
+
+
+def _value(snapshot, section, name, **labels):
+    for entry in snapshot[section]:
+        if entry["name"] == name and entry["labels"] == {k: str(v) for k, v in labels.items()}:
+            return entry
+    return None
+
+
+def test_disabled_records_nothing():
+    metrics.disable()
+    metrics.reset()
+    metrics.count("calls_total")
+    with metrics.timer("block_seconds"):
+        pass
+
+    @metrics.timed("fn_seconds")
+    def fn():
+        return 1
+
+    assert fn() == 1
+    assert metrics.snapshot() == {"counters": [], "gauges": [], "histograms": []}
+
+
+def test_threads_merge_on_scrape():
+    metrics.enable()
+    metrics.reset()
+
+    @metrics.timed("work_seconds", kind="unit")
+    def work(i):
+        metrics.count("items_total", 2, parity=i % 2)
+        if i == 7:
+            raise ValueError("boom")
+
+    def worker():
+        for i in range(100):
+            try:
+                work(i)
+            except ValueError:
+                pass
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    snap = metrics.snapshot()            # finished threads are folded into the retired buffer
+    assert _value(snap, "counters", "items_total", parity=0)["value"] == 800
+    assert _value(snap, "counters", "work_errors_total", kind="unit")["value"] == 8
+    hist = _value(snap, "histograms", "work_seconds", kind="unit")
+    assert hist["count"] == 800 and 0 <= hist["p50"] <= hist["p99"]
+    assert metrics.snapshot() == snap    # and still counted on the next scrape
+
+
+def test_async_timer_and_gauge():
+    metrics.enable()
+    metrics.reset()
+    seen = []
+
+    @metrics.timed("fetch_seconds")
+    async def fetch():
+        with metrics.in_flight("fetches_in_flight"):
+            seen.append(_value(metrics.snapshot(), "gauges", "fetches_in_flight")["value"])
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(fetch(), fetch(), fetch())
+
+    asyncio.run(main())
+    snap = metrics.snapshot()
+    assert max(seen) >= 1 and _value(snap, "gauges", "fetches_in_flight")["value"] == 0
+    hist = _value(snap, "histograms", "fetch_seconds", op="test_async_timer_and_gauge.<locals>.fetch")
+    assert hist["count"] == 3 and 0.005 < hist["p50"] < 0.05
+
+    try:
+        metrics.timed("gen_seconds")(lambda: (yield))
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("timed() accepted a generator function")
+
+
+def test_quantile_and_prometheus_text():
+    metrics.enable()
+    metrics.reset()
+    for ms in range(1, 101):
+        metrics.observe("lookup_seconds", ms / 1000.0, source='say "hi"')
+    hist = metrics.collect().histograms[("lookup_seconds", (("source", 'say "hi"'),))]
+    assert 0.04 < metrics.quantile(hist, 0.5) < 0.06
+    assert 0.09 < metrics.quantile(hist, 0.95) <= 0.1
+
+    text = metrics.prometheus_text()
+    assert "# TYPE foodcoach_lookup_seconds histogram" in text
+    assert 'foodcoach_lookup_seconds_bucket{source="say \\"hi\\"",le="+Inf"} 100' in text
+    assert 'foodcoach_lookup_seconds_count{source="say \\"hi\\""} 100' in text
+
+
+def test_store_and_endpoint():
+    metrics.enable()
+    metrics.reset()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DiaryStore(os.path.join(tmp, 'metrics.db'))
+        store.migrate()
+        store.add_meal("Kimchi", 40, 2, 0.5, 7, user_id=1)
+        store.recent_meals()
+        store.close()
+    snap = metrics.snapshot()
+    assert _value(snap, "histograms", "db_seconds", op="DiaryStore.add_meal")["count"] == 1
+    assert _value(snap, "histograms", "db_seconds", op="DiaryStore.recent_meals")["count"] == 1
+    assert _value(snap, "histograms", "db_commit_seconds")["count"] >= 1
+
+    server = metrics.serve(port=0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(base + "/metrics") as response:
+            assert 'foodcoach_db_seconds_count{op="DiaryStore.add_meal"} 1' in response.read().decode()
+        with urllib.request.urlopen(base + "/metrics.json") as response:
+            assert json.loads(response.read())["histograms"]
+    finally:
+        server.shutdown()
+        metrics.disable()
+
+
+if __name__ == "__main__":
+    test_disabled_records_nothing()
+    test_threads_merge_on_scrape()
+    test_async_timer_and_gauge()
+    test_quantile_and_prometheus_text()
+    test_store_and_endpoint()
+    print("Metrics OK")
@@ -0,0 +1,146 @@
+import os
+import json
+import asyncio
+import tempfile
+
+from execution.diary_db import DiaryStore, SCHEMA_VERSION
+from execution.portion_model import PortionModel
+from execution.nutrition_api import NutritionEngine
+from execution.vision_analyzer import FoodVisionAnalyzer
+
+NOW = 1717400000
+
+
+def _setup(tmp):
+    store = DiaryStore(os.path.join(tmp, 'portions.db'))
+    store.migrate()
+    return store
+
+
+def test_corrections_calibrate_portions():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        model = PortionModel(store, clock=lambda: NOW)
+        me, other = store.add_profile(30, 175, 70, 'male', 'gain'), store.add_profile(28, 160, 55, 'female', 'lose')
+        assert model.factor(me, "Bibimbap") == 1.0
+
+        meal = store.add_meal("Bibimbap", 500, 20, 10, 80, user_id=me)
+        first = model.record_correction(meal, calories=650, protein=26)
+        rows = store.connection().execute(
+            "SELECT field, estimated, corrected, source FROM meal_corrections WHERE meal_id = ? ORDER BY field",
+            (meal,)).fetchall()
+        assert [tuple(r) for r in rows] == [("calories", 500, 650, "user"), ("protein", 20, 26, "user")]
+        assert store.recent_meals(1)[0]["calories"] == 650
+        # One correction only moves part of the way, and leaks a little into other foods
+        assert 1.0 < first < 1.3 and 1.0 < model.factor(me, "Kimchi Stew") < first
+        assert model.factor(other, "Bibimbap") == 1.0
+
+        # A second edit of the same meal corrects the user's own number: stored, not learned
+        assert model.record_correction(meal, calories=600) == first
+
+        for i in range(8):
+            meal = store.add_meal("bibimbap ", 500, 20, 10, 80, timestamp=NOW + i * 3600, user_id=me)
+            model.record_correction(meal, calories=650)
+        assert 1.25 < model.factor(me, "Bibimbap") <= 1.3
+
+        # Estimates already shown calibrated are measured against the raw number
+        factor = model.factor(me, "Bibimbap")
+        meal = store.add_meal("Bibimbap", round(500 * factor), 20, 10, 80, timestamp=NOW, user_id=me)
+        model.record_correction(meal, factor=factor, calories=round(500 * factor))
+        assert abs(model.factor(me, "Bibimbap") - factor) < 0.01
+
+        expected = {(u, f): model._factors[(u, f)] for u, f in model._factors}
+        reloaded = PortionModel(store)
+        reloaded.load()
+        assert reloaded._factors == expected
+        reloaded.rebuild()
+        assert all(abs(reloaded._factors[k] - v) < 1e-9 for k, v in expected.items())
+        store.close()
+
+
+def test_failed_correction_leaves_the_model_alone():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        model = PortionModel(store, clock=lambda: NOW)
+        me = store.add_profile(30, 175, 70, 'male', 'gain')
+        meal = store.add_meal("Bibimbap", 500, 20, 10, 80, user_id=me)
+        store.connection().execute(
+            "CREATE TRIGGER refuse_calibration BEFORE INSERT ON portion_calibration "
+            "BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+        try:
+            model.record_correction(meal, calories=650)
+        except Exception as e:
+            assert 'disk full' in str(e)
+        else:
+            raise AssertionError("the correction should have failed")
+        assert len(model) == 0 and model.factor(me, "Bibimbap") == 1.0
+        assert store.recent_meals(1)[0]["calories"] == 500
+
+        store.connection().execute("DROP TRIGGER refuse_calibration")
+        assert model.record_correction(meal, calories=650) > 1.0
+        reloaded = PortionModel(store)
+        reloaded.load()
+        assert reloaded._factors == model._factors
+        store.close()
+
+
+def test_legacy_correction_log_migrates():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        me = store.add_profile(30, 175, 70, 'male', 'gain')
+        meal = store.add_meal("Pasta", 250, 10, 8, 40, user_id=me, correction_log="user changed 200kcal to 250kcal")
+        store.add_meal("Salad", 150, 5, 8, 12, user_id=me, correction_log="looked bigger")
+        with store.transaction() as conn:
+            conn.execute("PRAGMA user_version = 10")
+        assert store.migrate() == list(range(11, SCHEMA_VERSION + 1)) and store.schema_version() == SCHEMA_VERSION
+
+        rows = store.connection().execute(
+            "SELECT meal_id, food_key, field, estimated, corrected, source FROM meal_corrections").fetchall()
+        assert [tuple(r) for r in rows] == [(meal, "pasta", "calories", 200, 250, "legacy")]
+        assert store.migrate() == []
+        model = PortionModel(store)
+        assert model.load() == 2 and model.factor(me, "Pasta") > 1.0
+        store.close()
+
+
+class StubClient:
+    def __init__(self, analysis):
+        self.analysis = analysis
+        self.prompts = []
+
+    async def generate(self, payload):
+        self.prompts.append(payload["contents"][0]["parts"][0]["text"])
+        return {"candidates": [{"content": {"parts": [{"text": json.dumps(self.analysis)}]}}]}
+
+
+def test_estimates_use_calibration():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        model = PortionModel(store, prior_strength=0.0)
+        me = store.add_profile(30, 175, 70, 'male', 'gain')
+        model.record_correction(store.add_meal("Grilled Salmon", 450, 34, 28, 0, user_id=me), calories=675)
+        assert abs(model.factor(me, "Grilled Salmon") - 1.5) < 1e-9
+
+        engine = NutritionEngine(venues=object(), portions=model)
+        plain, mine = engine.get_nutrition("grilled salmon"), engine.get_nutrition("grilled salmon", user_id=me)
+        assert plain["calories"] == 450 and mine["calories"] == 675 and mine["portion_factor"] == 1.5
+
+        photo = os.path.join(tmp, 'salmon.jpg')
+        with open(photo, 'wb') as f:
+            f.write(b'not really a jpeg')
+        client = StubClient({"food_name": "Grilled Salmon", "estimated_calories": 400,
+                             "macros": {"protein": 30, "fat": 20, "carbs": 2}, "confidence": 0.9})
+        analyzer = FoodVisionAnalyzer(client=client, max_dimension=None, portions=model)
+        result = asyncio.run(analyzer.analyze_image_async(photo, store.get_profile(me)))
+        assert result["estimated_calories"] == 600 and result["macros"]["protein"] == 45
+        # No body profile in the prompt: portions come from the calibration instead
+        assert "175" not in client.prompts[0] and "sized as one serving for this user" not in client.prompts[0]
+        store.close()
+
+
+if __name__ == "__main__":
+    test_corrections_calibrate_portions()
+    test_failed_correction_leaves_the_model_alone()
+    test_legacy_correction_log_migrates()
+    test_estimates_use_calibration()
+    print("Portion model OK")
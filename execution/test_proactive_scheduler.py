@@ -0,0 +1,141 @@
+import os
+import asyncio
+import tempfile
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from execution.diary_db import DiaryStore
+from execution.proactive_scheduler import ProactiveScheduler, SimClock, IGNORE_DELAY, LATER_DELAY
+
+SEOUL = ZoneInfo('Asia/Seoul')
+# 2024-06-03 07:00 KST
+START = int(datetime(2024, 6, 3, 7, 0, tzinfo=SEOUL).timestamp())
+
+
+def _setup(tmp):
+    store = DiaryStore(os.path.join(tmp, 'proactive.db'))
+    store.migrate()
+    return store
+
+
+def _local(epoch, zone=SEOUL):
+    return datetime.fromtimestamp(epoch, zone).strftime('%H:%M')
+
+
+class Outbox:
+    def __init__(self):
+        self.sent = []
+
+    async def __call__(self, prompt):
+        self.sent.append(prompt)
+
+    def for_user(self, user_id):
+        return [p for p in self.sent if p["user_id"] == user_id]
+
+
+def test_local_windows_and_batched_context():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        users = [store.add_profile(30, 175, 70, 'male', 'maintain') for _ in range(120)]
+        new_york = store.add_profile(30, 175, 70, 'female', 'lose')
+        store.set_timezone(new_york, 'America/New_York')
+        # Pasta-only lunch for one user leaves a protein gap by the evening prompt
+        store.add_meal('Pasta', 600, 15, 20, 90, timestamp=START + 5 * 3600, user_id=users[0])
+
+        outbox = Outbox()
+        scheduler = ProactiveScheduler(outbox, store, SimClock(START), context_batch_size=50)
+        assert scheduler.load() == 121
+        asyncio.run(scheduler.run(until=START + 13 * 3600))
+
+        seoul = outbox.for_user(users[0])
+        assert [(p["trigger"], _local(p["fire_at"])) for p in seoul] == \
+            [("morning", "08:00"), ("lunch", "12:00"), ("evening", "18:30")]
+        assert "단백질" in seoul[-1]["message"]
+        ny = outbox.for_user(new_york)
+        assert ny and all(_local(p["fire_at"], ZoneInfo('America/New_York')) in ("08:00", "12:00", "18:30")
+                          for p in ny)
+        # 120 Seoul users per window, 50 per context query
+        assert scheduler.stats["context_queries"] <= 3 * 3 + len(ny)
+        state = store.connection().execute(
+            "SELECT awaiting_reply, last_trigger FROM prompt_state WHERE user_id = ?", (users[0],)).fetchone()
+        assert tuple(state) == (1, "evening")
+        store.close()
+
+
+def test_context_reads_the_local_day():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        la = ZoneInfo('America/Los_Angeles')
+        user_id = store.add_profile(30, 175, 70, 'female', 'lose')
+        store.set_timezone(user_id, 'America/Los_Angeles')
+        # A full day's lunch at 12:00 PDT; the 18:30 PDT prompt is already June 4 in UTC
+        lunch = int(datetime(2024, 6, 3, 12, 0, tzinfo=la).timestamp())
+        store.add_meal('Bibimbap', 1500, 120, 50, 180, timestamp=lunch, user_id=user_id)
+
+        outbox = Outbox()
+        scheduler = ProactiveScheduler(outbox, store, SimClock(lunch + 5 * 3600))
+        scheduler.load()
+        asyncio.run(scheduler.run(until=lunch + 7 * 3600))
+        assert [(p["trigger"], _local(p["fire_at"], la)) for p in outbox.sent] == [("evening", "18:30")]
+        assert outbox.sent[0]["missing"] == []
+        store.close()
+
+
+def test_backoff_rules():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        quiet = store.add_profile(30, 175, 70, 'male', 'maintain')
+        busy = store.add_profile(30, 175, 70, 'male', 'maintain')
+        clock = SimClock(START)
+        outbox = Outbox()
+        scheduler = ProactiveScheduler(outbox, store, clock)
+        scheduler.load()
+
+        async def day():
+            # busy answers lunch with "나중에"; quiet never answers anything
+            await scheduler.run(until=START + 5 * 3600 + 60)
+            scheduler.record_reply(busy, "나중에 할게요")
+            await scheduler.run(until=START + 36 * 3600)
+        asyncio.run(day())
+
+        times = [p["fire_at"] for p in outbox.for_user(quiet)]
+        # 08:00, 12:00, 18:30 unanswered, 08:00 next day is the third ignore -> 12:30
+        assert [_local(t) for t in times] == ["08:00", "12:00", "18:30", "08:00", "12:30", "19:00"]
+        assert scheduler.stats["ignored"] >= 3
+
+        reminder = [p for p in outbox.for_user(busy) if p["kind"] == "reminder"]
+        assert len(reminder) == 1 and reminder[0]["trigger"] == "lunch"
+        assert reminder[0]["fire_at"] == START + 5 * 3600 + 60 + LATER_DELAY
+
+        # A reply lifts the delay for the next window
+        streak_before = scheduler.next_fire(quiet)
+        scheduler.record_reply(quiet, "샐러드 먹었어요")
+        assert scheduler.next_fire(quiet) == streak_before - IGNORE_DELAY
+        store.close()
+
+
+def test_state_survives_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _setup(tmp)
+        user_id = store.add_profile(30, 175, 70, 'male', 'maintain')
+        scheduler = ProactiveScheduler(Outbox(), store, SimClock(START))
+        scheduler.load()
+        asyncio.run(scheduler.run(until=START + 12 * 3600))      # three unanswered prompts
+
+        restarted = ProactiveScheduler(Outbox(), store, SimClock(START + 12 * 3600))
+        restarted.load()
+        outbox = Outbox()
+        restarted.send = outbox
+        asyncio.run(restarted.run(until=START + 26 * 3600))
+        # The morning prompt is the third ignore in a row, so lunch comes at 12:30
+        assert [_local(p["fire_at"]) for p in outbox.sent] == ["08:00"]
+        assert _local(restarted.next_fire(user_id)) == "12:30"
+        store.close()
+
+
+if __name__ == "__main__":
+    test_local_windows_and_batched_context()
+    test_context_reads_the_local_day()
+    test_backoff_rules()
+    test_state_survives_restart()
+    print("Proactive scheduler OK")
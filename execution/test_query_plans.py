@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import tempfile
+
+from execution.diary_db import (
+    DiaryStore, BASELINE_SCHEMA, SCHEMA_VERSION,
+    SELECT_MEALS_BETWEEN_SQL, SELECT_RECOMMENDATIONS_BY_STATUS_SQL, SELECT_RANGE_TOTALS_SQL,
+)
+
+# Query-plan regression checks: the hot diary queries must stay index searches.
+# name -> (sql, params, fragment expected in the SEARCH step)
+HOT_QUERIES = {
+    "meals_between": (SELECT_MEALS_BETWEEN_SQL, (1, 0, 2 ** 31),
+                      "INDEX idx_meal_diary_user_time_food (user_id=? AND timestamp>? AND timestamp<?)"),
+    "recommendations_by_status": (SELECT_RECOMMENDATIONS_BY_STATUS_SQL, (1, 'pending'),
+                                  "INDEX idx_recommendations_user_status (user_id=? AND status=?)"),
+    "get_range_totals": (SELECT_RANGE_TOTALS_SQL, (1, '2024-01-01', '2024-01-30'),
+                         "PRIMARY KEY (user_id=? AND day>? AND day<?)"),
+}
+
+
+def query_plan(conn, sql, params):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def _fresh_store(tmp):
+    store = DiaryStore(os.path.join(tmp, 'plans.db'))
+    store.migrate()
+    for user_id in range(1, 51):
+        store.bulk_insert_meals(
+            (user_id, 1700000000 + i * 3600, f"food {i % 7}", 300, 20, 10, 30) for i in range(40)
+        )
+        store.add_recommendation("Greek Yogurt", "Starbucks", user_id=user_id)
+    store.connection().execute("ANALYZE")
+    return store
+
+
+def test_hot_queries_use_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _fresh_store(tmp)
+        conn = store.connection()
+        for name, (sql, params, expected) in HOT_QUERIES.items():
+            plan = query_plan(conn, sql, params)
+            assert any(step.startswith("SEARCH") and expected in step for step in plan), \
+                f"{name} does not search {expected}: {plan}"
+            assert not any(step.startswith("SCAN") for step in plan), f"{name} scans a table: {plan}"
+        store.close()
+
+
+def test_migration_converts_legacy_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'legacy.db')
+        conn = sqlite3.connect(path)
+        for statement in BASELINE_SCHEMA:
+            conn.execute(statement)
+        conn.execute("INSERT INTO meal_diary (food_name, calories, protein, fat, carbs, timestamp) "
+                     "VALUES ('Pasta', 600, 15, 20, 90, '2024-02-17T12:30:00')")
+        conn.execute("INSERT INTO meal_diary (food_name, calories, protein, fat, carbs) "
+                     "VALUES ('Salad', 200, 5, 10, 15)")
+        conn.execute("INSERT INTO recommendations (suggested_item, place_name, status) "
+                     "VALUES ('Protein Shake', 'CU Convenience Store', 'rejected')")
+        conn.commit()
+        conn.close()
+
+        store = DiaryStore(path)
+        assert store.migrate() == list(range(1, SCHEMA_VERSION + 1))
+        assert store.schema_version() == SCHEMA_VERSION
+        rows = store.connection().execute("SELECT id, timestamp, typeof(timestamp) FROM meal_diary ORDER BY id").fetchall()
+        assert [row[2] for row in rows] == ['integer', 'integer']
+        assert rows[0][1] == 1708173000
+        assert store.migrate() == []
+        store.close()
+
+
+if __name__ == "__main__":
+    test_hot_queries_use_indexes()
+    test_migration_converts_legacy_database()
+    print("Query plans OK")
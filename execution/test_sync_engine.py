@@ -0,0 +1,159 @@
+import os
+import time
+import tempfile
+
+from execution.diary_db import DiaryStore
+from execution.postgrest_stub import PostgrestStub, _condition
+from execution.sync_engine import SyncEngine
+
+REMOTE_USER = "37db4252-0c14-4469-a1a5-f26d6feed6ef"
+
+
+def _setup(tmp, name):
+    store = DiaryStore(os.path.join(tmp, f'{name}.db'))
+    store.migrate()
+    user_id = store.add_profile(30, 175, 70, 'male', 'maintain')
+    return store, user_id
+
+
+def _meals(store, user_id):
+    rows = store.connection().execute(
+        "SELECT food_name, calories FROM meal_diary WHERE user_id = ? ORDER BY timestamp", (user_id,)
+    ).fetchall()
+    return [tuple(row) for row in rows]
+
+
+def test_round_trip_between_devices():
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = PostgrestStub()
+        url = stub.start()
+        phone, phone_user = _setup(tmp, 'phone')
+        laptop, laptop_user = _setup(tmp, 'laptop')
+        a = SyncEngine(phone_user, REMOTE_USER, phone, base_url=url, api_key="test", push_batch_size=50)
+        b = SyncEngine(laptop_user, REMOTE_USER, laptop, base_url=url, api_key="test", pull_page_size=40)
+
+        phone.bulk_insert_meals((phone_user, 1700000000 + i * 3600, f"food {i}", 100 + i, 5, 5, 10)
+                                for i in range(120))
+        report = a.sync()
+        assert report["pushed"] == 120 and report["round_trips"] == 1 + 3
+        assert b.sync()["pulled"] == 120
+        assert _meals(laptop, laptop_user) == _meals(phone, phone_user)
+        # Nothing left to say in either direction, and no echo of pulled rows
+        assert a.sync()["pulled"] == 0 and b.sync()["pushed"] == 0
+
+        meal_id = laptop.connection().execute(
+            "SELECT id FROM meal_diary WHERE food_name = 'food 3'").fetchone()[0]
+        laptop.delete_meal(meal_id)
+        assert b.sync()["deleted"] == 1
+        a.sync()
+        assert len(_meals(phone, phone_user)) == 119
+        assert stub.rows and all(r["updated_at"] for r in stub.rows.values())
+        stub.stop()
+
+
+def test_last_writer_wins():
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = PostgrestStub()
+        url = stub.start()
+        phone, phone_user = _setup(tmp, 'phone')
+        laptop, laptop_user = _setup(tmp, 'laptop')
+        a = SyncEngine(phone_user, REMOTE_USER, phone, base_url=url, api_key="test")
+        b = SyncEngine(laptop_user, REMOTE_USER, laptop, base_url=url, api_key="test")
+        phone.add_meal("Bibimbap", 600, 20, 15, 90, timestamp=1700000000, user_id=phone_user)
+        a.sync()
+        b.sync()
+
+        def meal_id(store):
+            return store.connection().execute("SELECT id FROM meal_diary WHERE food_name = 'Bibimbap'").fetchone()[0]
+
+        # Laptop edits first and syncs; the phone's later offline edit must win
+        laptop.update_meal(meal_id(laptop), calories=650)
+        b.sync()
+        time.sleep(0.01)
+        phone.update_meal(meal_id(phone), calories=700)
+        report = a.sync()
+        assert report["conflicts"] == 1 and report["pushed"] == 1
+        b.sync()
+        assert _meals(phone, phone_user) == _meals(laptop, laptop_user) == [("Bibimbap", 700)]
+
+        # An older pending edit loses to a newer remote one
+        phone.update_meal(meal_id(phone), calories=710)
+        time.sleep(0.01)
+        laptop.update_meal(meal_id(laptop), calories=720)
+        b.sync()
+        assert a.sync()["conflicts"] == 1
+        assert _meals(phone, phone_user) == [("Bibimbap", 720)]
+        stub.stop()
+
+
+def _app_meal_logs(stub):
+    # meal_service.getMealLogs: user_id = ? AND deleted_at IS NULL, newest first
+    filters = [_condition(f"user_id.eq.{REMOTE_USER}"), _condition("deleted_at.is.null")]
+    return stub.select(filters, "created_at.desc")
+
+
+def test_app_written_rows_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = PostgrestStub()
+        url = stub.start()
+        store, user_id = _setup(tmp, 'laptop')
+        engine = SyncEngine(user_id, REMOTE_USER, store, base_url=url, api_key="test")
+
+        # What meal_service.saveMealLog inserts after a photo analysis
+        stub.upsert([{
+            "user_id": REMOTE_USER, "food_name": "Bibimbap", "food_name_ko": "비빔밥", "calories": 550,
+            "protein": "20g", "fat": "12.5 g", "carbs": "", "sugar": "8g", "fiber": "4g", "meal_type": "Lunch",
+            "health_score": 8, "created_at": "2024-02-17T03:30:00.000Z",
+        }])
+        assert engine.sync()["pulled"] == 1
+        row = store.connection().execute(
+            "SELECT timestamp, calories, protein, fat, carbs FROM meal_diary WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        assert tuple(row) == (1708140600, 550, 20.0, 12.5, None)
+
+        # A local edit goes back out without losing the app's own columns
+        meal_id = store.connection().execute("SELECT id FROM meal_diary").fetchone()[0]
+        store.update_meal(meal_id, calories=600)
+        assert engine.sync()["pushed"] == 1
+        [remote] = _app_meal_logs(stub)
+        assert remote["calories"] == 600 and remote["protein"] == 20.0 and remote["food_name_ko"] == "비빔밥"
+
+        # meal_service.deleteMealLog stamps deleted_at; the engine drops the meal
+        stub.patch(lambda r: r["id"] == remote["id"], {"deleted_at": "2024-02-18T09:00:00+00:00"})
+        engine.sync()
+        assert _meals(store, user_id) == []
+
+        # ...and a delete made here disappears from the app's list the same way
+        store.add_meal("Kimbap", 320, 9, 8, 50, timestamp=1708200000, user_id=user_id)
+        engine.sync()
+        assert [r["food_name"] for r in _app_meal_logs(stub)] == ["Kimbap"]
+        store.delete_meal(store.connection().execute("SELECT id FROM meal_diary").fetchone()[0])
+        engine.sync()
+        assert _app_meal_logs(stub) == [] and len(stub.rows) == 2
+        stub.stop()
+
+
+def test_meal_type_follows_the_users_time_zone():
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = PostgrestStub()
+        url = stub.start()
+        store, user_id = _setup(tmp, 'laptop')
+        engine = SyncEngine(user_id, REMOTE_USER, store, base_url=url, api_key="test")
+        # 2024-02-17 03:30 UTC: 12:30 in Seoul (the default), 19:30 the day before in Los Angeles
+        meal_id = store.add_meal("Bibimbap", 550, 20, 12, 80, timestamp=1708140600, user_id=user_id)
+        engine.sync()
+        assert [r["meal_type"] for r in _app_meal_logs(stub)] == ["Lunch"]
+
+        store.set_timezone(user_id, 'America/Los_Angeles')
+        store.update_meal(meal_id, calories=600)
+        engine.sync()
+        assert [r["meal_type"] for r in _app_meal_logs(stub)] == ["Dinner"]
+        stub.stop()
+
+
+if __name__ == "__main__":
+    test_round_trip_between_devices()
+    test_last_writer_wins()
+    test_app_written_rows_round_trip()
+    test_meal_type_follows_the_users_time_zone()
+    print("Sync engine OK")
@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+from execution.diary_db import DiaryStore
+from execution.venue_store import VenueStore, CANDIDATE_LIMIT, METERS_PER_DEGREE_LAT
+
+# Seoul City Hall
+LAT, LON = 37.5665, 126.9780
+
+
+def _setup(tmp):
+    store = DiaryStore(os.path.join(tmp, 'venues.db'))
+    store.migrate()
+    return store, VenueStore(store)
+
+
+def _north(meters):
+    return LAT + meters / METERS_PER_DEGREE_LAT
+
+
+def test_close_low_density_venue_survives_the_cap():
+    with tempfile.TemporaryDirectory() as tmp:
+        store, venues = _setup(tmp)
+        # More protein-dense items 700m out than the candidate cap...
+        far = [(venue_id, f"Gym Cafe {venue_id}", "cafe", _north(700), LON + venue_id * 1e-6,
+                (("Protein Shake", 150, 30, 2, 5, 4000),))
+               for venue_id in range(1, CANDIDATE_LIMIT + 51)]
+        venues.bulk_load(far)
+        # ...and a modest one just around the corner, which scores higher on distance
+        venues.add_venue("Corner Kimbap", "restaurant", _north(50), LON, (("Egg Kimbap", 100, 6, 3, 14, 3000),))
+
+        results = venues.find_nearby(LAT, LON, ["protein"], limit=3)
+        assert results[0]["place"] == "Corner Kimbap"
+        assert results[0]["distance_m"] < 60
+        store.close()
+
+
+def test_bounding_box_corners_are_outside_the_radius():
+    with tempfile.TemporaryDirectory() as tmp:
+        store, venues = _setup(tmp)
+        # 700m north and 700m east: inside the 800m box, ~990m away
+        dlon = 700 / (METERS_PER_DEGREE_LAT * 0.7923)
+        venues.add_venue("Corner Store", "convenience_store", _north(700), LON + dlon,
+                         (("Protein Bar", 200, 20, 8, 20, 2500),))
+        venues.add_venue("Nearby Deli", "restaurant", _north(300), LON, (("Chicken Salad", 300, 25, 12, 15, 8000),))
+
+        assert [r["place"] for r in venues.find_nearby(LAT, LON, ["protein"], radius_m=800)] == ["Nearby Deli"]
+        assert venues.find_nearby(LAT, LON, ["protein"], radius_m=100) == []
+        store.close()
+
+
+if __name__ == "__main__":
+    test_close_low_density_venue_survives_the_cap()
+    test_bounding_box_corners_are_outside_the_radius()
+    print("Venue store OK")
@@ -0,0 +1,153 @@
+import io
+import os
+import json
+import asyncio
+import hashlib
+import tempfile
+
+from PIL import Image
+
+from execution.gemini_client import GeminiClient
+from execution.gemini_stub_server import GeminiStub
+from execution.vision_analyzer import (
+    FoodVisionAnalyzer, PreparedImage, preprocess_image, preprocess_batch, pack_batches, parse_batch_analysis,
+    MAX_DIMENSION,
+)
+
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+
+def _photo(path, size=(3000, 2000), color=(200, 120, 60), orientation=None, fmt="JPEG", mode="RGB"):
+    img = Image.new(mode, size, color if mode == "RGB" else color + (128,))
+    # A bright band on the left edge shows which way the picture ends up
+    img.paste((255, 255, 255) if mode == "RGB" else (255, 255, 255, 255), (0, 0, size[0] // 10, size[1]))
+    exif = Image.Exif()
+    exif[MAKE] = "PhoneCam"
+    if orientation:
+        exif[ORIENTATION] = orientation
+    img.save(path, fmt, exif=exif.tobytes()) if fmt == "JPEG" else img.save(path, fmt)
+    return path
+
+
+def test_preprocess_downscales_rotates_and_strips_metadata():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _photo(os.path.join(tmp, "plate.jpg"), orientation=6)        # shot in portrait
+        with open(path, "rb") as f:
+            source = f.read()
+
+        prepared = preprocess_image(path)
+        assert prepared.digest == hashlib.sha256(source).hexdigest()
+        assert prepared.original_bytes == len(source)
+        assert prepared.mime_type == "image/jpeg"
+        assert len(prepared.data) < len(source)
+        with Image.open(io.BytesIO(prepared.data)) as out:
+            assert out.size == prepared.size and max(out.size) == MAX_DIMENSION
+            assert out.size[1] > out.size[0]                      # EXIF rotation applied
+            assert out.getpixel((out.size[0] // 2, 5))[0] > 240     # left band is now on top
+            assert not out.getexif()                              # no orientation, device or GPS tags
+
+
+def test_preprocess_converts_and_keeps_small_images():
+    with tempfile.TemporaryDirectory() as tmp:
+        png = _photo(os.path.join(tmp, "sticker.png"), size=(400, 300), fmt="PNG", mode="RGBA")
+        prepared = preprocess_image(png)
+        assert prepared.mime_type == "image/jpeg" and prepared.size == (400, 300)
+        with Image.open(io.BytesIO(prepared.data)) as out:
+            assert out.format == "JPEG" and out.mode == "RGB"
+
+        original = preprocess_image(png, max_dimension=None)
+        with open(png, "rb") as f:
+            assert original.data == f.read()
+        assert original.mime_type == "image/png" and original.size is None
+
+
+def test_batch_uses_a_process_pool_and_keeps_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [_photo(os.path.join(tmp, f"meal{i}.jpg"), size=(1600 + 100 * i, 1200), color=(20 * i, 100, 50))
+                 for i in range(5)]
+        serial = preprocess_batch(paths, workers=1)
+        pooled = preprocess_batch(paths, workers=2)
+        assert [p.digest for p in pooled] == [p.digest for p in serial] == \
+            [preprocess_image(path).digest for path in paths]
+        assert [p.data for p in pooled] == [p.data for p in serial]
+        assert all(p.size[0] == MAX_DIMENSION for p in pooled)
+
+
+def _prepared(size):
+    return PreparedImage(b"x" * size, "image/jpeg", str(size), size)
+
+
+def test_pack_batches_respects_count_and_byte_budget():
+    items = [(i, f"{i}.jpg", _prepared(300)) for i in range(7)]
+    assert [[i for i, _, _ in b] for b in pack_batches(items, max_images=3)] == [[0, 1, 2], [3, 4, 5], [6]]
+    # 300 raw bytes are 400 once base64-encoded: two fit in 1000, a third does not
+    assert [len(b) for b in pack_batches(items, max_images=8, max_bytes=1000)] == [2, 2, 2, 1]
+    # An image over the budget on its own still gets a request
+    assert [len(b) for b in pack_batches([(0, "big.jpg", _prepared(5000))] + items[:1], max_bytes=1000)] == [1, 1]
+    assert pack_batches([]) == []
+
+
+def test_parse_batch_keeps_only_usable_entries():
+    entry = {"food_name": "Bibimbap", "estimated_calories": 550, "macros": {"protein": 20}}
+    text = json.dumps([
+        dict(entry, image=2),
+        dict(entry, image=2, food_name="Duplicate"),
+        dict(entry, image=9),                                  # out of range
+        {"image": 3, "food_name": "Soup"},                     # no calories
+        "not an object",
+        dict(entry, image=1),
+    ])
+    parsed = parse_batch_analysis(text, 4)
+    assert sorted(parsed) == [0, 1] and parsed[1]["food_name"] == "Bibimbap"
+    assert parsed[0]["macros"] == {"protein": 20, "fat": None, "carbs": None}
+    assert parse_batch_analysis(json.dumps({"results": [dict(entry, image=1)]}), 1)[0]["estimated_calories"] == 550
+
+
+def _analyze(stub, paths, max_images, **client_options):
+    async def scenario():
+        base_url = await stub.start()
+        client = GeminiClient("stub-key", base_url=base_url, rpm=None, tpm=None, base_delay=0.01, max_delay=0.05,
+                              **client_options)
+        analyzer = FoodVisionAnalyzer(client=client)
+        try:
+            return [item async for item in analyzer.analyze_batch_async(paths, max_images=max_images)]
+        finally:
+            await client.close()
+            await stub.stop()
+    return asyncio.run(scenario())
+
+
+def test_batch_falls_back_to_single_image_calls():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [_photo(os.path.join(tmp, f"meal{i}.jpg"), size=(640, 480), color=(20 * i, 90, 40)) for i in range(10)]
+        # The stub leaves ~40% of the images out of each multi-image answer; distinct
+        # colours keep the single-image retries from coalescing into one request
+        stub = GeminiStub(latency_ms=(1, 3), batch_drop=0.4, seed=11)
+        results = _analyze(stub, paths, max_images=4)
+
+        assert sorted(path for path, _ in results) == sorted(paths)
+        assert all(result["food_name"] == "Chicken Breast Salad" for _, result in results)
+        dropped = stub.counts["requests"] - 3                     # batches of 4, 4 and 2
+        assert 0 < dropped < len(paths)
+
+
+def test_failed_images_yield_errors():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [_photo(os.path.join(tmp, f"meal{i}.jpg"), size=(320, 240), color=(60 * i, 90, 40)) for i in range(3)]
+        stub = GeminiStub(latency_ms=(1, 2), error_5xx=1.0)
+        results = _analyze(stub, paths, max_images=3, max_retries=0)
+        assert sorted(path for path, _ in results) == sorted(paths)
+        assert all("error" in result for _, result in results)
+        assert stub.counts["requests"] == 1 + len(paths)          # one batch call, then one per image
+
+
+if __name__ == "__main__":
+    test_preprocess_downscales_rotates_and_strips_metadata()
+    test_preprocess_converts_and_keeps_small_images()
+    test_batch_uses_a_process_pool_and_keeps_order()
+    test_pack_batches_respects_count_and_byte_budget()
+    test_parse_batch_keeps_only_usable_entries()
+    test_batch_falls_back_to_single_image_calls()
+    test_failed_images_yield_errors()
+    print("Vision analyzer OK")
@@ -0,0 +1,213 @@
+import math
+
+from execution.diary_db import get_store
+from execution.metrics import timed
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+
+# Ranking per directives/recommend_supplements.md: closer, denser in the missing
+# nutrients, and previously liked items first.
+RANK_WEIGHTS = {"distance": 0.4, "density": 0.4, "adoption": 0.2}
+DEFAULT_ADOPTION = 0.5
+DEFAULT_RADIUS_M = 800
+CANDIDATE_LIMIT = 100          # nearest in-radius items whose details are fetched and ranked
+RADIUS_SLACK = 1.01            # the flat-earth circle in SQL is widened a little; haversine has the last word
+
+# Nutrient density per 100 kcal (calories themselves for a calorie gap)
+DENSITY_SQL = {
+    "protein": "m.protein * 100.0 / MAX(m.calories, 50.0)",
+    "fat": "m.fat * 100.0 / MAX(m.calories, 50.0)",
+    "carbs": "m.carbs * 100.0 / MAX(m.calories, 50.0)",
+    "calories": "m.calories / 100.0",
+}
+
+NUTRIENT_LABELS_KO = {"protein": "단백질", "fat": "지방", "carbs": "탄수화물", "calories": "칼로리"}
+
+# Step 1: candidates from the R*Tree and the covering menu index alone. The bounding
+# box is cut to the circle and ordered on a flat-earth distance (squared degrees of
+# latitude, longitude scaled by cos(lat)); only the nearest CANDIDATE_LIMIT reach
+# Python for the exact haversine check and the density-aware ranking.
+NEARBY_SQL = '''
+SELECT m.id, r.min_lat, r.min_lon, {density} AS density,
+       (r.min_lat - :lat) * (r.min_lat - :lat) + (r.min_lon - :lon) * (r.min_lon - :lon) * :cos2 AS d2
+FROM venue_rtree r
+JOIN menu_items m ON m.venue_id = r.id
+WHERE r.min_lat >= :min_lat AND r.max_lat <= :max_lat AND r.min_lon >= :min_lon AND r.max_lon <= :max_lon
+  AND d2 <= :r2
+ORDER BY d2
+LIMIT :limit
+'''
+
+# Step 2: names, prices and exact coordinates for the few candidates inside the radius
+MENU_DETAILS_SQL = '''
+SELECT m.id, m.name, m.calories, m.protein, m.fat, m.carbs, m.price, v.id, v.name, v.lat, v.lon
+FROM menu_items m JOIN venues v ON v.id = m.venue_id
+WHERE m.id IN ({placeholders})
+'''
+
+INSERT_VENUE_SQL = "INSERT INTO venues (id, name, kind, lat, lon) VALUES (?, ?, ?, ?, ?)"
+INSERT_VENUE_RTREE_SQL = "INSERT INTO venue_rtree (id, min_lat, max_lat, min_lon, max_lon) VALUES (?, ?, ?, ?, ?)"
+INSERT_MENU_ITEM_SQL = '''
+INSERT INTO menu_items (venue_id, name, calories, protein, fat, carbs, price)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Around Seoul City Hall, used by the simulation when no venue data is loaded
+DEMO_VENUES = (
+    ("CU Convenience Store", "convenience_store", 37.5672, 126.9782, (
+        ("Protein Shake", 160, 24, 3, 9, 3500),
+        ("Chicken Breast Bar", 120, 20, 2, 5, 2500),
+        ("Triangle Kimbap", 210, 5, 4, 38, 1400),
+    )),
+    ("Starbucks", "cafe", 37.5646, 126.9814, (
+        ("Greek Yogurt", 150, 15, 4, 12, 4500),
+        ("Chicken Breast Sandwich", 390, 28, 12, 40, 6900),
+        ("Blueberry Muffin", 420, 6, 20, 54, 3900),
+    )),
+    ("Salady", "restaurant", 37.5691, 126.9768, (
+        ("Chicken Cobb Salad", 380, 32, 20, 16, 8900),
+        ("Tofu Poke", 420, 22, 14, 48, 9500),
+    )),
+)
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def bounding_box(lat, lon, radius_m):
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    dlon = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+class VenueStore:
+    """
+    Nearby venues and menu items, searched through an R*Tree on venue coordinates
+    """
+
+    def __init__(self, store=None):
+        self.store = store or get_store()
+
+    @timed("db_seconds")
+    def add_venue(self, name, kind, lat, lon, menu=(), venue_id=None):
+        """
+        Insert a venue with its menu items: (name, calories, protein, fat, carbs, price)
+        """
+        with self.store.transaction() as conn:
+            venue_id = conn.execute(INSERT_VENUE_SQL, (venue_id, name, kind, lat, lon)).lastrowid
+            conn.execute(INSERT_VENUE_RTREE_SQL, (venue_id, lat, lat, lon, lon))
+            conn.executemany(INSERT_MENU_ITEM_SQL, [(venue_id, *item) for item in menu])
+        return venue_id
+
+    @timed("db_seconds")
+    def bulk_load(self, venues, chunk_size=5000):
+        """
+        Load an iterable of (venue_id, name, kind, lat, lon, menu) in chunked transactions
+        """
+        chunk = []
+        loaded = 0
+        for venue in venues:
+            chunk.append(venue)
+            if len(chunk) >= chunk_size:
+                loaded += self._load_chunk(chunk)
+                chunk = []
+        if chunk:
+            loaded += self._load_chunk(chunk)
+        return loaded
+
+    def _load_chunk(self, chunk):
+        with self.store.transaction() as conn:
+            conn.executemany(INSERT_VENUE_SQL, [(v[0], v[1], v[2], v[3], v[4]) for v in chunk])
+            conn.executemany(INSERT_VENUE_RTREE_SQL, [(v[0], v[3], v[3], v[4], v[4]) for v in chunk])
+            conn.executemany(INSERT_MENU_ITEM_SQL, [(v[0], *item) for v in chunk for item in v[5]])
+        return len(chunk)
+
+    def is_empty(self):
+        return self.store.connection().execute("SELECT 1 FROM venues LIMIT 1").fetchone() is None
+
+    def seed_demo_venues(self):
+        if self.is_empty():
+            for name, kind, lat, lon, menu in DEMO_VENUES:
+                self.add_venue(name, kind, lat, lon, menu)
+
+    @timed("db_seconds")
+    def find_nearby(self, lat, lon, missing_nutrients, radius_m=DEFAULT_RADIUS_M, limit=3, adoption=None):
+        """
+        Menu items within radius_m that best fill the missing nutrients, one per venue.
+
+        adoption(item_name, place_name) -> [0, 1] supplies the user's acceptance score;
+        unknown items get DEFAULT_ADOPTION.
+        """
+        nutrients = [n for n in missing_nutrients if n in DENSITY_SQL] or ["protein"]
+        density = " + ".join(DENSITY_SQL[n] for n in nutrients)
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_m)
+        conn = self.store.connection()
+        rows = conn.execute(NEARBY_SQL.format(density=density), {
+            "lat": lat, "lon": lon, "cos2": math.cos(math.radians(lat)) ** 2,
+            "r2": (radius_m * RADIUS_SLACK / METERS_PER_DEGREE_LAT) ** 2, "limit": CANDIDATE_LIMIT,
+            "min_lat": min_lat, "max_lat": max_lat, "min_lon": min_lon, "max_lon": max_lon,
+        }).fetchall()
+
+        # The flat-earth circle is a little wide; haversine has the last word
+        densities = {}
+        for item_id, v_lat, v_lon, item_density, _ in rows:
+            if haversine_m(lat, lon, v_lat, v_lon) <= radius_m:
+                densities[item_id] = item_density or 0.0
+        if not densities:
+            return []
+        max_density = max(densities.values()) or 1.0
+
+        candidates = []
+        details = conn.execute(
+            MENU_DETAILS_SQL.format(placeholders=",".join("?" * len(densities))), list(densities)
+        ).fetchall()
+        for item_id, name, calories, protein, fat, carbs, price, venue_id, place, v_lat, v_lon in details:
+            candidates.append({
+                "item_id": item_id,
+                "name": name,
+                "place": place,
+                "venue_id": venue_id,
+                "distance_m": haversine_m(lat, lon, v_lat, v_lon),
+                "lat": v_lat,
+                "lon": v_lon,
+                "price": price,
+                "nutrients": {"calories": calories, "protein": protein, "fat": fat, "carbs": carbs},
+                "density": densities[item_id],
+            })
+
+        for c in candidates:
+            adoption_score = adoption(c["name"], c["place"]) if adoption else DEFAULT_ADOPTION
+            c["score"] = round(RANK_WEIGHTS["distance"] * max(1.0 - c["distance_m"] / radius_m, 0.0)
+                               + RANK_WEIGHTS["density"] * c["density"] / max_density
+                               + RANK_WEIGHTS["adoption"] * adoption_score, 4)
+        candidates.sort(key=lambda c: c["score"], reverse=True)
+
+        top = nutrients[0]
+        unit = "kcal" if top == "calories" else "g"
+        results = []
+        seen_venues = set()
+        for c in candidates:
+            if c["venue_id"] in seen_venues:
+                continue
+            seen_venues.add(c["venue_id"])
+            del c["density"], c["venue_id"]
+            c["distance_m"] = round(c["distance_m"], 1)
+            c["map_link"] = f"https://www.google.com/maps/search/?api=1&query={c['lat']},{c['lon']}"
+            c["why"] = f"{NUTRIENT_LABELS_KO[top]} {c['nutrients'][top]:g}{unit}을 보충하기에 좋은 선택입니다!"
+            results.append(c)
+            if len(results) >= limit:
+                break
+        return results
+
+
+if __name__ == "__main__":
+    venues = VenueStore()
+    venues.seed_demo_venues()
+    for rec in venues.find_nearby(37.5665, 126.9780, ["protein"]):
+        print(rec)
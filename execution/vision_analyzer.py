@@ -1,25 +1,387 @@
 import os
-# Placeholder for Gemini integration
-# In a real scenario, we use google-generativeai package
+import io
+import json
+import base64
+import asyncio
+import hashlib
+import mimetypes
+from functools import partial
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:       # without Pillow photos are uploaded as-is
+    Image = None
+
+from execution.gemini_client import GeminiClient, GeminiError, DEFAULT_MODEL, extract_text
+from execution.analysis_cache import AnalysisCache
+from execution.diary_db import init_db
+from execution.metrics import timed
+
+# Gemini tiles images at 768px, so larger uploads only add bytes and latency
+MAX_DIMENSION = 1024
+JPEG_QUALITY = 85
+CHUNK_SIZE = 1 << 16
+
+# Batch packing: images per generateContent call, and the inline payload budget
+# (base64 bytes) under Gemini's 20MB request limit
+MAX_IMAGES_PER_REQUEST = 8
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+OUTPUT_TOKENS_PER_IMAGE = 160
+
+VISION_PROMPT = """Analyze this food photo. {profile}
+Identify the dish and estimate the nutrition of the visible portion{portion}.
+Respond with JSON only:
+{{"food_name": "short name in English", "food_name_ko": "short name in Korean",
+ "estimated_calories": number, "macros": {{"protein": grams, "fat": grams, "carbs": grams}},
+ "confidence": number between 0 and 1}}"""
+
+BATCH_PROMPT = """Analyze each of these {count} food photos independently. {profile}
+The photos follow in order as Image 1 to Image {count}. For each one, identify the dish
+and estimate the nutrition of the visible portion{portion}.
+Respond with JSON only: an array of {count} objects in image order, each
+{{"image": image number, "food_name": "short name in English", "food_name_ko": "short name in Korean",
+ "estimated_calories": number, "macros": {{"protein": grams, "fat": grams, "carbs": grams}},
+ "confidence": number between 0 and 1}}"""
+
+
+class PreparedImage:
+    """
+    Upload-ready image bytes plus the digest of the source file (the cache key)
+    """
+
+    def __init__(self, data, mime_type, digest, original_bytes, size=None):
+        self.data = data
+        self.mime_type = mime_type
+        self.digest = digest
+        self.original_bytes = original_bytes
+        self.size = size
+
+
+def file_digest(image_path, chunk_size=CHUNK_SIZE):
+    h = hashlib.sha256()
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def preprocess_image(image_path, max_dimension=MAX_DIMENSION, quality=JPEG_QUALITY):
+    """
+    Downscale to max_dimension, apply and drop EXIF orientation/metadata, and
+    re-encode as JPEG at `quality`. The source is streamed: hashed in chunks and
+    decoded by Pillow straight from the file, at reduced scale for JPEGs.
+    max_dimension=None (or no Pillow) uploads the original bytes unchanged.
+    """
+    digest = file_digest(image_path)
+    original_bytes = os.path.getsize(image_path)
+    if max_dimension is None or Image is None:
+        with open(image_path, "rb") as f:
+            data = f.read()
+        mime_type = mimetypes.guess_type(image_path)[0] or "image/jpeg"
+        return PreparedImage(data, mime_type, digest, original_bytes)
+
+    with Image.open(image_path) as img:
+        # JPEG draft mode decodes at 1/2..1/8 scale, far cheaper than a full decode
+        img.draft("RGB", (max_dimension, max_dimension))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        out = io.BytesIO()
+        # No exif= argument, so no metadata (GPS, device) is written
+        img.save(out, "JPEG", quality=quality, optimize=True)
+        size = img.size
+    return PreparedImage(out.getvalue(), "image/jpeg", digest, original_bytes, size)
+
+
+def preprocess_batch(image_paths, max_dimension=MAX_DIMENSION, quality=JPEG_QUALITY, workers=None):
+    """
+    Preprocess many photos across a process pool; results keep the input order
+    """
+    image_paths = list(image_paths)
+    prepare = partial(preprocess_image, max_dimension=max_dimension, quality=quality)
+    if len(image_paths) < 2 or workers == 1:
+        return [prepare(path) for path in image_paths]
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(prepare, image_paths, chunksize=4))
+
+
+def _profile_fields(user_profile=None):
+    if not user_profile:
+        return {"profile": "User Profile: Adult.", "portion": ""}
+    parts = []
+    for key, label, unit in (("gender", "Gender", ""), ("height", "Height", "cm"), ("weight", "Weight", "kg")):
+        if user_profile.get(key):
+            parts.append(f"{label}: {user_profile[key]}{unit}")
+    profile = f"User Profile: {', '.join(parts)}." if parts else "User Profile: Adult."
+    # directives/analyze_food_photo.md: size the serving for this user's body
+    return {"profile": profile, "portion": ", sized as one serving for this user"}
+
+
+def build_prompt(user_profile=None):
+    return VISION_PROMPT.format(**_profile_fields(user_profile))
+
+
+def build_batch_prompt(count, user_profile=None):
+    return BATCH_PROMPT.format(count=count, **_profile_fields(user_profile))
+
+
+def parse_analysis(text):
+    return _analysis_fields(json.loads(text))
+
+
+def parse_batch_analysis(text, count):
+    """
+    Split a batch response into {image index (0-based): analysis}.
+    Entries that are missing, out of range or incomplete are left out so the
+    caller can retry those images on their own.
+    """
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("results") or data.get("images") or []
+    results = {}
+    for position, entry in enumerate(data if isinstance(data, list) else []):
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("image", position + 1)
+        if not isinstance(index, int) or not 1 <= index <= count or index - 1 in results:
+            continue
+        if entry.get("food_name") is None or entry.get("estimated_calories") is None:
+            continue
+        results[index - 1] = _analysis_fields(entry)
+    return results
+
+
+def pack_batches(items, max_images=MAX_IMAGES_PER_REQUEST, max_bytes=MAX_BATCH_BYTES):
+    """
+    Greedily group (index, path, PreparedImage) items into requests that stay
+    within the per-request image count and inline payload budget
+    """
+    batches, batch, batch_bytes = [], [], 0
+    for item in items:
+        size = len(item[2].data) * 4 // 3
+        if batch and (len(batch) >= max_images or batch_bytes + size > max_bytes):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(item)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _inline_part(prepared):
+    return {"inline_data": {"mime_type": prepared.mime_type,
+                            "data": base64.b64encode(prepared.data).decode("ascii")}}
+
+
+def _analysis_fields(data):
+    macros = data.get("macros") or {}
+    return {
+        "food_name": data.get("food_name"),
+        "food_name_ko": data.get("food_name_ko"),
+        "estimated_calories": data.get("estimated_calories"),
+        "macros": {k: macros.get(k) for k in ("protein", "fat", "carbs")},
+        "confidence": data.get("confidence"),
+    }
+
 
 class FoodVisionAnalyzer:
-    def __init__(self, api_key=None):
+    """
+    Food photo analysis on Gemini Vision.
+    Pass an AnalysisCache to reuse results for photos (or near-duplicates) seen before.
+
+    With a PortionModel, the prompt asks for a standard serving and the answer is
+    scaled by the calibration learned from the user's own corrections (user_profile
+    "id"). The prompt then no longer depends on the user, so one cached analysis
+    serves everyone.
+    """
+
+    def __init__(self, api_key=None, client=None, model=DEFAULT_MODEL, cache=None,
+                 max_dimension=MAX_DIMENSION, quality=JPEG_QUALITY, portions=None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if client is None and not self.api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment.")
+        self.client = client or GeminiClient(self.api_key, model=model)
+        self.model = model
+        self.cache = cache
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.portions = portions
 
-    def analyze_image(self, image_path):
+    def _payload(self, prepared, prompt):
+        return {
+            "contents": [{"parts": [{"text": prompt}, _inline_part(prepared)]}],
+            "generationConfig": {"responseMimeType": "application/json", "maxOutputTokens": 512},
+        }
+
+    def _batch_payload(self, batch, prompt):
+        parts = [{"text": prompt}]
+        for number, (_, _, prepared) in enumerate(batch, 1):
+            parts.append({"text": f"Image {number}:"})
+            parts.append(_inline_part(prepared))
+        return {
+            "contents": [{"parts": parts}],
+            "generationConfig": {"responseMimeType": "application/json",
+                                 "maxOutputTokens": OUTPUT_TOKENS_PER_IMAGE * len(batch) + 256},
+        }
+
+    @timed("vision_preprocess_seconds")
+    def _prepare(self, image_path):
+        return preprocess_image(image_path, self.max_dimension, self.quality)
+
+    def _prepare_many(self, image_paths):
+        return preprocess_batch(image_paths, self.max_dimension, self.quality)
+
+    def _prompt_profile(self, user_profile):
+        return None if self.portions is not None else user_profile
+
+    def _calibrate(self, result, user_profile):
+        if self.portions is None or not user_profile or "error" in result:
+            return result
+        return self.portions.apply_analysis(user_profile.get("id"), result)
+
+    def _cache_params(self, user_profile):
+        return {"model": self.model, "prompt": build_prompt(user_profile),
+                "max_dimension": self.max_dimension, "quality": self.quality}
+
+    async def _cached(self, image_path, prepared, cache_params):
+        loop = asyncio.get_running_loop()
+        digest = prepared.digest if prepared else await loop.run_in_executor(None, file_digest, image_path)
+        return self.cache.get(prepared.data if prepared else None, cache_params, digest)
+
+    async def analyze_image_async(self, image_path, user_profile=None, prepared=None):
         """
-        Mock implementation of Gemini Vision Analysis
+        Gemini Vision analysis of one food photo through the shared rate-limited client
         """
+        loop = asyncio.get_running_loop()
+        cache_params = self._cache_params(self._prompt_profile(user_profile))
+
+        if self.cache is not None:
+            # Exact hits only need the streamed digest; perceptual lookups need the pixels
+            if prepared is None and self.cache.perceptual:
+                prepared = await loop.run_in_executor(None, self._prepare, image_path)
+            cached = await self._cached(image_path, prepared, cache_params)
+            if cached is not None:
+                return self._calibrate(cached, user_profile)
+
+        if prepared is None:
+            prepared = await loop.run_in_executor(None, self._prepare, image_path)
+        return self._calibrate(await self._analyze_prepared(prepared, cache_params), user_profile)
+
+    @timed("vision_seconds")
+    async def _analyze_prepared(self, prepared, cache_params):
+        response = await self.client.generate(self._payload(prepared, cache_params["prompt"]))
+        result = parse_analysis(extract_text(response))
+        if self.cache is not None:
+            self.cache.put(prepared.data, cache_params, result, prepared.digest)
+        return result
+
+    def analyze_image(self, image_path, user_profile=None):
         print(f"Analyzing image: {image_path}")
-        # Logic to call Gemini 1.5/2.0 Pro
-        return {
-            "food_name": "Chicken Breast Salad",
-            "estimated_calories": 350,
-            "macros": {"protein": 30, "fat": 15, "carbs": 10},
-            "confidence": 0.92
-        }
+        return self.client.run_sync(self.analyze_image_async(image_path, user_profile))
+
+    def analyze_images(self, image_paths, user_profile=None, workers=None):
+        """
+        Batch upload: preprocess in a process pool, then analyze concurrently
+        """
+        image_paths = list(image_paths)
+        prepared = preprocess_batch(image_paths, self.max_dimension, self.quality, workers)
+
+        async def run():
+            return await asyncio.gather(*(
+                self.analyze_image_async(path, user_profile, p) for path, p in zip(image_paths, prepared)
+            ))
+        return self.client.run_sync(run())
+
+    async def analyze_batch_async(self, image_paths, user_profile=None, max_images=MAX_IMAGES_PER_REQUEST):
+        """
+        Analyze many photos in as few model calls as the request limits allow.
+
+        Yields (image_path, result) as each result becomes available: cache hits
+        first, then every image of a batch once its call returns. Images a batch
+        response leaves out or garbles are retried with single-image calls; an
+        image that still fails yields {"error": ...}.
+        """
+        image_paths = list(image_paths)
+        loop = asyncio.get_running_loop()
+        profile = self._prompt_profile(user_profile)
+        cache_params = self._cache_params(profile)
+
+        prepared = [None] * len(image_paths)
+        if self.cache is not None and self.cache.perceptual:
+            prepared = await loop.run_in_executor(None, self._prepare_many, image_paths)
+
+        misses = []
+        for i, path in enumerate(image_paths):
+            if self.cache is not None:
+                cached = await self._cached(path, prepared[i], cache_params)
+                if cached is not None:
+                    yield path, self._calibrate(cached, user_profile)
+                    continue
+            misses.append(i)
+
+        todo = [i for i in misses if prepared[i] is None]
+        for i, p in zip(todo, await loop.run_in_executor(None, self._prepare_many, [image_paths[i] for i in todo])):
+            prepared[i] = p
+
+        results = asyncio.Queue()
+        batches = pack_batches([(i, image_paths[i], prepared[i]) for i in misses], max_images)
+        tasks = [asyncio.ensure_future(self._run_batch(batch, profile, cache_params, results))
+                 for batch in batches]
+        for task in tasks:
+            # Surface unexpected failures instead of waiting forever on the queue
+            task.add_done_callback(
+                lambda t: t.cancelled() or t.exception() is None or results.put_nowait(t.exception())
+            )
+        try:
+            for _ in misses:
+                item = await results.get()
+                if isinstance(item, BaseException):
+                    raise item
+                yield item[0], self._calibrate(item[1], user_profile)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @timed("vision_seconds")
+    async def _run_batch(self, batch, user_profile, cache_params, results):
+        parsed = {}
+        if len(batch) > 1:
+            try:
+                response = await self.client.generate(
+                    self._batch_payload(batch, build_batch_prompt(len(batch), user_profile))
+                )
+                parsed = parse_batch_analysis(extract_text(response), len(batch))
+            except (GeminiError, ValueError, KeyError, IndexError, TypeError):
+                parsed = {}
+
+        for position, (_, path, prepared) in enumerate(batch):
+            if position in parsed:
+                if self.cache is not None:
+                    self.cache.put(prepared.data, cache_params, parsed[position], prepared.digest)
+                results.put_nowait((path, parsed[position]))
+
+        async def single(path, prepared):
+            try:
+                result = await self._analyze_prepared(prepared, cache_params)
+            except (GeminiError, ValueError, KeyError, IndexError, TypeError) as e:
+                result = {"error": str(e)}
+            results.put_nowait((path, result))
+
+        await asyncio.gather(*(single(path, prepared) for position, (_, path, prepared) in enumerate(batch)
+                               if position not in parsed))
+
+    def analyze_batch(self, image_paths, user_profile=None, max_images=MAX_IMAGES_PER_REQUEST):
+        """
+        Synchronous analyze_batch_async: a generator of (image_path, result) that
+        yields while later batches are still in flight
+        """
+        return self.client.iter_sync(self.analyze_batch_async(image_paths, user_profile, max_images))
 
 if __name__ == "__main__":
-    analyzer = FoodVisionAnalyzer()
+    analyzer = FoodVisionAnalyzer(cache=AnalysisCache(init_db()))
     result = analyzer.analyze_image("test_food.jpg")
     print(result)
@@ -68,6 +68,7 @@ export default function HomeScreen() {
                     .from('food_logs')
                     .select('*')
                     .eq('user_id', user.id)
+                    .is('deleted_at', null)
                     .order('created_at', { ascending: false });
 
                 let sortedLogs: any[] = mealLogs || [];
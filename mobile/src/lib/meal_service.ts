@@ -80,6 +80,7 @@ export const getMealLogs = async (userId: string) => {
             .from('food_logs')
             .select('*')
             .eq('user_id', userId)
+            .is('deleted_at', null)
             .order('created_at', { ascending: false });
 
         if (error) throw error;
@@ -90,11 +91,12 @@ export const getMealLogs = async (userId: string) => {
     }
 };
 
+// Soft delete: other devices learn about it through the incremental sync pull
 export const deleteMealLog = async (id: string) => {
     try {
         const { error } = await (supabase as any)
             .from('food_logs')
-            .delete()
+            .update({ deleted_at: new Date().toISOString() })
             .eq('id', id);
 
         if (error) throw error;
@@ -169,6 +171,7 @@ export const getPlaceNameByAddress = async (userId: string, address: string) =>
             .from('food_logs')
             .select('place_name')
             .match({ user_id: userId, address: address })
+            .is('deleted_at', null)
             .not('place_name', 'is', null)
             .order('created_at', { ascending: false })
             .limit(1);
@@ -190,6 +193,7 @@ export const getWeeklyStats = async (userId: string) => {
             .from('food_logs')
             .select('*')
             .eq('user_id', userId)
+            .is('deleted_at', null)
             .gte('created_at', sevenDaysAgo.toISOString())
             .order('created_at', { ascending: true });
 
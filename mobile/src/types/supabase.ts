@@ -93,6 +93,8 @@ export interface Database {
                     meal_type: string
                     health_score: number
                     description: string | null
+                    updated_at: string
+                    deleted_at: string | null
                 }
                 Insert: {
                     id?: string
@@ -107,6 +109,8 @@ export interface Database {
                     meal_type: string
                     health_score?: number
                     description?: string | null
+                    updated_at?: string
+                    deleted_at?: string | null
                 }
                 Update: {
                     id?: string
@@ -121,6 +125,8 @@ export interface Database {
                     meal_type?: string
                     health_score?: number
                     description?: string | null
+                    updated_at?: string
+                    deleted_at?: string | null
                 }
             }
         }
@@ -0,0 +1,26 @@
+-- Incremental sync support for food_logs (see execution/sync_engine.py)
+
+-- Server-side change time: the pull high-water mark, and the remote side of last-writer-wins
+ALTER TABLE public.food_logs
+ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT clock_timestamp();
+
+-- Soft deletes, so deletions reach other devices through the same incremental pull
+ALTER TABLE public.food_logs
+ADD COLUMN IF NOT EXISTS deleted_at timestamptz;
+
+CREATE OR REPLACE FUNCTION public.food_logs_touch_updated_at()
+RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS food_logs_touch_updated_at ON public.food_logs;
+CREATE TRIGGER food_logs_touch_updated_at
+BEFORE INSERT OR UPDATE ON public.food_logs
+FOR EACH ROW EXECUTE FUNCTION public.food_logs_touch_updated_at();
+
+-- Keyset pull: user_id = ? AND (updated_at, id) > (mark) ORDER BY updated_at, id
+CREATE INDEX IF NOT EXISTS food_logs_user_updated_at_id
+ON public.food_logs (user_id, updated_at, id);